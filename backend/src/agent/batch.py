@@ -0,0 +1,317 @@
+"""批量研究：并发运行多个问题，并在任务之间共享相同搜索查询的结果
+
+用法：
+    python -m backend.src.agent.batch questions.jsonl -o results.jsonl --concurrency 8
+    python -m backend.src.agent.batch questions.jsonl -o results.jsonl --resume   # 跳过已成功的 id
+
+输入每行一个 JSON：{"id": "q1", "question": "..."}（id 可省略，默认用行号；重复的 id 会被拒绝）；
+结果按完成顺序逐行追加写入输出文件：{"id", "question", "thread_id", "answer", "error", "elapsed_ms"}。
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Union
+
+from backend.src.agent.cache.search_cache import normalize_query
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.query_ledger import query_terms, similarity
+
+if TYPE_CHECKING:
+    from backend.src.agent.graph import MyDeepResearchAgent
+
+Question = Union[str, Dict[str, Any]]
+
+
+class ResearchDedup:
+    """一个批次内共享的 web_research 结果（single-flight）
+
+    key 为归一化后的搜索查询（见 normalize_query）。归一化结果不同时，再按 query_ledger 的词集合
+    Jaccard 相似度匹配批次内已登记的查询，达到 threshold（默认 query_dedup_threshold）即视为同一查询，
+    因此不同任务生成的相同或近似相同的查询只执行一次搜索与分析：第一个到达的任务执行，
+    同时到达的任务等待其结果，之后到达的直接复用。执行失败不会被记住，等待中的任务会重新竞争执行。
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        self.threshold = Configuration.from_runnable_config().query_dedup_threshold if threshold is None else threshold
+        self._lock = threading.Lock()
+        self._results: Dict[str, Any] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._ainflight: Dict[str, asyncio.Event] = {}
+        self._terms: Dict[str, FrozenSet[str]] = {}
+        self.executed = 0
+        self.shared = 0
+        self.near_duplicates = 0
+
+    def _key(self, query: str) -> str:
+        """查询对应的 key：归一化结果已登记时直接使用，否则取相似度最高且达到阈值的已登记 key"""
+        key = normalize_query(query)
+        terms = query_terms(query)
+        with self._lock:
+            if key in self._terms:
+                return key
+            best, best_score = None, self.threshold
+            for other, other_terms in self._terms.items():
+                score = similarity(terms, other_terms)
+                if score >= best_score:
+                    best, best_score = other, score
+            if best is not None:
+                self.near_duplicates += 1
+                return best
+            self._terms[key] = terms
+            return key
+
+    def _claim(self, key: str, inflight: dict, new_event: Callable):
+        """返回 (是否命中, 结果或需要等待的事件, 是否由本任务执行)"""
+        with self._lock:
+            if key in self._results:
+                self.shared += 1
+                return True, self._results[key], False
+            event = inflight.get(key)
+            if event is None:
+                inflight[key] = event = new_event()
+                return False, event, True
+            return False, event, False
+
+    def _finish(self, key: str, inflight: dict, result: Any = None, ok: bool = False) -> None:
+        with self._lock:
+            if ok:
+                self._results[key] = result
+                self.executed += 1
+            inflight.pop(key).set()
+
+    def run(self, query: str, fn: Callable[[], Any]) -> Any:
+        key = self._key(query)
+        while True:
+            hit, value, leader = self._claim(key, self._inflight, threading.Event)
+            if hit:
+                return value
+            if not leader:
+                value.wait()
+                continue
+            try:
+                result = fn()
+            except BaseException:
+                self._finish(key, self._inflight)
+                raise
+            self._finish(key, self._inflight, result, ok=True)
+            return result
+
+    async def arun(self, query: str, fn: Callable[[], Any]) -> Any:
+        """Async variant of :meth:`run`; ``fn`` returns an awaitable."""
+        key = self._key(query)
+        while True:
+            hit, value, leader = self._claim(key, self._ainflight, asyncio.Event)
+            if hit:
+                return value
+            if not leader:
+                await value.wait()
+                continue
+            try:
+                result = await fn()
+            except BaseException:
+                self._finish(key, self._ainflight)
+                raise
+            self._finish(key, self._ainflight, result, ok=True)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.executed + self.shared
+            return {
+                "executed": self.executed,
+                "shared": self.shared,
+                "near_duplicates": self.near_duplicates,
+                "share_rate": self.shared / total if total else 0.0,
+            }
+
+
+class BatchProgress:
+    """统计批量任务的进度与吞吐，每完成一个任务向 out 输出一行"""
+
+    def __init__(self, total: int, dedup: Optional[ResearchDedup] = None, out=sys.stderr):
+        self.total = total
+        self.dedup = dedup
+        self.out = out
+        self.start = time.perf_counter()
+        self.done = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def record(self, result: dict) -> None:
+        with self._lock:
+            self.done += 1
+            self.failed += result["error"] is not None
+            elapsed = time.perf_counter() - self.start
+            status = "失败" if result["error"] else "完成"
+            shared = f" | 共享搜索 {self.dedup.shared}" if self.dedup else ""
+            eta = elapsed / self.done * (self.total - self.done)
+            self.out.write(
+                f"[{self.done}/{self.total}] {result['id']} {status} {result['elapsed_ms'] / 1000:.1f}s"
+                f" | {self.done / elapsed * 60:.1f} 个/分钟 | 预计剩余 {eta:.0f}s{shared}\n"
+            )
+            self.out.flush()
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.start
+        summary = {
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 2),
+            "jobs_per_minute": round(self.done / elapsed * 60, 2) if elapsed else 0.0,
+        }
+        if self.dedup:
+            summary["research"] = self.dedup.stats()
+        return summary
+
+
+def _to_jobs(questions: Iterable[Question]) -> List[dict]:
+    """id 决定线程 id 与结果归属，重复的 id（包括与缺省的行号相同的 id）会互相覆盖，因此直接拒绝"""
+    jobs, seen = [], {}
+    for index, item in enumerate(questions):
+        if isinstance(item, str):
+            item = {"question": item}
+        job_id = str(item.get("id", index))
+        if job_id in seen:
+            raise ValueError(f"第 {index + 1} 个问题的 id {job_id!r} 与第 {seen[job_id] + 1} 个问题重复")
+        seen[job_id] = index
+        jobs.append({"id": job_id, "question": item["question"]})
+    return jobs
+
+
+def _result(job: dict, thread_id: str, start: float, answer=None, error=None) -> dict:
+    return {
+        "id": job["id"],
+        "question": job["question"],
+        "thread_id": thread_id,
+        "answer": answer,
+        "error": error,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def run_batch(agent: "MyDeepResearchAgent", questions: Iterable[Question], concurrency: int = 4,
+              on_result: Optional[Callable[[dict], None]] = None,
+              progress: Optional[BatchProgress] = None, batch_id: Optional[str] = None) -> List[dict]:
+    """在线程池中并发运行一批问题，返回与输入顺序一致的结果列表
+
+    每个问题使用独立线程 id（batch-<batch_id>-<id>），互不共享对话历史；
+    同一批次内的 web_research 结果通过 ResearchDedup 共享。on_result 按完成顺序回调，
+    可用于增量写出结果。单个任务失败只记录 error，不影响其他任务。
+    """
+    jobs = _to_jobs(questions)
+    batch_id = batch_id or uuid.uuid4().hex[:8]
+    dedup = ResearchDedup()
+    progress = progress or BatchProgress(len(jobs))
+    progress.dedup = dedup
+    agent.research_dedup[batch_id] = dedup
+
+    def execute(job: dict) -> dict:
+        thread_id = f"batch-{batch_id}-{job['id']}"
+        start = time.perf_counter()
+        try:
+            return _result(job, thread_id, start, answer=agent.run(job["question"], thread_id, batch_id=batch_id))
+        except Exception as e:
+            return _result(job, thread_id, start, error=f"{type(e).__name__}: {e}")
+
+    results: Dict[int, dict] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="agent-batch") as pool:
+            futures = {pool.submit(execute, job): index for index, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                progress.record(result)
+                if on_result:
+                    on_result(result)
+    finally:
+        agent.research_dedup.pop(batch_id, None)
+    return [results[index] for index in range(len(jobs))]
+
+
+async def arun_batch(agent: "MyDeepResearchAgent", questions: Iterable[Question], concurrency: int = 4,
+                     on_result: Optional[Callable[[dict], None]] = None,
+                     progress: Optional[BatchProgress] = None, batch_id: Optional[str] = None) -> List[dict]:
+    """Async variant of :func:`run_batch` using ``arun`` under a semaphore."""
+    jobs = _to_jobs(questions)
+    batch_id = batch_id or uuid.uuid4().hex[:8]
+    dedup = ResearchDedup()
+    progress = progress or BatchProgress(len(jobs))
+    progress.dedup = dedup
+    agent.research_dedup[batch_id] = dedup
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def execute(job: dict) -> dict:
+        thread_id = f"batch-{batch_id}-{job['id']}"
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                answer = await agent.arun(job["question"], thread_id, batch_id=batch_id)
+                result = _result(job, thread_id, start, answer=answer)
+            except Exception as e:
+                result = _result(job, thread_id, start, error=f"{type(e).__name__}: {e}")
+        progress.record(result)
+        if on_result:
+            on_result(result)
+        return result
+
+    try:
+        return list(await asyncio.gather(*(execute(job) for job in jobs)))
+    finally:
+        agent.research_dedup.pop(batch_id, None)
+
+
+def read_jsonl(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="输入 JSONL，每行 {\"id\", \"question\"}")
+    parser.add_argument("-o", "--output", required=True, help="结果 JSONL（逐行追加写入）")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时运行的问题数")
+    parser.add_argument("--batch-id", default=None, help="批次 id，决定各任务的线程 id；默认随机生成")
+    parser.add_argument("--resume", action="store_true", help="跳过输出文件中已成功完成的 id")
+    parser.add_argument("--user-id", default="default_user", help="记忆所属用户")
+    parser.add_argument("--knowledge-base", default="./knowledge_base", help="RAG 知识库路径")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="使用异步图运行")
+    args = parser.parse_args(argv)
+
+    try:
+        questions = _to_jobs(read_jsonl(args.input))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.resume:
+        try:
+            finished = {str(row["id"]) for row in read_jsonl(args.output) if not row.get("error")}
+        except FileNotFoundError:
+            finished = set()
+        questions = [job for job in questions if job["id"] not in finished]
+        print(f"跳过已完成的 {len(finished)} 个问题，剩余 {len(questions)} 个", file=sys.stderr)
+
+    from backend.src.agent.graph import MyDeepResearchAgent
+
+    agent = MyDeepResearchAgent(knowledge_base_path=args.knowledge_base, user_id=args.user_id)
+    progress = BatchProgress(len(questions))
+    with open(args.output, "a" if args.resume else "w", encoding="utf-8") as out:
+        def write(result: dict) -> None:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+
+        if args.use_async:
+            asyncio.run(arun_batch(agent, questions, args.concurrency, write, progress, args.batch_id))
+        else:
+            run_batch(agent, questions, args.concurrency, write, progress, args.batch_id)
+
+    print(json.dumps(progress.summary(), ensure_ascii=False), file=sys.stderr)
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""完整研究图的离线基准：用 fakes.py 中的假模型、假搜索、假记忆与假知识库运行 MyDeepResearchAgent
+
+用法：
+    python -m backend.src.agent.benchmarks.bench_graph --concurrency 1 8 64 --profile fast
+    python -m backend.src.agent.benchmarks.bench_graph --save-baseline cache_data/bench_graph.json
+    python -m backend.src.agent.benchmarks.bench_graph --baseline cache_data/bench_graph.json --threshold 0.2
+
+每个并发档位使用一个新的 Agent（内存 checkpointer、独立的上下文缓存），同时运行 --concurrency 个问题，
+报告端到端与各节点（来自 tracer 的 node span）的 p50/p95/p99 以及吞吐。
+假依赖的延迟与输出只由请求内容和 --seed 决定，同一版本的多次运行结果稳定。
+
+指定 --baseline 时与基线比较：端到端分位数、串行档位的节点中位数变慢或吞吐下降超过 --threshold（默认 20%）时
+以退出码 1 结束，可直接接入 CI。低于 --min-ms 或样本数不足（见 MIN_SAMPLES）的分位数波动较大，不参与比较。
+搜索缓存与 LLM 缓存默认关闭，限流器默认关闭（--rate-limit 开启，按 Configuration 的配额运行）。
+指定 --cassette 时模型与搜索调用改为回放录制的线上流量（见 models/cassette.py），记忆与知识库仍使用假对象。
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from backend.src.agent.benchmarks.fakes import FakeProfile, Latency
+
+TOPICS = [
+    "吉他新手应该先练习哪些和弦，每天练多久合适",
+    "减肥期间如何安排碳水化合物和蛋白质的摄入比例",
+    "Pandas 读取大文件时如何降低内存占用",
+    "新能源汽车电池寿命和充电习惯有什么关系",
+    "初学者如何制定长期投资理财计划",
+    "如何系统地学习乐理并应用到即兴演奏",
+    "睡眠不足对力量训练的恢复有什么影响",
+    "数据库索引设计有哪些常见误区",
+]
+
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+# 样本数达到该值的分位数才参与基线比较（样本太少时 p95 / p99 接近最大值，波动很大）
+MIN_SAMPLES = {"p50": 1, "p95": 40, "p99": 200}
+
+
+def _bench_env(rate_limit: bool, cassette: Optional[str], replay_latency: float) -> None:
+    """基准只衡量图本身：不读写磁盘缓存，不使用 SQLite，也不在创建 Agent 时预热"""
+    os.environ.setdefault("LLM_API_KEY", "bench")
+    os.environ.setdefault("TAVILY_API_KEY", "bench")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["WARMUP_MODE"] = "off"
+    os.environ["SEARCH_CACHE_ENABLED"] = "false"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["TRACING_ENABLED"] = "true"
+    os.environ.pop("TRACE_DIR", None)
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if rate_limit else "false"
+    if cassette:
+        # 模型与搜索调用从录制的 cassette 回放；假模型只作为占位，不会被调用
+        os.environ["CASSETTE_MODE"] = "replay"
+        os.environ["CASSETTE_DIR"] = cassette
+        os.environ["CASSETTE_REPLAY_LATENCY"] = str(replay_latency)
+    else:
+        os.environ["CASSETTE_MODE"] = "off"
+
+
+def percentiles(values: List[float]) -> dict:
+    ordered = sorted(values) or [0.0]
+    stats = {name: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2) for name, q in PERCENTILES}
+    stats["samples"] = len(values)
+    return stats
+
+
+def questions(count: int, level: int) -> List[str]:
+    return [f"{TOPICS[index % len(TOPICS)]}？（问题 {level}-{index}）" for index in range(count)]
+
+
+def _collect(agent, question: str, thread_id: str) -> dict:
+    from backend.src.agent.tracing import tracer
+
+    start = time.perf_counter()
+    agent.run(question, thread_id)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    # 每个线程 id 只运行一次，立即取回本次 trace，避免被 recent_runs 的容量挤掉
+    return {"elapsed_ms": elapsed_ms, "trace": tracer.recent_runs(thread_id)[-1]}
+
+
+async def _acollect(agent, question: str, thread_id: str, semaphore: asyncio.Semaphore) -> dict:
+    from backend.src.agent.tracing import tracer
+
+    async with semaphore:
+        start = time.perf_counter()
+        await agent.arun(question, thread_id)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return {"elapsed_ms": elapsed_ms, "trace": tracer.recent_runs(thread_id)[-1]}
+
+
+def run_level(profile: FakeProfile, level: int, runs: int, use_async: bool) -> dict:
+    """在并发 level 下运行 runs 个问题，返回端到端、节点与调用的统计"""
+    from backend.src.agent.benchmarks.fakes import create_fake_agent
+
+    agent = create_fake_agent(profile)
+    items = [(question, f"bench-{level}-{index}") for index, question in enumerate(questions(runs, level))]
+
+    start = time.perf_counter()
+    if use_async:
+        async def run_all():
+            semaphore = asyncio.Semaphore(level)
+            return await asyncio.gather(*(_acollect(agent, q, t, semaphore) for q, t in items))
+
+        results = asyncio.run(run_all())
+    else:
+        with ThreadPoolExecutor(max_workers=level, thread_name_prefix="bench-graph") as pool:
+            results = list(pool.map(lambda item: _collect(agent, *item), items))
+    wall_s = time.perf_counter() - start
+
+    nodes: Dict[str, List[float]] = defaultdict(list)
+    calls: Dict[str, int] = defaultdict(int)
+    tokens = loops_saved = tokens_saved = 0
+    for result in results:
+        summary = result["trace"]["summary"]
+        tokens += summary["prompt_tokens"] + summary["completion_tokens"]
+        loops_saved += summary.get("loops_saved", 0)
+        tokens_saved += summary.get("tokens_saved", 0)
+        for span in result["trace"]["spans"]:
+            if span["kind"] == "node":
+                nodes[span["name"]].append(span["wall_ms"])
+            else:
+                calls[span["kind"]] += 1
+    return {
+        "concurrency": level,
+        "runs": runs,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(runs / wall_s, 3),
+        "e2e_ms": percentiles([result["elapsed_ms"] for result in results]),
+        "nodes_ms": {name: percentiles(values) for name, values in sorted(nodes.items())},
+        "calls_per_run": {kind: round(count / runs, 2) for kind, count in sorted(calls.items())},
+        "tokens_per_run": round(tokens / runs, 1),
+        "loops_saved_per_run": round(loops_saved / runs, 2),
+        "tokens_saved_per_run": round(tokens_saved / runs, 1),
+    }
+
+
+def print_level(result: dict) -> None:
+    e2e = result["e2e_ms"]
+    print(f"\n== concurrency {result['concurrency']}: {result['runs']} runs in {result['wall_s']:.2f}s, "
+          f"{result['throughput_rps']:.2f} runs/s")
+    print(f"  {'end-to-end':<30} p50 {e2e['p50']:9.1f}  p95 {e2e['p95']:9.1f}  p99 {e2e['p99']:9.1f} ms")
+    for name, stats in result["nodes_ms"].items():
+        print(f"  {name:<30} p50 {stats['p50']:9.1f}  p95 {stats['p95']:9.1f}  p99 {stats['p99']:9.1f} ms")
+    calls = ", ".join(f"{kind} {count}" for kind, count in result["calls_per_run"].items())
+    print(f"  calls/run: {calls}; tokens/run: {result['tokens_per_run']}; "
+          f"saved/run: {result.get('loops_saved_per_run', 0)} loops, {result.get('tokens_saved_per_run', 0)} tokens")
+
+
+def compare(results: List[dict], baseline: dict, threshold: float, min_ms: float) -> List[str]:
+    """返回超出阈值的退化项；基线中没有的并发档位与节点不比较"""
+    regressions = []
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    for result in results:
+        base = previous.get(result["concurrency"])
+        if base is None:
+            continue
+        prefix = f"concurrency {result['concurrency']}"
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{prefix} throughput {base['throughput_rps']:.2f} -> {result['throughput_rps']:.2f} runs/s")
+        series = [("end-to-end", base["e2e_ms"], result["e2e_ms"])]
+        # 并发时节点耗时主要由排队与线程调度决定，波动远大于阈值；节点只在串行档位比较中位数
+        if result["concurrency"] == 1:
+            series += [(name, base["nodes_ms"][name], stats) for name, stats in result["nodes_ms"].items()
+                       if name in base["nodes_ms"]]
+        for name, before, after in series:
+            for key in ("p50",) if name in result["nodes_ms"] else [key for key, _ in PERCENTILES]:
+                if min(before["samples"], after["samples"]) < MIN_SAMPLES[key]:
+                    continue
+                if before[key] >= min_ms and after[key] > before[key] * (1 + threshold):
+                    regressions.append(f"{prefix} {name} {key} {before[key]:.1f} -> {after[key]:.1f} ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64], help="并发档位")
+    parser.add_argument("--runs", type=int, default=None, help="每个档位的问题数，默认为 max(4 × 并发, 32)")
+    parser.add_argument("--profile", choices=sorted(FakeProfile.PRESETS), default="fast", help="假依赖的延迟预设")
+    parser.add_argument("--llm-ms", type=float, nargs=2, metavar=("MEDIAN", "P99"), help="覆盖模型延迟分布")
+    parser.add_argument("--search-ms", type=float, nargs=2, metavar=("MEDIAN", "P99"), help="覆盖搜索延迟分布")
+    parser.add_argument("--text-chars", type=int, help="覆盖模型输出长度")
+    parser.add_argument("--result-chars", type=int, help="覆盖每条搜索结果的长度")
+    parser.add_argument("--seed", type=int, default=0, help="假依赖的随机种子")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="使用异步图（arun）")
+    parser.add_argument("--rate-limit", action="store_true", help="保留 Configuration 中的限流配置")
+    parser.add_argument("--cassette", help="从该目录的 cassette 回放模型与搜索调用（代替假模型与假搜索）")
+    parser.add_argument("--replay-latency", type=float, default=1.0, help="回放时录制延迟的倍数")
+    parser.add_argument("--baseline", help="与该基线 JSON 比较，退化超过阈值时退出码为 1")
+    parser.add_argument("--save-baseline", help="把本次结果写为基线 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的退化比例")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="低于该值的分位数不参与比较")
+    parser.add_argument("--verbose", action="store_true", help="保留节点的 print 输出")
+    args = parser.parse_args(argv)
+
+    _bench_env(args.rate_limit, args.cassette, args.replay_latency)
+    overrides = {"seed": args.seed}
+    if args.llm_ms:
+        overrides["llm"] = Latency(*args.llm_ms)
+    if args.search_ms:
+        overrides["search"] = Latency(*args.search_ms)
+    if args.text_chars:
+        overrides["text_chars"] = args.text_chars
+    if args.result_chars:
+        overrides["result_chars"] = args.result_chars
+    profile = FakeProfile.preset(args.profile, **overrides)
+
+    results = []
+    for level in args.concurrency:
+        # 节点中的 print 会淹没报告，默认丢弃
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+            result = run_level(profile, level, args.runs or max(4 * level, 32), args.use_async)
+        print_level(result)
+        results.append(result)
+
+    report = {"profile": args.profile, "fakes": profile.to_dict(), "cassette": args.cassette,
+              "async": args.use_async, "levels": results}
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nbaseline saved to {args.save_baseline}")
+
+    if not args.baseline:
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    regressions = compare(results, baseline, args.threshold, args.min_ms)
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nOK: no regression beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
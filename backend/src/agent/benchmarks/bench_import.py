@@ -0,0 +1,104 @@
+"""冷启动基准：在全新子进程中测量 import backend.src.agent.graph 与 warmup() 的耗时
+
+用法：
+    python -m backend.src.agent.benchmarks.bench_import --runs 5 --budget-ms 1000
+
+每次测量都启动一个新的 Python 进程（与自动扩容拉起的新 worker 一致），报告中位数与最大值，
+并用 -X importtime 列出累计耗时最高的模块，便于定位是哪个依赖拖慢了启动。
+import 中位数超过 --budget-ms 时以退出码 1 结束，可直接接入 CI。
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.src.agent.graph
+imported = time.perf_counter()
+report = {}
+if sys.argv[1] == "warmup":
+    from backend.src.agent.warmup import warmup
+    report = warmup()
+print("BENCH " + json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "warmup_ms": (time.perf_counter() - imported) * 1000,
+    "steps": {name: step["ms"] for name, step in report.items()},
+}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+    # 只测 import 本身：不在导入时启动预热线程，也不打开 SQLite checkpointer
+    env.setdefault("WARMUP_MODE", "off")
+    env.setdefault("LLM_API_KEY", "bench")
+    env.setdefault("TAVILY_API_KEY", "bench")
+    return env
+
+
+def run_child(warmup: bool) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, "warmup" if warmup else "import"],
+        cwd=PROJECT_ROOT, env=_child_env(), capture_output=True, text=True, check=True,
+    )
+    line = next(line for line in result.stdout.splitlines() if line.startswith("BENCH "))
+    return json.loads(line[len("BENCH "):])
+
+
+def top_imports(limit: int) -> list:
+    """用 -X importtime 找出累计耗时最高的顶层依赖（只统计第一层缩进，避免父子模块重复计数）"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.src.agent.graph"],
+        cwd=PROJECT_ROOT, env=_child_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for match in IMPORTTIME_LINE.finditer(result.stderr):
+        cumulative_us, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent <= 3:
+            rows.append((cumulative_us / 1000, module))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="每种测量的子进程次数")
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="import 中位数预算（毫秒）")
+    parser.add_argument("--top", type=int, default=8, help="列出耗时最高的模块数")
+    parser.add_argument("--no-warmup", action="store_true", help="跳过 warmup() 测量")
+    args = parser.parse_args()
+
+    imports = [run_child(warmup=False)["import_ms"] for _ in range(args.runs)]
+    print(f"import backend.src.agent.graph ({args.runs} runs): "
+          f"median {statistics.median(imports):7.1f} ms, max {max(imports):7.1f} ms")
+
+    if not args.no_warmup:
+        runs = [run_child(warmup=True) for _ in range(args.runs)]
+        print(f"warmup()                       ({args.runs} runs): "
+              f"median {statistics.median(r['warmup_ms'] for r in runs):7.1f} ms")
+        for step in runs[-1]["steps"]:
+            print(f"  {step:<10} median {statistics.median(r['steps'][step] for r in runs):7.1f} ms")
+
+    print("slowest top-level imports (cumulative):")
+    for ms, module in top_imports(args.top):
+        print(f"  {ms:8.1f} ms  {module}")
+
+    median = statistics.median(imports)
+    if median > args.budget_ms:
+        print(f"FAIL: import median {median:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"OK: import median {median:.1f} ms within budget {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""质量评估两种模式的对比基准：三个并行评估调用（默认）与 fast_quality_mode 的单次合并调用
+
+用法：
+    python -m backend.src.agent.benchmarks.bench_quality --limit 20                        # checkpoint 中最近 20 个线程，线上模型
+    python -m backend.src.agent.benchmarks.bench_quality --synthetic 16 --fake realistic   # 完全离线：合成研究结果 + 假模型
+    python -m backend.src.agent.benchmarks.bench_quality --limit 20 --output cache_data/bench_quality.json
+
+样本默认取 SQLite checkpoint（checkpoint_path，缺省为 cache_data/checkpoints.db）中各线程最新的研究结果，
+也可用 --synthetic 生成。每个样本依次运行两种模式（先后顺序逐个样本交替，抵消模型端的时间漂移），报告：
+
+- 延迟与开销：端到端 p50 / p95、每个样本的模型调用数与 prompt / completion token
+- 一致性（以三个并行调用的结果为参照）：质量、事实置信度、相关性三个分数以及 optimize_summary 使用的综合置信度的
+  平均绝对差与差值不超过 0.1 的比例；覆盖主题、缺失主题、内容空白列表的 Jaccard 重合度；已验证事实与争议声明的数量
+
+--fake 使用 fakes.py 中的假模型，输出是随机的，此时一致性指标没有意义，只比较延迟与 token。
+LLM 缓存在基准中关闭，两种模式都真实调用模型。
+"""
+import argparse
+import contextlib
+import contextvars
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from backend.src.agent.benchmarks.bench_graph import TOPICS, percentiles
+from backend.src.agent.benchmarks.fakes import FakeProfile, fake_text
+
+# 参与比较的分数：(state key, 字段)
+SCORES = (
+    ("content_quality", "quality_score"),
+    ("fact_verification", "confidence_score"),
+    ("relevance_assessment", "relevance_score"),
+)
+# 参与比较的列表：(state key, 字段)
+TOPIC_LISTS = (
+    ("relevance_assessment", "key_topics_covered"),
+    ("relevance_assessment", "missing_topics"),
+    ("content_quality", "content_gaps"),
+)
+CLOSE_ENOUGH = 0.1
+
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="bench-quality")
+
+
+def checkpoint_samples(path: str, limit: int) -> List[dict]:
+    """各线程最新的、带研究结果的 checkpoint 中的 search_query 与 web_research_result"""
+    from backend.src.agent.checkpoint.sqlite_saver import SqliteCheckpointSaver
+
+    if not Path(path).exists():
+        return []
+    saver = SqliteCheckpointSaver(path, compaction_interval=0)
+    samples, seen = [], set()
+    try:
+        for item in saver.list(None):
+            thread_id = item.config["configurable"]["thread_id"]
+            values = item.checkpoint.get("channel_values", {})
+            if thread_id in seen or not values.get("web_research_result"):
+                continue
+            seen.add(thread_id)
+            samples.append({"id": thread_id, "search_query": list(values.get("search_query") or []),
+                            "web_research_result": list(values["web_research_result"])})
+            if len(samples) >= limit:
+                break
+    finally:
+        saver.close()
+    return samples
+
+
+def synthetic_samples(count: int, profile: FakeProfile) -> List[dict]:
+    """用假文本合成研究结果：每个样本 3 条查询、每条查询一段带引用编号的摘要"""
+    samples = []
+    for index in range(count):
+        topic = TOPICS[index % len(TOPICS)]
+        results = []
+        for branch in range(3):
+            rng = profile.rng("bench-quality", index, branch)
+            sentences = [fake_text(rng, 60) + f"[{branch}-{n + 1}]" for n in range(profile.result_chars // 60)]
+            results.append("".join(sentences))
+        samples.append({"id": f"synthetic-{index}", "search_query": [f"{topic}（{n}）" for n in range(3)],
+                        "web_research_result": results})
+    return samples
+
+
+def run_separate(state: dict, config: dict) -> dict:
+    """三个评估节点并行执行（与图中的并行分支一致）"""
+    from backend.src.agent.nodes.access_relevance import assess_relevance
+    from backend.src.agent.nodes.assess_content_quality import assess_content_quality
+    from backend.src.agent.nodes.verify_facts import verify_facts
+
+    futures = [_executor.submit(contextvars.copy_context().run, node, state, config)
+               for node in (assess_content_quality, verify_facts, assess_relevance)]
+    update = {}
+    for future in futures:
+        update.update(future.result())
+    return update
+
+
+def run_fast(state: dict, config: dict) -> dict:
+    from backend.src.agent.nodes.assess_quality import assess_quality
+
+    return assess_quality(state, config)
+
+
+MODES: Dict[str, Callable[[dict, dict], dict]] = {"separate": run_separate, "fast": run_fast}
+
+
+def run_mode(mode: str, sample: dict) -> dict:
+    from backend.src.agent.tracing import tracer
+
+    thread_id = f"bench-quality-{mode}-{sample['id']}"
+    config = {"configurable": {"thread_id": thread_id}}
+    state = {"search_query": sample["search_query"], "web_research_result": sample["web_research_result"]}
+    start = time.perf_counter()
+    update, error = None, None
+    with tracer.run(thread_id, config):
+        try:
+            update = MODES[mode](state, config)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    summary = tracer.recent_runs(thread_id)[-1]["summary"]
+    return {
+        "elapsed_ms": elapsed_ms,
+        "llm_calls": sum(call["count"] for name, call in summary["calls"].items() if name.startswith("llm:")),
+        "prompt_tokens": summary["prompt_tokens"],
+        "completion_tokens": summary["completion_tokens"],
+        "update": update,
+        "error": error,
+    }
+
+
+def _terms(items: list) -> set:
+    from backend.src.agent.cache.search_cache import normalize_query
+
+    return {normalize_query(str(item)) for item in items or []}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def agreement(reference: dict, candidate: dict) -> dict:
+    """candidate 相对 reference 的分数差与列表重合度"""
+    result = {}
+    for key, field in SCORES:
+        result[field] = abs(reference[key][field] - candidate[key][field])
+    final = [sum(update[key][field] for key, field in SCORES) / len(SCORES) for update in (reference, candidate)]
+    result["final_confidence"] = abs(final[0] - final[1])
+    for key, field in TOPIC_LISTS:
+        result[field] = _jaccard(_terms(reference[key][field]), _terms(candidate[key][field]))
+    return result
+
+
+def summarize(samples: List[dict], runs: Dict[str, List[dict]]) -> dict:
+    report = {"samples": len(samples), "modes": {}}
+    for mode, results in runs.items():
+        ok = [result for result in results if result["error"] is None]
+        count = max(len(ok), 1)
+        report["modes"][mode] = {
+            "errors": len(results) - len(ok),
+            "latency_ms": percentiles([result["elapsed_ms"] for result in ok]),
+            "llm_calls": round(sum(result["llm_calls"] for result in ok) / count, 2),
+            "prompt_tokens": round(sum(result["prompt_tokens"] for result in ok) / count, 1),
+            "completion_tokens": round(sum(result["completion_tokens"] for result in ok) / count, 1),
+            "verified_facts": round(sum(len(r["update"]["fact_verification"]["verified_facts"]) for r in ok) / count, 2),
+            "disputed_claims": round(sum(len(r["update"]["fact_verification"]["disputed_claims"]) for r in ok) / count, 2),
+        }
+
+    pairs = [agreement(separate["update"], fast["update"])
+             for separate, fast in zip(runs["separate"], runs["fast"])
+             if separate["error"] is None and fast["error"] is None]
+    report["agreement"] = {"pairs": len(pairs)}
+    for field in pairs[0] if pairs else []:
+        values = [pair[field] for pair in pairs]
+        if field in {name for _, name in TOPIC_LISTS}:
+            report["agreement"][field] = {"jaccard": round(sum(values) / len(values), 3)}
+        else:
+            report["agreement"][field] = {
+                "mean_abs_diff": round(sum(values) / len(values), 3),
+                "within_0.1": round(sum(value <= CLOSE_ENOUGH for value in values) / len(values), 3),
+            }
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"\n== {report['samples']} samples")
+    for mode, stats in report["modes"].items():
+        latency = stats["latency_ms"]
+        print(f"  {mode:<10} p50 {latency['p50']:9.1f}  p95 {latency['p95']:9.1f} ms  "
+              f"calls {stats['llm_calls']:4.1f}  prompt {stats['prompt_tokens']:9.1f}  "
+              f"completion {stats['completion_tokens']:8.1f} tokens  errors {stats['errors']}")
+    separate, fast = report["modes"]["separate"], report["modes"]["fast"]
+    if separate["latency_ms"]["p50"] and separate["prompt_tokens"]:
+        print(f"  fast / separate: p50 latency {fast['latency_ms']['p50'] / separate['latency_ms']['p50']:.2f}x, "
+              f"prompt tokens {fast['prompt_tokens'] / separate['prompt_tokens']:.2f}x")
+    print(f"\n== agreement of fast with separate ({report['agreement']['pairs']} pairs)")
+    for field, stats in report["agreement"].items():
+        if field == "pairs":
+            continue
+        if "jaccard" in stats:
+            print(f"  {field:<24} jaccard {stats['jaccard']:.3f}")
+        else:
+            print(f"  {field:<24} mean |diff| {stats['mean_abs_diff']:.3f}  within {CLOSE_ENOUGH}: "
+                  f"{stats['within_0.1']:.0%}")
+    print(f"  {'verified_facts':<24} {separate['verified_facts']:.2f} -> {fast['verified_facts']:.2f} per sample")
+    print(f"  {'disputed_claims':<24} {separate['disputed_claims']:.2f} -> {fast['disputed_claims']:.2f} per sample")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint-path", help="SQLite checkpoint 文件，默认取 Configuration.checkpoint_path")
+    parser.add_argument("--limit", type=int, default=20, help="最多取多少个线程作为样本")
+    parser.add_argument("--synthetic", type=int, help="改用该数量的合成样本")
+    parser.add_argument("--fake", choices=sorted(FakeProfile.PRESETS), help="使用该延迟预设的假模型（离线）")
+    parser.add_argument("--seed", type=int, default=0, help="合成样本与假模型的随机种子")
+    parser.add_argument("--output", help="把报告写为 JSON")
+    parser.add_argument("--verbose", action="store_true", help="保留节点的 print 输出")
+    args = parser.parse_args(argv)
+
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["TRACING_ENABLED"] = "true"
+    os.environ.pop("TRACE_DIR", None)
+    profile = FakeProfile.preset(args.fake or "fast", seed=args.seed)
+    if args.fake:
+        from backend.src.agent.benchmarks.fakes import install_fakes
+
+        os.environ.setdefault("LLM_API_KEY", "bench")
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        install_fakes(profile)
+
+    if args.synthetic:
+        samples = synthetic_samples(args.synthetic, profile)
+    else:
+        from backend.src.agent.cache.search_cache import DEFAULT_CACHE_DIR
+        from backend.src.agent.config.configuration import Configuration
+
+        path = args.checkpoint_path or Configuration.from_runnable_config().checkpoint_path \
+            or str(DEFAULT_CACHE_DIR / "checkpoints.db")
+        samples = checkpoint_samples(path, args.limit)
+        if not samples:
+            print(f"⚠️ {path} 中没有带研究结果的线程，可改用 --synthetic")
+            return 2
+
+    # 先用第一个样本把两种模式各跑一次，jieba 词典、HTTP 连接等一次性开销不计入结果
+    with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+        for mode in MODES:
+            run_mode(mode, {**samples[0], "id": "warmup"})
+
+    runs: Dict[str, List[dict]] = {mode: [] for mode in MODES}
+    for index, sample in enumerate(samples):
+        order = list(MODES) if index % 2 == 0 else list(reversed(MODES))
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+            results = {mode: run_mode(mode, sample) for mode in order}
+        for mode in MODES:
+            runs[mode].append(results[mode])
+            if results[mode]["error"]:
+                print(f"⚠️ {sample['id']} {mode}: {results[mode]['error']}", file=sys.stderr)
+
+    report = summarize(samples, runs)
+    report["fake"] = args.fake
+    print_report(report)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nreport saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
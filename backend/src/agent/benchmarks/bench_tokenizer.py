@@ -0,0 +1,67 @@
+"""分词缓存微基准：对比每次上下文构建中历史过滤的分词开销
+
+用法：
+    python -m backend.src.agent.benchmarks.bench_tokenizer --turns 40 --builds 50
+
+before 使用不缓存的分词器（等价于直接调用 jieba.cut），after 使用带 LRU 缓存的 JiebaTokenizer。
+每次“构建”都会对同一段历史执行 filter_history_packet，与一轮对话中多个节点重复构建上下文的情况一致。
+"""
+import argparse
+import random
+import time
+
+import jieba
+from hello_agents.context import ContextPacket
+
+from backend.src.agent.contextbuilder.MyContextBuilder import MyContextBuilder
+from backend.src.agent.contextbuilder.tokenizer import JiebaTokenizer
+
+TOPICS = [
+    "吉他入门需要先练习哪些和弦，每天练习多长时间比较合适",
+    "减肥期间的饮食计划应该如何安排碳水化合物和蛋白质的比例",
+    "Pandas 读取大文件时如何优化内存占用并提升处理速度",
+    "新能源汽车的电池寿命与充电习惯之间有什么关系",
+    "如何制定一份适合初学者的长期投资理财计划",
+]
+
+
+def make_history(turns: int) -> str:
+    random.seed(0)
+    lines = []
+    for i in range(turns):
+        topic = random.choice(TOPICS)
+        lines.append(f"[user] 第{i}轮：{topic}？")
+        lines.append(f"[assistant] 关于{topic}，这里有几点建议：" + "；".join(random.sample(TOPICS, 3)) + "。")
+    return "\n".join(lines)
+
+
+def bench(builder: MyContextBuilder, history: str, query: str, builds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(builds):
+        packet = ContextPacket(content=history, metadata={"type": "history"}, token_count=1)
+        builder.filter_history_packet(packet, query, builder.tokenize, min_score=0.25)
+    return (time.perf_counter() - start) / builds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40, help="对话历史轮数")
+    parser.add_argument("--builds", type=int, default=50, help="重复构建次数")
+    args = parser.parse_args()
+
+    jieba.initialize()  # 词典加载不计入结果
+    history = make_history(args.turns)
+    query = "吉他和弦每天应该练习多久"
+
+    before = bench(MyContextBuilder(tokenizer=JiebaTokenizer(max_entries=0)), history, query, args.builds)
+    cached_tokenizer = JiebaTokenizer()
+    after = bench(MyContextBuilder(tokenizer=cached_tokenizer), history, query, args.builds)
+
+    print(f"history turns: {args.turns}, builds: {args.builds}")
+    print(f"before (uncached jieba): {before:8.2f} ms/build")
+    print(f"after  (cached + batch): {after:8.2f} ms/build")
+    print(f"speedup: {before / after:.1f}x, cache: {cached_tokenizer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""离线基准用的确定性假依赖：模型、Tavily 搜索、MemoryTool 与 RAGTool
+
+所有假对象的输出与延迟都由请求内容（prompt / 查询）的哈希和 seed 决定，同一请求在任意并发、
+任意执行顺序下都得到相同的结果与延迟，因此不同版本之间的基准结果可以直接比较。
+
+用法：
+    from backend.src.agent.benchmarks.fakes import FakeProfile, create_fake_agent
+
+    agent = create_fake_agent(FakeProfile.preset("realistic"))
+    agent.run("吉他新手应该怎么练习？", thread_id="bench-1")
+"""
+import asyncio
+import hashlib
+import math
+import random
+import time
+import typing
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+WORDS = [
+    "吉他", "和弦", "练习", "节奏", "指法", "入门", "教程", "音阶", "乐理", "扫弦",
+    "饮食", "计划", "蛋白质", "睡眠", "训练", "数据", "内存", "性能", "索引", "缓存",
+    "电池", "充电", "寿命", "投资", "风险", "收益", "研究", "报告", "方法", "案例",
+]
+
+
+class Latency:
+    """对数正态延迟分布，用中位数与 p99（毫秒）描述；两者相等时为固定延迟"""
+
+    def __init__(self, median_ms: float, p99_ms: Optional[float] = None):
+        self.median_ms = median_ms
+        self.p99_ms = p99_ms if p99_ms is not None else median_ms
+        # p99 = median * exp(2.326 * sigma)
+        self.sigma = math.log(self.p99_ms / median_ms) / 2.326 if median_ms > 0 and self.p99_ms > median_ms else 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """返回一次调用的延迟（秒）"""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(self.sigma * rng.gauss(0.0, 1.0)) / 1000
+
+    def __repr__(self) -> str:
+        return f"Latency(median_ms={self.median_ms}, p99_ms={self.p99_ms})"
+
+
+class FakeProfile:
+    """假依赖的延迟分布与返回内容大小
+
+    Args:
+        llm: 模型调用延迟
+        search: Tavily 搜索延迟
+        memory: MemoryTool 调用延迟
+        rag: RAGTool 检索延迟
+        text_chars: 模型文本输出与结构化输出中字符串字段的长度
+        list_items: 结构化输出中列表字段的元素数（搜索查询数也由它决定）
+        search_results: 每次搜索返回的结果数
+        result_chars: 每条搜索结果 content 的长度
+        sufficient_rate: reflection 判定信息已充足的概率，决定 research loop 的平均轮数
+        seed: 随机种子，与请求内容的哈希一起决定输出与延迟
+    """
+
+    PRESETS = {
+        # 只衡量图本身的调度与上下文构建开销
+        "zero": dict(llm=Latency(0), search=Latency(0), memory=Latency(0), rag=Latency(0)),
+        "fast": dict(llm=Latency(20, 60), search=Latency(15, 40), memory=Latency(2, 5), rag=Latency(3, 8)),
+        # 接近线上 qwen + Tavily 的形状（缩短为 1/10，保证基准在几分钟内跑完）
+        "realistic": dict(llm=Latency(150, 900), search=Latency(80, 400), memory=Latency(5, 30),
+                          rag=Latency(10, 60), text_chars=1200, search_results=5, result_chars=1500),
+    }
+
+    def __init__(self, llm: Latency = Latency(20, 60), search: Latency = Latency(15, 40),
+                 memory: Latency = Latency(2, 5), rag: Latency = Latency(3, 8), text_chars: int = 400,
+                 list_items: int = 3, search_results: int = 3, result_chars: int = 600,
+                 sufficient_rate: float = 0.5, seed: int = 0):
+        self.llm = llm
+        self.search = search
+        self.memory = memory
+        self.rag = rag
+        self.text_chars = text_chars
+        self.list_items = list_items
+        self.search_results = search_results
+        self.result_chars = result_chars
+        self.sufficient_rate = sufficient_rate
+        self.seed = seed
+
+    @classmethod
+    def preset(cls, name: str, **overrides) -> "FakeProfile":
+        return cls(**{**cls.PRESETS[name], **overrides})
+
+    def rng(self, *parts: Any) -> random.Random:
+        """按请求内容派生的随机数生成器：相同请求总是得到相同的输出与延迟"""
+        digest = hashlib.sha256(repr((self.seed, *parts)).encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def to_dict(self) -> dict:
+        return {key: repr(value) if isinstance(value, Latency) else value for key, value in vars(self).items()}
+
+
+def fake_text(rng: random.Random, chars: int) -> str:
+    parts, length = [], 0
+    while length < chars:
+        sentence = "".join(rng.choice(WORDS) for _ in range(rng.randint(4, 9))) + "。"
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:max(chars, 1)]
+
+
+def _prompt_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(getattr(message, "content", message)) for message in messages)
+
+
+class _FakeSchemaBuilder:
+    """按 pydantic 字段类型生成结构化输出：字符串、数值、布尔、列表、字典、Literal 与嵌套模型"""
+
+    def __init__(self, profile: FakeProfile, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+
+    def build(self, schema: typing.Type[BaseModel]) -> BaseModel:
+        return schema(**{name: self.value(field.annotation, name) for name, field in schema.model_fields.items()})
+
+    def value(self, annotation: Any, name: str) -> Any:
+        origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+        if origin is typing.Literal:
+            return self.rng.choice(args)
+        if origin is typing.Union:
+            return self.value(next(arg for arg in args if arg is not type(None)), name)
+        if origin in (list, List):
+            return [self.value(args[0] if args else str, name) for _ in range(self.profile.list_items)]
+        if origin in (dict, Dict):
+            return {"claim": fake_text(self.rng, 40), "source": f"https://example.com/{self.rng.randint(1, 999)}"}
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return self.build(annotation)
+        if annotation is bool:
+            return self.rng.random() < self.profile.sufficient_rate
+        if annotation is float:
+            return round(self.rng.uniform(0.5, 0.95), 2)
+        if annotation is int:
+            return self.rng.randint(1, 5)
+        if name in ("query", "follow_up_queries"):
+            return " ".join(self.rng.sample(WORDS, 3))
+        return fake_text(self.rng, self.profile.text_chars if name.endswith("summary") else self.profile.text_chars // 4)
+
+
+class FakeChatModel:
+    """ChatOpenAI 的替身：invoke / ainvoke 返回带 usage_metadata 的 AIMessage，支持 with_structured_output"""
+
+    def __init__(self, profile: FakeProfile, model_name: str = "fake-bench", temperature: float = 0.0):
+        self.profile = profile
+        self.model_name = model_name
+        self.temperature = temperature
+
+    def with_structured_output(self, schema, **kwargs) -> "FakeStructuredModel":
+        return FakeStructuredModel(self, schema)
+
+    def _respond(self, messages: Any):
+        prompt = _prompt_text(messages)
+        rng = self.profile.rng(self.model_name, prompt)
+        content = fake_text(rng, self.profile.text_chars) + " https://example.com/source"
+        usage = {"input_tokens": len(prompt) // 2, "output_tokens": len(content) // 2}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return self.profile.llm.sample(rng), AIMessage(content=content, usage_metadata=usage)
+
+    def invoke(self, messages: Any, *args, **kwargs) -> AIMessage:
+        delay, message = self._respond(messages)
+        time.sleep(delay)
+        return message
+
+    async def ainvoke(self, messages: Any, *args, **kwargs) -> AIMessage:
+        delay, message = self._respond(messages)
+        await asyncio.sleep(delay)
+        return message
+
+
+class FakeStructuredModel:
+    def __init__(self, llm: FakeChatModel, schema: typing.Type[BaseModel]):
+        self.llm = llm
+        self.schema = schema
+
+    def _respond(self, messages: Any):
+        rng = self.llm.profile.rng(self.llm.model_name, self.schema.__name__, _prompt_text(messages))
+        return self.llm.profile.llm.sample(rng), _FakeSchemaBuilder(self.llm.profile, rng).build(self.schema)
+
+    def invoke(self, messages: Any, *args, **kwargs) -> BaseModel:
+        delay, result = self._respond(messages)
+        time.sleep(delay)
+        return result
+
+    async def ainvoke(self, messages: Any, *args, **kwargs) -> BaseModel:
+        delay, result = self._respond(messages)
+        await asyncio.sleep(delay)
+        return result
+
+
+class FakeSearchTool:
+    """TavilySearch 的替身，返回与 Tavily 相同结构的结果"""
+
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.search_depth = "advanced"
+        self.max_results = profile.search_results
+        self.topic = "general"
+
+    def _respond(self, query: Any):
+        query = query.get("query", "") if isinstance(query, dict) else str(query)
+        rng = self.profile.rng("search", query)
+        results = [{
+            "title": f"{query} - {fake_text(rng, 12)}",
+            "url": f"https://example.com/{rng.randint(1, 999)}/{index}",
+            "content": fake_text(rng, self.profile.result_chars),
+            "score": round(rng.uniform(0.3, 0.99), 3),
+        } for index in range(self.profile.search_results)]
+        return self.profile.search.sample(rng), {"query": query, "results": results, "response_time": 0.0}
+
+    def invoke(self, query: Any, *args, **kwargs) -> dict:
+        delay, result = self._respond(query)
+        time.sleep(delay)
+        return result
+
+    async def ainvoke(self, query: Any, *args, **kwargs) -> dict:
+        delay, result = self._respond(query)
+        await asyncio.sleep(delay)
+        return result
+
+
+class FakeMemoryTool:
+    """MemoryTool 的替身：search 返回固定格式的记忆文本，add 只计数"""
+
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.added = 0
+
+    def execute(self, action: str, **kwargs) -> str:
+        rng = self.profile.rng("memory", action, kwargs.get("query") or kwargs.get("content"))
+        time.sleep(self.profile.memory.sample(rng))
+        if action == "add":
+            self.added += 1
+            return "✅ 记忆已添加"
+        limit = kwargs.get("limit", 3)
+        return "\n".join(f"{index + 1}. [{rng.choice(['working', 'episodic', 'semantic'])}] "
+                         f"{fake_text(rng, 80)}" for index in range(limit))
+
+
+class FakeRAGTool:
+    """RAGTool 的替身：search 返回若干段知识库文本"""
+
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+
+    def run(self, params: dict) -> str:
+        rng = self.profile.rng("rag", params.get("query"))
+        time.sleep(self.profile.rag.sample(rng))
+        return "\n\n".join(fake_text(rng, 300) for _ in range(min(params.get("top_k", 3), 3)))
+
+
+def install_fakes(profile: FakeProfile) -> None:
+    """用假模型与假搜索替换 ModelInstances 的全部角色（get_chat_model / get_search_tool 优先返回它们）"""
+    from backend.src.agent.models.LLM_MODEL import ModelInstances
+
+    for attribute in ("query_generator_model", "reflection_model", "answer_model", "leader_llm"):
+        setattr(ModelInstances, attribute, FakeChatModel(profile))
+    ModelInstances.tavily_search = FakeSearchTool(profile)
+
+
+def create_fake_agent(profile: Optional[FakeProfile] = None, **kwargs):
+    """创建一个完全离线的 MyDeepResearchAgent：模型、搜索、记忆与知识库全部使用假对象
+
+    kwargs 原样传给 MyDeepResearchAgent（如 checkpointer）。
+    """
+    from backend.src.agent.graph import MyDeepResearchAgent
+
+    profile = profile or FakeProfile()
+    install_fakes(profile)
+    return MyDeepResearchAgent(memory_tool=FakeMemoryTool(profile), rag_tool=FakeRAGTool(profile), **kwargs)
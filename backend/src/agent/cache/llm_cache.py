@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from typing import Any, Optional, Type
+
+from pydantic import BaseModel
+
+from backend.src.agent.cache.search_cache import DEFAULT_CACHE_DIR
+from backend.src.agent.cache.sqlite_store import SqliteTTLStore
+
+
+def render_messages(messages: Any) -> str:
+    """把 prompt（字符串或消息列表）渲染为稳定的文本，用于计算缓存 key"""
+    if isinstance(messages, str):
+        return messages
+    return json.dumps(
+        [[getattr(m, "type", type(m).__name__), getattr(m, "content", str(m))] for m in messages],
+        ensure_ascii=False,
+    )
+
+
+class LLMCache:
+    """结构化输出的内容寻址缓存：key 由模型名、温度、schema 与完整 prompt 的哈希组成
+
+    缓存的是解析后的 pydantic 结果（JSON），命中时直接还原为 schema 实例。
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 86400, max_entries: int = 5000):
+        self.store = SqliteTTLStore(path, "llm_cache", ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._node_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name: str, temperature: Optional[float], schema: Type[BaseModel], messages: Any) -> str:
+        digest = hashlib.sha256()
+        # schema 定义变化后旧结果不再适用，因此把 JSON schema 一并纳入 key
+        schema_json = json.dumps(schema.model_json_schema(), sort_keys=True, ensure_ascii=False)
+        for part in (model_name, repr(temperature), schema.__name__, schema_json, render_messages(messages)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str, schema: Type[BaseModel], node: str) -> Optional[BaseModel]:
+        value = self.store.get(key)
+        result = None
+        if value is not None:
+            try:
+                result = schema.model_validate_json(value)
+            except ValueError:
+                self.store.delete(key)
+        with self._lock:
+            self._node_stats[node]["hits" if result is not None else "misses"] += 1
+        return result
+
+    def set(self, key: str, result: BaseModel) -> None:
+        self.store.set(key, result.model_dump_json())
+
+    def stats(self) -> dict:
+        with self._lock:
+            nodes = {node: dict(counts) for node, counts in self._node_stats.items()}
+        return {**self.store.stats(), "nodes": nodes}
+
+
+_caches: dict[str, LLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(path: Optional[str] = None, ttl_seconds: float = 7 * 86400, max_entries: int = 5000) -> LLMCache:
+    """按路径复用进程内的 LLMCache 实例，TTL 与容量以最近一次传入的配置为准"""
+    path = path or str(DEFAULT_CACHE_DIR / "llm_cache.db")
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = LLMCache(path, ttl_seconds=ttl_seconds, max_entries=max_entries)
+            _caches[path] = cache
+        cache.store.ttl_seconds = ttl_seconds
+        cache.store.max_entries = max_entries
+        return cache
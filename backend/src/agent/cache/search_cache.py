@@ -0,0 +1,74 @@
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Optional
+
+from backend.src.agent.cache.sqlite_store import SqliteTTLStore
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "cache_data"
+
+_CJK = r"㐀-䶿一-鿿豈-﫿"
+
+
+def normalize_query(query: str) -> str:
+    """归一化搜索查询：全角转半角、统一小写、去标点、折叠空白
+
+    中文字符之间的空白也会被去掉，因此“吉他 入门”与“吉他入门”视为同一查询。
+    """
+    text = unicodedata.normalize("NFKC", query).lower()
+    # 标点与符号统一替换为空格（保留 site:、"精确短语"、-排除词 等搜索语法用到的字符）
+    text = "".join(
+        " " if unicodedata.category(ch)[0] in ("P", "S") and ch not in ':._-"' else ch
+        for ch in text
+    )
+    text = re.sub(r"\s+", " ", text).strip()
+    return re.sub(rf"(?<=[{_CJK}]) (?=[{_CJK}])", "", text)
+
+
+class SearchCache:
+    """Tavily 搜索结果的持久化缓存，key 为归一化查询 + 搜索参数"""
+
+    def __init__(self, path: str, ttl_seconds: float = 86400, max_entries: int = 10000):
+        self.store = SqliteTTLStore(path, "search_cache", ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    @staticmethod
+    def make_key(query: str, params: dict) -> str:
+        payload = json.dumps({"q": normalize_query(query), "params": params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, params: dict) -> Optional[Any]:
+        value = self.store.get(self.make_key(query, params))
+        return json.loads(value) if value is not None else None
+
+    def set(self, query: str, params: dict, result: Any) -> None:
+        # 出错的结果不缓存
+        if isinstance(result, dict) and result.get("error"):
+            return
+        try:
+            value = json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        self.store.set(self.make_key(query, params), value)
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+_caches: dict[str, SearchCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_search_cache(path: Optional[str] = None, ttl_seconds: float = 86400, max_entries: int = 10000) -> SearchCache:
+    """按路径复用进程内的 SearchCache 实例，TTL 与容量以最近一次传入的配置为准"""
+    path = path or str(DEFAULT_CACHE_DIR / "search_cache.db")
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = SearchCache(path, ttl_seconds=ttl_seconds, max_entries=max_entries)
+            _caches[path] = cache
+        cache.store.ttl_seconds = ttl_seconds
+        cache.store.max_entries = max_entries
+        return cache
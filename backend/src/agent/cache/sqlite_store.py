@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class SqliteTTLStore:
+    """基于本地 SQLite 的键值缓存，支持 TTL 过期与按最近访问时间的 LRU 淘汰
+
+    采用 WAL 模式，允许多个进程/线程同时读；同一实例内的写操作由锁串行化。
+    命中时不立即写回访问时间：距上次记录超过 ACCESS_INTERVAL 秒的访问先缓存在内存中，
+    随下一次 set 或攒够 ACCESS_FLUSH_EVERY 条时批量写回，读路径上不再每次开启写事务。
+    条目数在内存中维护，每次过期清理时与表中实际行数（可能有其他进程写入）重新对齐。
+    """
+
+    # 每写入多少次做一次过期清理，避免每次写都全表扫描
+    PURGE_EVERY = 200
+    # LRU 只需要粗粒度的访问时间：同一条目在该间隔内的重复访问不再记录
+    ACCESS_INTERVAL = 60.0
+    ACCESS_FLUSH_EVERY = 64
+
+    def __init__(self, path: str, table: str, ttl_seconds: float = 86400, max_entries: int = 10000):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._pending_access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_last_access ON {table}(last_access)")
+        self._conn.commit()
+        self._count = self._count_rows()
+
+    def _count_rows(self) -> int:
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return count
+
+    def _flush_access_locked(self) -> None:
+        """把缓存的访问时间写入当前事务（由调用方提交）"""
+        if self._pending_access:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET last_access = ? WHERE key = ? AND last_access < ?",
+                [(at, key, at) for key, at in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at, last_access FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at, last_access = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._count -= self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,)).rowcount
+                self._conn.commit()
+                self._pending_access.pop(key, None)
+                self.misses += 1
+                return None
+            if now - self._pending_access.get(key, last_access) > self.ACCESS_INTERVAL:
+                self._pending_access[key] = now
+                if len(self._pending_access) >= self.ACCESS_FLUSH_EVERY:
+                    self._flush_access_locked()
+                    self._conn.commit()
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._flush_access_locked()
+            self._pending_access.pop(key, None)
+            exists = self._conn.execute(f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._count += exists is None
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                if self.ttl_seconds:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._count = self._count_rows()
+            # LRU：超出容量时删除最久未访问的条目
+            if self._count > self.max_entries:
+                self._count -= self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                    (self._count - self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._count -= self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,)).rowcount
+            self._conn.commit()
+            self._pending_access.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self._pending_access.clear()
+            self._count = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._count = self._count_rows()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": size,
+        }
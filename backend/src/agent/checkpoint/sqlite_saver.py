@@ -0,0 +1,393 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+from backend.src.agent.cache.search_cache import DEFAULT_CACHE_DIR
+from backend.src.agent.config.configuration import Configuration
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+    "parent_checkpoint_id TEXT, type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB, "
+    "created_at REAL NOT NULL, PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+    # 通道值按版本单独存储：相邻 checkpoint 未变化的通道（如很长的 messages）只存一份
+    "CREATE TABLE IF NOT EXISTS blobs ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, channel TEXT NOT NULL, version TEXT NOT NULL, "
+    "type TEXT NOT NULL, value BLOB, PRIMARY KEY (thread_id, checkpoint_ns, channel, version))",
+    "CREATE TABLE IF NOT EXISTS writes ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+    "task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, value BLOB, "
+    "task_path TEXT NOT NULL DEFAULT '', "
+    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))",
+    "CREATE TABLE IF NOT EXISTS threads (thread_id TEXT PRIMARY KEY, last_access REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_threads_last_access ON threads(last_access)",
+]
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """基于本地 SQLite（WAL 模式）的 LangGraph checkpointer
+
+    - 每个 (thread, namespace) 只保留最近 keep_last 个 checkpoint，旧 checkpoint 的
+      pending writes 与不再被引用的通道值在压缩时一并删除
+    - 超过 thread_ttl 秒未写入的线程整体过期
+    - compaction_interval > 0 时在后台线程定期压缩；也可手动调用 compact()
+    - 进程重启后用同一文件重建 saver，即可从最后一个 checkpoint 续跑中断的线程，
+      已完成节点的 writes 会被复用而不会重新执行
+
+    异步方法在默认线程池中执行同步实现。
+    """
+
+    def __init__(self, path: str, keep_last: int = 5, thread_ttl: Optional[float] = 7 * 86400,
+                 compaction_interval: float = 300, serde: Optional[SerializerProtocol] = None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = max(1, keep_last)
+        self.thread_ttl = thread_ttl
+        self.compaction_interval = compaction_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        self.last_compaction: Dict[str, int] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+        if compaction_interval and compaction_interval > 0:
+            self._compactor = threading.Thread(target=self._compaction_loop, name="checkpoint-compaction",
+                                               daemon=True)
+            self._compactor.start()
+
+    # ---------- 读取 ----------
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        channel_values: Dict[str, Any] = {}
+        for channel, version in versions.items():
+            row = self._conn.execute(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row and row[0] != "empty":
+                channel_values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return channel_values
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        rows = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple,
+                  metadata: Optional[CheckpointMetadata] = None) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_b))
+        if metadata is None:
+            metadata = self.serde.loads_typed((metadata_type, metadata_b))
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=metadata,
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                  "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints")
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+
+        # 先在锁内物化结果，避免生成器跨 yield 持锁
+        results: List[CheckpointTuple] = []
+        with self._lock:
+            for thread_id, checkpoint_ns, *row in self._conn.execute(query, params).fetchall():
+                if limit is not None and len(results) >= limit:
+                    break
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if filter and not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(self._to_tuple(thread_id, checkpoint_ns, tuple(row), metadata))
+        yield from results
+
+    # ---------- 写入 ----------
+
+    def _touch(self, thread_id: str, now: float) -> None:
+        self._conn.execute(
+            "INSERT INTO threads (thread_id, last_access) VALUES (?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET last_access = excluded.last_access",
+            (thread_id, now),
+        )
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        blob_rows = []
+        for channel, version in new_versions.items():
+            type_, value = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")
+            blob_rows.append((thread_id, checkpoint_ns, channel, str(version), type_, value))
+        type_, checkpoint_b = self.serde.dumps_typed(c)
+        metadata_type, metadata_b = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        now = time.time()
+
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, checkpoint_b, metadata_type, metadata_b, now),
+            )
+            self._touch(thread_id, now)
+            self._conn.commit()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, value_b = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, type_, value_b, task_path))
+        # 特殊通道（错误、中断等）覆盖写；普通 writes 已存在则保留首次结果
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self._lock:
+            self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._touch(thread_id, time.time())
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_thread_locked(thread_id)
+            self._conn.commit()
+
+    def _delete_thread_locked(self, thread_id: str) -> None:
+        for table in ("checkpoints", "blobs", "writes", "threads"):
+            self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ---------- 压缩与过期 ----------
+
+    def compact(self) -> Dict[str, int]:
+        """过期空闲线程，并把每个 (thread, namespace) 裁剪到最近 keep_last 个 checkpoint"""
+        stats = {"expired_threads": 0, "checkpoints": 0, "writes": 0, "blobs": 0}
+        with self._lock:
+            if self.thread_ttl:
+                expired = [row[0] for row in self._conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_access < ?", (time.time() - self.thread_ttl,)
+                ).fetchall()]
+                for thread_id in expired:
+                    self._delete_thread_locked(thread_id)
+                stats["expired_threads"] = len(expired)
+
+            groups = self._conn.execute(
+                "SELECT thread_id, checkpoint_ns FROM checkpoints GROUP BY thread_id, checkpoint_ns "
+                "HAVING COUNT(*) > ?", (self.keep_last,)
+            ).fetchall()
+            for thread_id, checkpoint_ns in groups:
+                kept = self._conn.execute(
+                    "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT ?", (thread_id, checkpoint_ns, self.keep_last),
+                ).fetchall()
+                oldest_kept = kept[-1][0]
+                stats["checkpoints"] += self._conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                    (thread_id, checkpoint_ns, oldest_kept),
+                ).rowcount
+                stats["writes"] += self._conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                    (thread_id, checkpoint_ns, oldest_kept),
+                ).rowcount
+
+                # 只保留仍被剩余 checkpoint 引用的通道版本
+                referenced = set()
+                for _, type_, checkpoint_b in kept:
+                    versions = self.serde.loads_typed((type_, checkpoint_b))["channel_versions"]
+                    referenced.update((channel, str(version)) for channel, version in versions.items())
+                stale = [
+                    (thread_id, checkpoint_ns, channel, version)
+                    for channel, version in self._conn.execute(
+                        "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+                        (thread_id, checkpoint_ns),
+                    ).fetchall()
+                    if (channel, version) not in referenced
+                ]
+                self._conn.executemany(
+                    "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                    stale,
+                )
+                stats["blobs"] += len(stale)
+            self._conn.commit()
+        self.last_compaction = stats
+        return stats
+
+    def _compaction_loop(self) -> None:
+        while not self._stop.wait(self.compaction_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"⚠️ checkpoint 压缩失败: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("threads", "checkpoints", "writes", "blobs")
+            }
+        return {**counts, "last_compaction": self.last_compaction}
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5)
+        with self._lock:
+            self._conn.close()
+
+    # ---------- 异步接口：在线程池中执行同步实现 ----------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer(configurable: Optional[Configuration] = None) -> BaseCheckpointSaver:
+    """按配置创建 checkpointer：checkpoint_backend 为 "memory" 时退回进程内 InMemorySaver"""
+    configurable = configurable or Configuration.from_runnable_config()
+    if configurable.checkpoint_backend == "memory":
+        return InMemorySaver()
+    if configurable.checkpoint_backend != "sqlite":
+        raise ValueError(f"未知的 checkpoint_backend: {configurable.checkpoint_backend}")
+    return SqliteCheckpointSaver(
+        configurable.checkpoint_path or str(DEFAULT_CACHE_DIR / "checkpoints.db"),
+        keep_last=configurable.checkpoint_keep_last,
+        thread_ttl=configurable.checkpoint_thread_ttl,
+        compaction_interval=configurable.checkpoint_compaction_interval,
+    )
@@ -0,0 +1,122 @@
+"""命令行入口：流式渲染深度研究过程与最终答案
+
+用法：
+    python -m backend.src.agent.cli "我想要学习吉他，是个新手，我应该怎么做？" --thread-id demo
+    python -m backend.src.agent.cli --thread-id demo          # 交互模式，逐轮提问
+"""
+import argparse
+import asyncio
+import sys
+
+from backend.src.agent.graph import MyDeepResearchAgent
+
+
+class StreamRenderer:
+    """把 stream_events 产出的事件渲染到终端：进度写 stderr，token 与答案写 stdout"""
+
+    def __init__(self, show_research: bool = True, out=sys.stdout, err=sys.stderr):
+        self.show_research = show_research
+        self.out = out
+        self.err = err
+        # 并行搜索分支的 token 交错到达：一次只实时输出一个分支，其余分支先缓冲
+        self.branches = {}
+        self.buffers = {}
+        self.live_branch = None
+        self.answer_started = False
+
+    def _write_branch_header(self, branch: int) -> None:
+        self.out.write(f"\n── 搜索分支 {branch} ──\n")
+
+    def _finish_live_branch(self) -> None:
+        """当前实时分支结束，切换到下一个有缓冲内容的分支并先输出其缓冲"""
+        if self.live_branch is not None:
+            self.out.write("\n")
+        self.live_branch = None
+        for branch, buffered in list(self.buffers.items()):
+            del self.buffers[branch]
+            self.live_branch = branch
+            self._write_branch_header(branch)
+            self.out.write("".join(buffered))
+            break
+        self.out.flush()
+
+    def _flush_all_branches(self) -> None:
+        while self.buffers or self.live_branch is not None:
+            self._finish_live_branch()
+
+    def render(self, event: dict) -> None:
+        kind = event["type"]
+        if kind == "node":
+            if event["node"] == "web_research":
+                self._finish_live_branch()
+            elif self.live_branch is not None or self.buffers:
+                self._flush_all_branches()
+            self.err.write(f"\n✓ {event['label']}（{event['elapsed_ms'] / 1000:.1f}s）\n")
+            self.err.flush()
+        elif kind == "token" and self.show_research:
+            branch = self.branches.setdefault(event["branch"], len(self.branches) + 1)
+            if self.live_branch is None and branch not in self.buffers:
+                self.live_branch = branch
+                self._write_branch_header(branch)
+            if branch == self.live_branch:
+                self.out.write(event["content"])
+                self.out.flush()
+            else:
+                self.buffers.setdefault(branch, []).append(event["content"])
+        elif kind == "section":
+            self._flush_all_branches()
+            if not self.answer_started:
+                self.out.write("\n\n══════ 最终答案 ══════\n")
+                self.answer_started = True
+            self.out.write(event["content"])
+            self.out.flush()
+        elif kind == "done":
+            ttft = event["ttft_ms"]
+            ttft_text = f"{ttft / 1000:.2f}s" if ttft is not None else "N/A"
+            self.err.write(f"\n首个输出耗时 {ttft_text}，总耗时 {event['elapsed_ms'] / 1000:.2f}s\n")
+            self.err.flush()
+
+
+def run_once(agent: MyDeepResearchAgent, query: str, thread_id: str, use_async: bool, show_research: bool) -> None:
+    renderer = StreamRenderer(show_research=show_research)
+    if use_async:
+        async def consume():
+            async for event in agent.astream_events(query, thread_id=thread_id):
+                renderer.render(event)
+        asyncio.run(consume())
+    else:
+        for event in agent.stream_events(query, thread_id=thread_id):
+            renderer.render(event)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="流式运行 MyDeepResearchAgent")
+    parser.add_argument("query", nargs="?", help="研究问题；省略时进入交互模式")
+    parser.add_argument("--thread-id", default="cli", help="会话线程 id，同一线程共享对话历史")
+    parser.add_argument("--user-id", default="default_user", help="记忆所属用户")
+    parser.add_argument("--knowledge-base", default="./knowledge_base", help="RAG 知识库路径")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="使用异步图运行")
+    parser.add_argument("--no-research", dest="show_research", action="store_false",
+                        help="不输出搜索分支的中间分析，只输出最终答案")
+    args = parser.parse_args(argv)
+
+    agent = MyDeepResearchAgent(knowledge_base_path=args.knowledge_base, user_id=args.user_id)
+
+    if args.query:
+        run_once(agent, args.query, args.thread_id, args.use_async, args.show_research)
+        return 0
+
+    while True:
+        try:
+            query = input("\n问题> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return 0
+        if query in ("exit", "quit"):
+            return 0
+        if query:
+            run_once(agent, query, args.thread_id, args.use_async, args.show_research)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
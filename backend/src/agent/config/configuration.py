@@ -29,6 +29,13 @@ class Configuration(BaseModel):
         },
     )
 
+    leader_model: str = Field(
+        default="qwen-max",
+        metadata={
+            "description": "The name of the language model used as the leader LLM in the experimental agent."
+        },
+    )
+
     number_of_initial_queries: int = Field(
         default=3,
         metadata={"description": "The number of initial search queries to generate."},
@@ -39,6 +46,281 @@ class Configuration(BaseModel):
         metadata={"description": "The maximum number of research loops to perform."},
     )
 
+    max_concurrent_research: int = Field(
+        default=4,
+        metadata={
+            "description": "The maximum number of web research branches to run in parallel."
+        },
+    )
+
+    query_dedup_enabled: bool = Field(
+        default=True,
+        metadata={
+            "description": "Skip searching queries that near-duplicate a query already searched in this thread."
+        },
+    )
+
+    query_dedup_threshold: float = Field(
+        default=0.8,
+        metadata={
+            "description": "Jaccard similarity of query terms at or above which a query counts as a duplicate."
+        },
+    )
+
+    novelty_early_stop: bool = Field(
+        default=True,
+        metadata={
+            "description": "Skip the reflection model when a research round adds little new evidence."
+        },
+    )
+
+    novelty_skip_at_loop_budget: bool = Field(
+        default=False,
+        metadata={
+            "description": "Also skip reflection when no research loop is left; reflection's knowledge gap is then empty."
+        },
+    )
+
+    novelty_threshold: float = Field(
+        default=0.2,
+        metadata={
+            "description": "Minimum share of new text shingles in a research round for reflection to run."
+        },
+    )
+
+    evidence_digest_enabled: bool = Field(
+        default=True,
+        metadata={
+            "description": "Send reflection and the quality pipeline a BM25-ranked, deduplicated sentence digest of the research results instead of the full text."
+        },
+    )
+
+    evidence_digest_tokens: int = Field(
+        default=2000,
+        metadata={
+            "description": "Base evidence token budget per prompt; each consumer node scales it by its own factor."
+        },
+    )
+
+    fast_quality_mode: bool = Field(
+        default=False,
+        metadata={
+            "description": "Assess content quality, facts and relevance in one combined model call instead of three parallel ones."
+        },
+    )
+
+    quality_branch_timeout: float = Field(
+        default=60.0,
+        metadata={
+            "description": "Seconds each parallel quality assessment branch may run before its default value is used."
+        },
+    )
+
+    search_cache_enabled: bool = Field(
+        default=True,
+        metadata={"description": "Whether to serve Tavily searches from the local SQLite cache."},
+    )
+
+    search_cache_bypass: bool = Field(
+        default=False,
+        metadata={
+            "description": "Skip the search cache lookup for freshness-sensitive requests (results are still stored)."
+        },
+    )
+
+    search_cache_ttl: int = Field(
+        default=86400,
+        metadata={"description": "Seconds a cached search result stays valid."},
+    )
+
+    search_cache_max_entries: int = Field(
+        default=10000,
+        metadata={"description": "Maximum number of cached search results before LRU eviction."},
+    )
+
+    search_cache_path: Optional[str] = Field(
+        default=None,
+        metadata={"description": "SQLite file for the search cache; defaults to cache_data/search_cache.db."},
+    )
+
+    llm_cache_enabled: bool = Field(
+        default=False,
+        metadata={
+            "description": "Opt-in cache of parsed structured outputs for the reflection and quality pipeline nodes."
+        },
+    )
+
+    llm_cache_ttl: int = Field(
+        default=604800,
+        metadata={"description": "Seconds a cached structured LLM result stays valid."},
+    )
+
+    llm_cache_max_entries: int = Field(
+        default=5000,
+        metadata={"description": "Maximum number of cached LLM results before LRU eviction."},
+    )
+
+    llm_cache_path: Optional[str] = Field(
+        default=None,
+        metadata={"description": "SQLite file for the LLM cache; defaults to cache_data/llm_cache.db."},
+    )
+
+    history_keep_turns: int = Field(
+        default=6,
+        metadata={"description": "Turns kept verbatim in messages; older turns are folded into a rolling summary (0 disables)."},
+    )
+
+    history_summary_batch: int = Field(
+        default=2,
+        metadata={"description": "Minimum number of turns beyond history_keep_turns before the summary is refreshed."},
+    )
+
+    history_summary_max_chars: int = Field(
+        default=800,
+        metadata={"description": "Target maximum length of the rolling history summary, in characters."},
+    )
+
+    http_max_connections: int = Field(
+        default=100,
+        metadata={"description": "Maximum connections in the HTTP pool shared by all model clients."},
+    )
+
+    http_max_keepalive: int = Field(
+        default=20,
+        metadata={"description": "Maximum idle keep-alive connections kept in the shared HTTP pool."},
+    )
+
+    http_keepalive_expiry: float = Field(
+        default=30.0,
+        metadata={"description": "Seconds an idle keep-alive connection stays in the shared HTTP pool."},
+    )
+
+    http_timeout: float = Field(
+        default=60.0,
+        metadata={"description": "Read/write timeout in seconds for model HTTP requests."},
+    )
+
+    checkpoint_backend: str = Field(
+        default="sqlite",
+        metadata={"description": "Checkpointer backend: 'sqlite' (durable, WAL mode) or 'memory' (InMemorySaver)."},
+    )
+
+    checkpoint_path: Optional[str] = Field(
+        default=None,
+        metadata={"description": "SQLite file for checkpoints; defaults to cache_data/checkpoints.db."},
+    )
+
+    checkpoint_keep_last: int = Field(
+        default=5,
+        metadata={"description": "Number of most recent checkpoints kept per thread by compaction."},
+    )
+
+    checkpoint_thread_ttl: int = Field(
+        default=604800,
+        metadata={"description": "Seconds without writes after which a thread's checkpoints expire."},
+    )
+
+    checkpoint_compaction_interval: float = Field(
+        default=300,
+        metadata={"description": "Seconds between background compaction passes; 0 disables the background job."},
+    )
+
+    rate_limit_enabled: bool = Field(
+        default=True,
+        metadata={
+            "description": "Route model and search calls through the shared rate limiter (token buckets + AIMD concurrency)."
+        },
+    )
+
+    llm_requests_per_second: float = Field(
+        default=10.0,
+        metadata={"description": "Requests per second allowed per provider/model; 0 disables the request bucket."},
+    )
+
+    llm_tokens_per_minute: int = Field(
+        default=0,
+        metadata={"description": "Estimated prompt + completion tokens per minute per provider/model; 0 disables it."},
+    )
+
+    llm_max_concurrency: int = Field(
+        default=32,
+        metadata={"description": "Upper bound for the adaptive (AIMD) number of in-flight calls per model."},
+    )
+
+    search_requests_per_second: float = Field(
+        default=5.0,
+        metadata={"description": "Tavily requests per second; 0 disables the request bucket."},
+    )
+
+    search_max_concurrency: int = Field(
+        default=16,
+        metadata={"description": "Upper bound for the adaptive (AIMD) number of in-flight Tavily searches."},
+    )
+
+    rate_limit_max_retries: int = Field(
+        default=3,
+        metadata={"description": "Retries with jittered backoff after 429/5xx/timeouts/connection errors before the error is raised."},
+    )
+
+    hedging_enabled: bool = Field(
+        default=False,
+        metadata={
+            "description": "Fire a duplicate model request when a call is slower than the per model/node latency percentile."
+        },
+    )
+
+    hedge_percentile: float = Field(
+        default=0.95,
+        metadata={"description": "Latency percentile (tracked online per model and node) after which a call is hedged."},
+    )
+
+    hedge_budget_ratio: float = Field(
+        default=0.05,
+        metadata={"description": "Maximum share of extra requests spent on hedges across the process."},
+    )
+
+    hedge_min_samples: int = Field(
+        default=20,
+        metadata={"description": "Latency samples required for a model/node before it may be hedged."},
+    )
+
+    tracing_enabled: bool = Field(
+        default=True,
+        metadata={"description": "Record per-node and per-call spans (latency, queue wait, tokens, cost, cache hits)."},
+    )
+
+    trace_dir: Optional[str] = Field(
+        default=None,
+        metadata={"description": "Directory where each run's trace is written as <run_id>.json; unset keeps traces in memory only."},
+    )
+
+    cassette_mode: str = Field(
+        default="off",
+        metadata={"description": "Model/search call cassettes: 'record' appends every call to cassette_dir, 'replay' serves calls from it, 'off' disables."},
+    )
+
+    cassette_dir: Optional[str] = Field(
+        default=None,
+        metadata={"description": "Directory of *.jsonl.gz cassettes; defaults to cache_data/cassettes."},
+    )
+
+    cassette_match: str = Field(
+        default="nearest",
+        metadata={"description": "On a replay fingerprint miss, 'nearest' serves the most similar recording of the same node and schema; 'exact' raises."},
+    )
+
+    cassette_replay_latency: float = Field(
+        default=0.0,
+        metadata={"description": "Multiplier for recorded latencies during replay (0 returns immediately, 1 reproduces them)."},
+    )
+
+    warmup_mode: str = Field(
+        default="background",
+        metadata={
+            "description": "Warm-up when the agent is created: 'background' (thread), 'blocking' or 'off'."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
@@ -1,25 +1,204 @@
+import contextvars
+import threading
+import time
 from collections import Counter
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from hello_agents import Message
 from hello_agents.context import ContextBuilder, ContextPacket, ContextConfig
 from hello_agents.tools import MemoryTool, RAGTool
 import jieba
-from typing import  List, Optional, Tuple
 from datetime import datetime
-import tiktoken
 import math
+import re
+import numpy as np
 from rank_bm25 import BM25Okapi
 
+from backend.src.agent.contextbuilder.history_index import HistoryIndexRegistry
+from backend.src.agent.contextbuilder.tokenizer import JiebaTokenizer, count_tokens, default_tokenizer
+
+# 记忆 / RAG 检索源的默认截止时间（秒）
+DEFAULT_SOURCE_TIMEOUTS = {
+    "task_state": 3.0,
+    "related_memory": 3.0,
+    "knowledge_base": 5.0,
+}
+
+# 新近性衰减的时间尺度（秒）
+RECENCY_TAU_SECONDS = 3600
+# BM25 IDF 下限：语料很小或查询词出现在所有包中时，BM25Okapi 的 IDF 为零或负数，
+# 含有查询词的包反而得到负分；取一个正的下限，保证包含查询词的包相关性总为正
+BM25_IDF_FLOOR = 0.01
+# 句子边界：中英文句末标点、分号与换行，切分后标点保留在前一句末尾
+SENTENCE_BOUNDARY = re.compile(r"(?<=[。！？!?；;\n])")
+TRUNCATION_MARK = "…"
+# _structure 中每类区段各取一个类型，用于估算模板开销
+STRUCTURE_SECTION_TYPES = ("instructions", "task_state", "related_memory", "history")
+# 每个包在结构化模板中的分隔/标题开销
+PACKET_OVERHEAD_TOKENS = 8
+# 剩余预算低于该值时不再截断塞入，避免只留下半句话
+MIN_TRUNCATED_TOKENS = 64
+
+
 class MyContextBuilder(ContextBuilder):
     def __init__(self, memory_tool: Optional[MemoryTool] = None, rag_tool: Optional[RAGTool] = None,
-                 config: Optional[ContextConfig] = None):
+                 config: Optional[ContextConfig] = None, source_timeouts: Optional[Dict[str, float]] = None,
+                 max_source_workers: int = 8, tokenizer: Optional[JiebaTokenizer] = None):
         super().__init__(memory_tool, rag_tool, config)
+        # 带缓存的分词服务，默认在进程内所有 builder 间共享
+        self.tokenizer = tokenizer or default_tokenizer
+        self.source_timeouts = {**DEFAULT_SOURCE_TIMEOUTS, **(source_timeouts or {})}
+        # 有界线程池：超时的检索无法被中断，会继续占用线程直到结束，因此池子比源数量略大
+        self._source_executor = ThreadPoolExecutor(max_workers=max_source_workers, thread_name_prefix="context-source")
+        self._local = threading.local()
+        # 每个线程一份对话历史倒排索引
+        self.history_indexes = HistoryIndexRegistry(self.tokenize)
 
     def tokenize(self,text: str) -> list[str]:
-        # 可选：去停用词、过滤太短的词
-        words = jieba.cut(text.lower())
-        return [w for w in words if len(w) >= 2]  # 至少两个字符的词
+        # 至少两个字符的词；结果按文本哈希缓存
+        return self.tokenizer.tokenize(text)
+
+    def _search_task_state(self, user_query: str) -> Optional[ContextPacket]:
+        # 搜索任务状态相关记忆
+        state_results = self.memory_tool.execute(
+            "search",
+            query="(任务状态 OR 子目标 OR 结论 OR 阻塞)",
+            min_importance=0.7,
+            limit=5
+        )
+        if state_results and "未找到" not in state_results:
+            return ContextPacket(
+                content=state_results,
+                metadata={"type": "task_state", "importance": "high"},
+                token_count=count_tokens(state_results)
+            )
+        return None
+
+    def _search_related_memory(self, user_query: str) -> Optional[ContextPacket]:
+        # 搜索与当前查询相关的记忆
+        related_results = self.memory_tool.execute(
+            "search",
+            query=user_query,
+            limit=5
+        )
+        if related_results and "未找到" not in related_results:
+            return ContextPacket(
+                content=related_results,
+                metadata={"type": "related_memory"},
+                token_count=count_tokens(related_results)
+            )
+        return None
+
+    def _search_knowledge_base(self, user_query: str) -> Optional[ContextPacket]:
+        rag_results = self.rag_tool.run({
+            "action": "search",
+            "query": user_query,
+            "top_k": 5
+        })
+        if rag_results and "未找到" not in rag_results and "错误" not in rag_results:
+            return ContextPacket(
+                content=rag_results,
+                metadata={"type": "knowledge_base"},
+                token_count=count_tokens(rag_results)
+            )
+        return None
+
+    def _gather_sources(self, user_query: str) -> List[ContextPacket]:
+        """并发检索记忆与 RAG，每个源有独立截止时间
+
+        超时或出错的源被丢弃，原因记录在 gather_report() 中；成功源的耗时写入
+        packet.metadata["elapsed_ms"]。整体耗时取决于最慢且未超时的源，而不是所有源之和。
+        """
+        sources: List[Tuple[str, Callable[[str], Optional[ContextPacket]]]] = []
+        if self.memory_tool:
+            sources.append(("task_state", self._search_task_state))
+            sources.append(("related_memory", self._search_related_memory))
+        if self.rag_tool:
+            sources.append(("knowledge_base", self._search_knowledge_base))
+
+        def timed(fetch):
+            start = time.perf_counter()
+            packet = fetch(user_query)
+            return packet, (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        # 复制调用方的 contextvars，使检索耗时计入当前运行的 trace
+        futures = [(name, self._source_executor.submit(contextvars.copy_context().run, timed, fetch))
+                   for name, fetch in sources]
+
+        packets = []
+        report = []
+        for name, future in futures:
+            timeout = self.source_timeouts.get(name, 5.0)
+            try:
+                packet, elapsed_ms = future.result(timeout=max(start + timeout - time.perf_counter(), 0))
+            except FutureTimeoutError:
+                future.cancel()
+                print(f"⚠️ {name} 检索超过 {timeout}s，已丢弃")
+                report.append({"source": name, "status": "timeout",
+                               "elapsed_ms": (time.perf_counter() - start) * 1000,
+                               "reason": f"deadline {timeout}s exceeded"})
+                continue
+            except Exception as e:
+                print(f"⚠️ {name} 检索失败: {e}")
+                report.append({"source": name, "status": "error",
+                               "elapsed_ms": (time.perf_counter() - start) * 1000, "reason": str(e)})
+                continue
+
+            report.append({"source": name, "status": "ok" if packet else "empty", "elapsed_ms": elapsed_ms})
+            if packet:
+                packet.metadata["elapsed_ms"] = round(elapsed_ms, 2)
+                packets.append(packet)
+
+        self._local.gather_report = report
+        return packets
+
+    def _history_packet_from_index(
+            self,
+            thread_id: str,
+            conversation_history: List[Message],
+            user_query: str,
+            min_score=0.25
+    ) -> Optional[ContextPacket]:
+        index = self.history_indexes.get(thread_id)
+        with index.lock:
+            index.sync(conversation_history)
+            kept_turns = index.relevant_turns(self.tokenize(user_query), min_score)
+            total_turns = len(index.turns)
+        if not kept_turns:
+            return None
+
+        content = self.render_turns(kept_turns)
+        return ContextPacket(
+            content=content,
+            metadata={"type": "history", "filtered": True, "count": len(kept_turns), "total_turns": total_turns},
+            token_count=count_tokens(content),
+        )
+
+    def build(
+            self,
+            user_query: str,
+            conversation_history: Optional[List[Message]] = None,
+            system_instructions: Optional[str] = None,
+            additional_packets: Optional[List[ContextPacket]] = None,
+            thread_id: Optional[str] = None
+    ) -> str:
+        """构建上下文；传入 thread_id 时对话历史走该线程的增量倒排索引，覆盖整段历史"""
+        self._local.thread_id = thread_id
+        try:
+            return super().build(
+                user_query=user_query,
+                conversation_history=conversation_history,
+                system_instructions=system_instructions,
+                additional_packets=additional_packets,
+            )
+        finally:
+            self._local.thread_id = None
+
+    def gather_report(self) -> List[Dict[str, Any]]:
+        """返回当前线程最近一次 _gather 中各检索源的状态、耗时与丢弃原因"""
+        return getattr(self._local, "gather_report", [])
 
     def _gather(
             self,
@@ -35,57 +214,21 @@ class MyContextBuilder(ContextBuilder):
         if system_instructions:
             packets.append(ContextPacket(
                 content=system_instructions,
-                metadata={"type": "instructions"}
+                metadata={"type": "instructions"},
+                token_count=count_tokens(system_instructions)
             ))
 
-        # P1: 从记忆中获取任务状态与关键结论
-        if self.memory_tool:
-            try:
-                # 搜索任务状态相关记忆
-                state_results = self.memory_tool.execute(
-                    "search",
-                    query="(任务状态 OR 子目标 OR 结论 OR 阻塞)",
-                    min_importance=0.7,
-                    limit=5
-                )
-                if state_results and "未找到" not in state_results:
-                    packets.append(ContextPacket(
-                        content=state_results,
-                        metadata={"type": "task_state", "importance": "high"}
-                    ))
-
-                # 搜索与当前查询相关的记忆
-                related_results = self.memory_tool.execute(
-                    "search",
-                    query=user_query,
-                    limit=5
-                )
-                if related_results and "未找到" not in related_results:
-                    packets.append(ContextPacket(
-                        content=related_results,
-                        metadata={"type": "related_memory"}
-                    ))
-            except Exception as e:
-                print(f"⚠️ 记忆检索失败: {e}")
-
-        # P2: 从RAG中获取事实证据
-        if self.rag_tool:
-            try:
-                rag_results = self.rag_tool.run({
-                    "action": "search",
-                    "query": user_query,
-                    "top_k": 5
-                })
-                if rag_results and "未找到" not in rag_results and "错误" not in rag_results:
-                    packets.append(ContextPacket(
-                        content=rag_results,
-                        metadata={"type": "knowledge_base"}
-                    ))
-            except Exception as e:
-                print(f"⚠️ RAG检索失败: {e}")
+        # P1/P2: 记忆与 RAG 检索并发执行，各自有截止时间
+        packets.extend(self._gather_sources(user_query))
 
         # P3: 对话历史（辅助材料）
-        if conversation_history:
+        thread_id = getattr(self._local, "thread_id", None)
+        if conversation_history and thread_id:
+            # 有线程索引时对整段历史打分，只把相关片段放进 packet
+            packet = self._history_packet_from_index(thread_id, conversation_history, user_query)
+            if packet:
+                packets.append(packet)
+        elif conversation_history:
             # 只保留最近N条
             recent_history = conversation_history[-10:]
             history_text = "\n".join([
@@ -94,7 +237,8 @@ class MyContextBuilder(ContextBuilder):
             ])
             packets.append(ContextPacket(
                 content=history_text,
-                metadata={"type": "history", "count": len(recent_history)}
+                metadata={"type": "history", "count": len(recent_history)},
+                token_count=count_tokens(history_text)
             ))
 
         # 添加额外包
@@ -194,6 +338,19 @@ class MyContextBuilder(ContextBuilder):
 
         return num / (den + 1e-6)
 
+    def render_turns(self, kept_turns) -> str:
+        # ===== 正确的 block 级重组 =====
+        blocks = []
+        idx=1
+        for u, a in kept_turns:
+            if u:
+                blocks.append(f"对话历史片段{idx}:\n[user]\n" + u.strip())
+            if a:
+                blocks.append("[assistant]\n" + a.strip()+f"\n对话历史片段{idx}结束\n")
+            idx+=1
+
+        return "\n".join(blocks)
+
     def filter_history_packet(
             self,
             packet,
@@ -205,6 +362,14 @@ class MyContextBuilder(ContextBuilder):
         if not turns:
             return None
 
+        if tokenize == self.tokenize:
+            # 一次批量分词所有 turn 文本，后续 build_idf / turn_relevance 直接命中缓存
+            self.tokenizer.tokenize_batch(
+                [user_query]
+                + [(u or "") + " " + (a or "") for u, a in turns]
+                + [text for turn in turns for text in turn if text]
+            )
+
         query_tokens = tokenize(user_query)
         idf = self.build_idf(turns, tokenize)
 
@@ -217,115 +382,119 @@ class MyContextBuilder(ContextBuilder):
         if not kept_turns:
             return None
 
-        # ===== 正确的 block 级重组 =====
-        blocks = []
-        idx=1
-        for u, a in kept_turns:
-            if u:
-                blocks.append(f"对话历史片段{idx}:\n[user]\n" + u.strip())
-            if a:
-                blocks.append("[assistant]\n" + a.strip()+f"\n对话历史片段{idx}结束\n")
-            idx+=1
-
-        packet.content = "\n".join(blocks)
+        packet.content = self.render_turns(kept_turns)
 
         # token_count 建议：只算 content token，不做猜测
-        packet.token_count = len(tokenize(packet.content))
+        packet.token_count = count_tokens(packet.content)
 
         return packet
 
+    def _score_packets(self, packets: List[ContextPacket], user_query: str) -> np.ndarray:
+        """为候选包计算复合分：0.7 * BM25 相关性（按最大值归一化到 [0,1]）+ 0.3 * 新近性"""
+        corpus = self.tokenizer.tokenize_batch([p.content for p in packets])
+        query_tokens = self.tokenize(user_query)
+
+        # BM25Okapi 在语料全空时会除零，此时相关性全部记 0
+        if query_tokens and any(corpus):
+            bm25 = BM25Okapi(corpus)
+            bm25.idf = {term: max(value, BM25_IDF_FLOOR) for term, value in bm25.idf.items()}
+            bm25_scores = np.asarray(bm25.get_scores(query_tokens), dtype=float)
+            max_score = bm25_scores.max()
+            relevance = bm25_scores / max_score if max_score > 0 else np.zeros(len(packets))
+        else:
+            relevance = np.zeros(len(packets))
+
+        # 新近性：指数衰减，tau 为 1 小时
+        now = datetime.now().timestamp()
+        ages = np.array([now - p.timestamp.timestamp() for p in packets], dtype=float)
+        recency = np.exp(-np.clip(ages, 0.0, None) / RECENCY_TAU_SECONDS)
+
+        for packet, rel in zip(packets, relevance):
+            packet.relevance_score = float(rel)
+        return 0.7 * relevance + 0.3 * recency
+
+    def _truncate_to_budget(self, content: str, budget: int) -> str:
+        """把内容截断到 budget 个 token 以内，优先在句子边界截断"""
+        sentences = [s for s in SENTENCE_BOUNDARY.split(content) if s]
+        kept, used = [], 0
+        for sentence in sentences:
+            cost = count_tokens(sentence)
+            if used + cost > budget:
+                break
+            kept.append(sentence)
+            used += cost
+        if kept:
+            return "".join(kept).rstrip() + TRUNCATION_MARK
+
+        # 第一句就超预算：按字符二分查找能放下的最长前缀
+        lo, hi = 0, len(content)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if count_tokens(content[:mid]) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        return content[:lo].rstrip() + TRUNCATION_MARK if lo else ""
+
     def _select(
             self,
             packets: List[ContextPacket],
             user_query: str
     ) -> List[ContextPacket]:
-        #print(f"候选信息如下：{packets}")
-        selected = []
+        """Select: 先做历史相关性过滤，再按 相关性+新近性 排序，在 token 预算内装箱
 
+        系统指令固定最先纳入；其余包低于 min_relevance 的被丢弃（高重要度的任务状态除外），
+        但没有任何包与查询有词重合时相关性无法区分各包，不做过滤，全部按新近性装箱；
+        放不下的包在剩余预算足够时按句子边界截断后纳入。
+        """
+        candidates: List[ContextPacket] = []
         for p in packets:
+            if p.metadata.get("type") == "history" and not p.metadata.get("filtered"):
+                p = self.filter_history_packet(p, user_query, self.tokenize, min_score=0.25)
+                if not p:
+                    continue
+            p.token_count = count_tokens(p.content)
+            candidates.append(p)
+        if not candidates:
+            return []
+
+        scores = self._score_packets(candidates, user_query)
+        min_relevance = self.config.min_relevance if any(p.relevance_score > 0 for p in candidates) else 0.0
+
+        # 预算扣除 _structure 固定模板（任务、输出约束等）与各段标题的开销
+        skeleton = [ContextPacket(content="", metadata={"type": t}, token_count=1) for t in STRUCTURE_SECTION_TYPES]
+        budget = self.config.get_available_tokens() - count_tokens(self._structure(skeleton, user_query, None))
+        used = 0
+        selected: List[ContextPacket] = []
+
+        def admit(p: ContextPacket) -> None:
+            nonlocal used
+            cost = p.token_count + PACKET_OVERHEAD_TOKENS
+            remaining = budget - used
+            if cost > remaining:
+                if remaining - PACKET_OVERHEAD_TOKENS < MIN_TRUNCATED_TOKENS:
+                    return
+                p.content = self._truncate_to_budget(p.content, remaining - PACKET_OVERHEAD_TOKENS)
+                if not p.content:
+                    return
+                p.token_count = count_tokens(p.content)
+                p.metadata["truncated"] = True
+                cost = p.token_count + PACKET_OVERHEAD_TOKENS
+            selected.append(p)
+            used += cost
+
+        for i in range(len(candidates)):
+            if candidates[i].metadata.get("type") == "instructions":
+                admit(candidates[i])
+
+        for i in np.argsort(-scores, kind="stable"):
+            p = candidates[i]
             ptype = p.metadata.get("type")
-
-            if ptype in ("instructions", "knowledge_base", "related_memory","task_state"):
-                selected.append(p)
-
-            elif ptype == "history":
-                filtered = self.filter_history_packet(
-                    p,
-                    user_query,
-                    self.tokenize,
-                    min_score=0.25
-                )
-                if filtered:
-                    selected.append(filtered)
+            if ptype == "instructions":
+                continue
+            if p.relevance_score < min_relevance and not (
+                    ptype == "task_state" and p.metadata.get("importance") == "high"):
+                continue
+            admit(p)
 
         return selected
-
-        # tokenized_corpus = [self.tokenize(p.content) for p in packets]
-        #
-        # # 构建 BM25 索引（只需做一次）
-        # bm25 = BM25Okapi(tokenized_corpus)
-        #
-        # # ───────────────────────────────────────────────
-        # # 1) 计算相关性（BM25 替换原来的关键词重叠）
-        # # ───────────────────────────────────────────────
-        # query_tokens = self.tokenize(user_query)
-        #
-        # if len(query_tokens) > 0 and len(packets) > 0:
-        #     # bm25.get_scores() 返回一个 numpy array，对应每个 document 的分数
-        #     bm25_scores = bm25.get_scores(query_tokens)
-        #
-        #     # # 归一化到 [0,1] 区间（可选，但推荐，便于和 recency 融合）
-        #     # max_score = bm25_scores.max()
-        #     # if max_score > 0:
-        #     #     bm25_scores = bm25_scores / max_score
-        #
-        #     for i, packet in enumerate(packets):
-        #         packet.relevance_score = float(bm25_scores[i])
-        # else:
-        #     for packet in packets:
-        #         packet.relevance_score = 0.0
-        #
-        # # 2) 计算新近性（指数衰减）
-        # def recency_score(ts: datetime) -> float:
-        #     delta = max((datetime.now() - ts).total_seconds(), 0)
-        #     tau = 3600  # 1小时时间尺度，可暴露到配置
-        #     return math.exp(-delta / tau)
-        #
-        # # 3) 计算复合分：0.7*相关性 + 0.3*新近性
-        # scored_packets: List[Tuple[float, ContextPacket]] = []
-        # for p in packets:
-        #     rec = recency_score(p.timestamp)
-        #     score = 0.7 * p.relevance_score + 0.3 * rec
-        #     scored_packets.append((score, p))
-        #
-        # # 4) 系统指令单独拿出，固定纳入
-        # system_packets = [p for (_, p) in scored_packets if p.metadata.get("type") == "instructions"]
-        # remaining = [p for (s, p) in sorted(scored_packets, key=lambda x: x[0], reverse=True)
-        #              if p.metadata.get("type") != "instructions"]
-        #
-        # print(f"计算结果如下：{remaining}")
-        #
-        # # 5) 依据 min_relevance 过滤（对非系统包）
-        # filtered = [p for p in remaining if p.relevance_score >= self.config.min_relevance]
-        #
-        # # 6) 按预算填充
-        # available_tokens = self.config.get_available_tokens()
-        # selected: List[ContextPacket] = []
-        # used_tokens = 0
-        #
-        # # 先放入系统指令（不排序）
-        # for p in system_packets:
-        #     if used_tokens + p.token_count <= available_tokens:
-        #         selected.append(p)
-        #         used_tokens += p.token_count
-        #
-        # # 再按分数加入其余
-        # for p in filtered:
-        #     if used_tokens + p.token_count > available_tokens:
-        #         continue
-        #     selected.append(p)
-        #     used_tokens += p.token_count
-        #
-        # print(f"筛选与排序结果如下：{selected}")
-
-        #return selected
\ No newline at end of file
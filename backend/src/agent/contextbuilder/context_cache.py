@@ -0,0 +1,89 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+class ContextCache:
+    """按 (thread_id, turn, 内容哈希) 缓存 MyContextBuilder.build 的结果
+
+    同一轮对话中 generate_query、各个 web_research 分支和 reflection 循环会用相同的
+    用户问题与历史构建上下文，命中缓存后即可跳过记忆检索、RAG 检索与分词。
+    并发的同 key 请求只会真正构建一次（single-flight），其余请求等待结果。
+    记忆写入后需调用 invalidate，避免继续使用旧的记忆检索结果。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int, str], str]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int, str], threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(thread_id: str, turn: int, *parts: Hashable) -> Tuple[str, int, str]:
+        """用输入内容的哈希生成缓存 key，内容任意变化都会得到不同的 key"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(str(part).encode("utf-8", errors="ignore"))
+            digest.update(b"\x00")
+        return thread_id, turn, digest.hexdigest()
+
+    def get_or_build(self, key: Tuple[str, int, str], build: Callable[[], str]) -> str:
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                event = self._inflight.get(key)
+                if event is None:
+                    # 由当前线程负责构建
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    self.misses += 1
+                    break
+            # 其他线程正在构建同一个 key，等待后重新查缓存
+            event.wait()
+
+        try:
+            value = build()
+            with self._lock:
+                # 构建期间若发生了失效，结果可能基于旧记忆，不再写入缓存
+                if self._inflight.get(key) is event:
+                    self._entries[key] = value
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is event:
+                    del self._inflight[key]
+            event.set()
+
+    def invalidate(self, thread_id: Optional[str] = None) -> None:
+        """失效缓存；thread_id 为 None 时清空全部（记忆在同一用户的所有线程间共享）"""
+        with self._lock:
+            if thread_id is None:
+                self._entries.clear()
+                self._inflight.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == thread_id]:
+                    del self._entries[key]
+                for key in [k for k in self._inflight if k[0] == thread_id]:
+                    del self._inflight[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,121 @@
+import hashlib
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hello_agents import Message
+
+
+def _fingerprint(msg: Message) -> str:
+    return hashlib.blake2b(f"{msg.role}\x00{msg.content}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+class HistoryIndex:
+    """单个线程对话历史的增量倒排索引
+
+    每条消息只在追加时分词一次，并增量维护文档频率（以对话组 turn 为文档）。
+    打分只遍历查询词的倒排表，耗时与查询词及其命中的 turn 数成正比，
+    因此可以对整段线程历史打分，而不必只保留最近几条。
+    """
+
+    def __init__(self, tokenize: Callable[[str], List[str]]):
+        self.tokenize = tokenize
+        self.turns: List[List[Optional[str]]] = []  # [[user_msg, assistant_msg], ...]
+        self.turn_tokens: List[set] = []
+        self.postings: Dict[str, set] = {}
+        self.df: Counter = Counter()
+        self.num_docs = 0  # 至少含一个 token 的 turn 数，对应 build_idf 中的 total_docs
+        self.num_messages = 0
+        self._last_fingerprint: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def reset(self) -> None:
+        self.turns.clear()
+        self.turn_tokens.clear()
+        self.postings.clear()
+        self.df.clear()
+        self.num_docs = 0
+        self.num_messages = 0
+        self._last_fingerprint = None
+
+    def sync(self, history: List[Message]) -> None:
+        """把索引与完整历史对齐：只索引新增的消息；历史被改写（如被摘要折叠）时重建"""
+        if self.num_messages and (
+                len(history) < self.num_messages
+                or _fingerprint(history[self.num_messages - 1]) != self._last_fingerprint
+        ):
+            self.reset()
+        for msg in history[self.num_messages:]:
+            self._append(msg)
+        self.num_messages = len(history)
+        if history:
+            self._last_fingerprint = _fingerprint(history[-1])
+
+    def _append(self, msg: Message) -> None:
+        if msg.role == "user" or not self.turns:
+            self.turns.append([None, None])
+            self.turn_tokens.append(set())
+        turn_id = len(self.turns) - 1
+        turn = self.turns[turn_id]
+        slot = 0 if msg.role == "user" else 1
+        turn[slot] = msg.content if turn[slot] is None else f"{turn[slot]}\n{msg.content}"
+
+        tokens = self.turn_tokens[turn_id]
+        new_tokens = set(self.tokenize(msg.content)) - tokens
+        if new_tokens and not tokens:
+            self.num_docs += 1
+        for t in new_tokens:
+            tokens.add(t)
+            self.df[t] += 1
+            self.postings.setdefault(t, set()).add(turn_id)
+
+    def idf(self, token: str) -> float:
+        df = self.df.get(token)
+        if not df:
+            return 1.0
+        return math.log((1 + self.num_docs) / (1 + df)) + 1
+
+    def score(self, query_tokens: List[str]) -> Dict[int, float]:
+        """返回 {turn_id: 相关性}，只包含与查询有重叠的 turn，分数定义与 turn_relevance 一致"""
+        den = sum(self.idf(t) for t in query_tokens)
+        scores: Dict[int, float] = {}
+        for t in set(query_tokens):
+            turn_ids = self.postings.get(t)
+            if not turn_ids:
+                continue
+            weight = self.idf(t)
+            for turn_id in turn_ids:
+                scores[turn_id] = scores.get(turn_id, 0.0) + weight
+        return {turn_id: num / (den + 1e-6) for turn_id, num in scores.items()}
+
+    def relevant_turns(self, query_tokens: List[str], min_score: float) -> List[Tuple[Optional[str], Optional[str]]]:
+        """按时间顺序返回相关性不低于 min_score 的对话组"""
+        scores = self.score(query_tokens)
+        return [tuple(self.turns[i]) for i in sorted(scores) if scores[i] >= min_score]
+
+
+class HistoryIndexRegistry:
+    """按 thread_id 保存 HistoryIndex，超过 max_threads 时淘汰最久未使用的线程"""
+
+    def __init__(self, tokenize: Callable[[str], List[str]], max_threads: int = 1024):
+        self.tokenize = tokenize
+        self.max_threads = max_threads
+        self._indexes: "OrderedDict[str, HistoryIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str) -> HistoryIndex:
+        with self._lock:
+            index = self._indexes.get(thread_id)
+            if index is None:
+                index = HistoryIndex(self.tokenize)
+                self._indexes[thread_id] = index
+                while len(self._indexes) > self.max_threads:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(thread_id)
+            return index
+
+    def drop(self, thread_id: str) -> None:
+        with self._lock:
+            self._indexes.pop(thread_id, None)
@@ -76,6 +76,20 @@ class RelevanceAssessment(BaseModel):
     )
 
 
+class QualityAssessment(BaseModel):
+    """Content quality, fact verification and relevance assessed in a single call."""
+
+    content_quality: ContentQualityAssessment = Field(
+        description="Assessment of content quality and reliability"
+    )
+    fact_verification: FactVerification = Field(
+        description="Fact verification results"
+    )
+    relevance_assessment: RelevanceAssessment = Field(
+        description="Assessment of content relevance to the research topic"
+    )
+
+
 class SummaryOptimization(BaseModel):
     """Optimized summary with enhanced insights."""
 
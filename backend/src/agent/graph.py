@@ -2,14 +2,19 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 from backend.src.agent.format.schema import MemoryExtractionOutput
-from backend.src.agent.models.LLM_MODEL import ModelInstances
-from backend.src.agent.nodes.access_relevance import assess_relevance
-from backend.src.agent.nodes.assess_content_quality import assess_content_quality
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_structured, ainvoke_structured
+from backend.src.agent.nodes.access_relevance import assess_relevance, aassess_relevance
+from backend.src.agent.nodes.assess_novelty import assess_novelty, evaluate_novelty
+from backend.src.agent.nodes.assess_quality import assess_quality, aassess_quality
+from backend.src.agent.nodes.evidence_digest import build_evidence_digest
+from backend.src.agent.nodes.assess_content_quality import assess_content_quality, aassess_content_quality
 from backend.src.agent.nodes.extract_and_add_memory import build_memory_extraction_input
 from backend.src.agent.nodes.generate_verification_report import generate_verification_report, finalize_answer
-from backend.src.agent.nodes.optimize_summary import optimize_summary
-from backend.src.agent.nodes.reflection import reflection, evaluate_research
-from backend.src.agent.nodes.verify_facts import verify_facts
+from backend.src.agent.nodes.optimize_summary import optimize_summary, aoptimize_summary
+from backend.src.agent.nodes.quality_branch import FAST_QUALITY_NODE, QUALITY_ASSESSORS, with_branch_timeout, awith_branch_timeout
+from backend.src.agent.nodes.reflection import reflection, areflection, evaluate_research
+from backend.src.agent.nodes.verify_facts import verify_facts, averify_facts
 from backend.src.agent.prompts.memory_prompt import memory_extraction_prompt
 
 project_root = Path(__file__).resolve().parent  # 当前 .py 所在目录
@@ -19,32 +24,48 @@ if env_path.exists() and env_path.is_file():
     load_dotenv(env_path, override=True)
     print("成功加载 .env 文件:", env_path)
 else:
-    raise FileNotFoundError(f"没找到 .env 文件: {env_path}")
+    # 容器 / 自动扩容场景通常直接通过环境变量注入密钥，缺少 .env 不应阻止进程启动
+    print(f"⚠️ 没找到 .env 文件: {env_path}，将直接使用进程环境变量")
 
 
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional
 
-from hello_agents import Message
-from hello_agents.context import ContextConfig
-from hello_agents.tools import MemoryTool, RAGTool
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph,START,END
 from langgraph.types import Command
 
+from backend.src.agent.batch import ResearchDedup, arun_batch, run_batch
+from backend.src.agent.checkpoint.sqlite_saver import create_checkpointer
 from backend.src.agent.config.configuration import Configuration
-from backend.src.agent.contextbuilder.MyContextBuilder import MyContextBuilder
-from backend.src.agent.nodes.generate_query import generate_query
+from backend.src.agent.contextbuilder.context_cache import ContextCache
+from backend.src.agent.nodes.generate_query import generate_query, agenerate_query
 from backend.src.agent.nodes.should_regenerate_queried import should_regenerate_queried
-from backend.src.agent.nodes.wait_for_confimation import wait_for_user_confirmation
-from backend.src.agent.nodes.web_research import web_research
+from backend.src.agent.nodes.summarize_history import summarize_history, asummarize_history, is_history_summary
+from backend.src.agent.nodes.wait_for_confimation import wait_for_user_confirmation, QUERY_CONFIRMED_MARKER
+from backend.src.agent.nodes.web_research import web_research, aweb_research
 from backend.src.agent.states.overallstate import OverallState
+from backend.src.agent.states.sub_states.websearchstate import WebSearchState
+from backend.src.agent.streaming import STREAM_MODES, StreamTimer, to_events
+from backend.src.agent.tracing import TracedTool, traced_node, tracer
+from backend.src.agent.warmup import start_warmup, warmup
 
-def langchain_to_hello_message(lc_msg: BaseMessage) -> Message:
+if TYPE_CHECKING:
+    from hello_agents import Message
+
+# hello_agents / MyContextBuilder（jieba、rank_bm25、tiktoken）导入较重，推迟到创建 Agent 时再加载
+
+def langchain_to_hello_message(lc_msg: BaseMessage) -> "Message":
     """
     将 LangChain 的消息转换为 helloagents 的 Message
     """
+    from hello_agents import Message
+
     # 角色映射：LangChain 的 role 是 type-based，helloagents 用字符串 "user"/"assistant"/"system"
     if isinstance(lc_msg, HumanMessage):
         role = "user"
@@ -66,11 +87,19 @@ def langchain_to_hello_message(lc_msg: BaseMessage) -> Message:
 
 class MyDeepResearchAgent:
     def __init__(self, knowledge_base_path="./knowledge_base",
-                 user_id="default_user"):
+                 user_id="default_user", max_blocking_workers=16,
+                 checkpointer: Optional[BaseCheckpointSaver] = None,
+                 memory_tool=None, rag_tool=None):
+        from hello_agents.context import ContextConfig
+        from hello_agents.tools import MemoryTool, RAGTool
+
+        from backend.src.agent.contextbuilder.MyContextBuilder import MyContextBuilder
 
         # 初始化 helloagents 工具和 ContextBuilder（同你的示例）
-        self.memory_tool = MemoryTool(user_id=user_id)
-        self.rag_tool = RAGTool(knowledge_base_path=knowledge_base_path)
+        # 可传入自定义的 memory_tool / rag_tool（如离线基准中的假对象）
+        # TracedTool 为每次记忆 / 知识库检索记录 span，其余行为与原工具一致
+        self.memory_tool = TracedTool(memory_tool or MemoryTool(user_id=user_id), "memory")
+        self.rag_tool = TracedTool(rag_tool or RAGTool(knowledge_base_path=knowledge_base_path), "rag")
         self.config = ContextConfig(
             max_tokens=3000,
             reserve_ratio=0.2,
@@ -82,16 +111,113 @@ class MyDeepResearchAgent:
             rag_tool=self.rag_tool,
             config=self.config
         )
+        # 每轮上下文构建缓存，命中/未命中统计见 self.context_cache.stats()
+        self.context_cache = ContextCache()
+        # run_batch 期间按 batch_id 登记的共享搜索结果，同一批次的任务复用相同查询的 web_research
+        self.research_dedup: Dict[str, ResearchDedup] = {}
+        # 异步路径中 MemoryTool / RAGTool 是阻塞调用，统一放到这个线程池里执行
+        self.executor = ThreadPoolExecutor(max_workers=max_blocking_workers, thread_name_prefix="agent-blocking")
 
-        # Checkpointer
-        self.checkpointer = InMemorySaver()
+        # Checkpointer：默认按配置使用本地 SQLite（WAL），进程重启后可用 resume 续跑中断的线程
+        self.checkpointer = checkpointer or create_checkpointer()
 
-        # 构建 LangGraph
+        # 构建 LangGraph：同步图供 run 使用，异步图供 arun / astream 使用，两者共享 checkpointer
         self.graph = self._build_graph()
+        self.async_graph = self._build_graph(use_async=True)
+
+        # 预热 jieba 词典、tiktoken 编码器与模型客户端，避免由第一个用户承担冷启动开销
+        warmup_mode = Configuration.from_runnable_config().warmup_mode
+        if warmup_mode != "off":
+            self.warmup(background=warmup_mode == "background")
+
+    def warmup(self, background: bool = False):
+        """预热进程级资源；background=True 时在后台线程执行并立即返回线程，完成状态见 warmup.is_ready()"""
+        return start_warmup() if background else warmup()
+
+    def _build_context(self, state, config: RunnableConfig) -> str:
+        messages = state["messages"]
+        # 找到本轮真正的用户问题（跳过自动确认注入的消息），之前的消息都是历史
+        query_idx = len(messages) - 1
+        while query_idx > 0 and (
+                not isinstance(messages[query_idx], HumanMessage)
+                or messages[query_idx].content == QUERY_CONFIRMED_MARKER
+        ):
+            query_idx -= 1
+        user_query = messages[query_idx].content
+        turn = sum(
+            1 for msg in messages[:query_idx + 1]
+            if isinstance(msg, HumanMessage) and msg.content != QUERY_CONFIRMED_MARKER
+        )
+        thread_id = config.get("configurable", {}).get("thread_id", "")
+
+        def build() -> str:
+            from hello_agents.context import ContextPacket
+
+            conversation_history = []
+            summary_packets = []
+            for msg in messages[:query_idx]:
+                # 自动确认注入的消息不属于真实对话，不进入历史
+                if isinstance(msg, HumanMessage) and msg.content == QUERY_CONFIRMED_MARKER:
+                    continue
+                # 较早轮次的滚动摘要单独成包，与保留的最近几轮一起参与相关性排序
+                if is_history_summary(msg):
+                    summary_packets.append(ContextPacket(
+                        content=msg.content,
+                        metadata={"type": "history", "filtered": True, "summary": True},
+                    ))
+                    continue
+                conversation_history.append(langchain_to_hello_message(msg))
+
+            # 用 helloagents Builder 构建上下文（按线程增量索引整段历史）
+            return self.builder.build(
+                user_query=user_query,
+                conversation_history=conversation_history,
+                additional_packets=summary_packets,
+                thread_id=thread_id or None,
+            )
+
+        # 同一轮内 generate_query、各搜索分支与后续循环共享一次构建结果
+        key = ContextCache.make_key(
+            thread_id, turn, user_query,
+            *(f"{msg.type}:{msg.content}" for msg in messages[:query_idx]),
+        )
+        built = []
+        with tracer.span("context", "build_context") as span:
+            context = self.context_cache.get_or_build(key, lambda: built.append(True) or build())
+            span.set(cache_hit=not built)
+        return context
+
+    async def _abuild_context(self, state, config: RunnableConfig) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, contextvars.copy_context().run,
+                                          self._build_context, state, config)
 
+    def _add_memories(self, memories) -> int:
+        added_count = 0
+        for mem in memories:
+            try:
+                self.memory_tool.execute(
+                    "add",
+                    content=mem.content,
+                    memory_type=mem.memory_type,
+                    importance=mem.importance,
+                )
+                added_count += 1
+                print(f"添加一条{mem.memory_type}记忆成功：{mem.content}")
+            except Exception as e:
+                print(f"添加记忆失败: {mem}", e)
+        if added_count:
+            # 新记忆会改变记忆检索结果，已缓存的上下文全部失效
+            self.context_cache.invalidate()
+        return added_count
 
-    def _build_graph(self):
+    def _build_graph(self, use_async=False):
         workflow = StateGraph(OverallState,context_schema=Configuration)
+
+        def add_node(name, node):
+            # 每个节点记录一个耗时 span，节点内的模型 / 搜索 / 检索调用归属到该节点
+            workflow.add_node(name, traced_node(name, node))
+
         # 节点1：生成问题对
         def generate_query_node(state:OverallState,config:RunnableConfig):
             # 1.先判断用户是否已确认了问题生成成功
@@ -108,120 +234,237 @@ class MyDeepResearchAgent:
             #         "user_confirmation_received": True
             #     })
             # 2.用户未确认，继续生成消息
-            conversation_history = []
-            # 排除最后一条（当前用户查询）
-            for msg in state["messages"][:-1]:
-                conversation_history.append(langchain_to_hello_message(msg))
-
-            # 用 helloagents Builder 构建上下文
-            context = self.builder.build(
-                user_query=state["messages"][-1].content,
-                conversation_history=conversation_history,
-            )
-
+            context = self._build_context(state, config)
             return generate_query(state,config,context)
-        workflow.add_node("generate_query_node",generate_query_node)
+
+        async def agenerate_query_node(state:OverallState,config:RunnableConfig):
+            context = await self._abuild_context(state, config)
+            return await agenerate_query(state,config,context)
+        add_node("generate_query_node", agenerate_query_node if use_async else generate_query_node)
         # 节点2：等待用户确认
-        workflow.add_node("wait_for_user_confirmation",wait_for_user_confirmation)
-        # 节点3：web查询
-        def web_research_node(state:OverallState,config:RunnableConfig):
-            conversation_history = []
-            # 排除最后一条（当前用户查询）
-            for msg in state["messages"][:-1]:
-                conversation_history.append(langchain_to_hello_message(msg))
+        add_node("wait_for_user_confirmation", wait_for_user_confirmation)
+        # 节点3：web查询（每条查询一个并行分支，由 Send 派发；近似重复的查询不搜索，也不需要构建上下文）
+        def web_research_node(state:WebSearchState,config:RunnableConfig):
+            context = self._build_context(state, config) if state.get("duplicate_of") is None else ""
+            return web_research(state, config, context, self._dedup_for(config))
 
-            # 用 helloagents Builder 构建上下文
-            context = self.builder.build(
-                user_query=state["messages"][-1].content,
-                conversation_history=conversation_history,
-            )
-            return web_research(state, config, context)
-        workflow.add_node("web_research",web_research_node)
+        async def aweb_research_node(state:WebSearchState,config:RunnableConfig):
+            context = await self._abuild_context(state, config) if state.get("duplicate_of") is None else ""
+            return await aweb_research(state, config, context, self._dedup_for(config))
+        add_node("web_research", aweb_research_node if use_async else web_research_node)
         # 节点4：rag查询
-        # 节点5：reflection评估
-        workflow.add_node("reflection",reflection)
-        # 节点6：
-        workflow.add_node("assess_content_quality", assess_content_quality)
-        workflow.add_node("verify_facts", verify_facts)
-        workflow.add_node("assess_relevance", assess_relevance)
-        workflow.add_node("optimize_summary", optimize_summary)
-        workflow.add_node("generate_verification_report", generate_verification_report)
-        workflow.add_node("finalize_answer", finalize_answer)
-
-        def extract_and_add_memory(state: OverallState):
+        # 节点5：每轮研究结果汇合后生成共享的证据摘要，reflection 与质量评估按各自预算取用
+        add_node("build_evidence_digest", build_evidence_digest)
+        # 节点6：新证据占比评估，新内容太少时不调用 reflection 模型
+        add_node("assess_novelty", assess_novelty)
+        # 节点7：reflection评估
+        add_node("reflection", areflection if use_async else reflection)
+        # 节点8：
+        # 三个质量评估节点并行执行，每个分支有独立超时，失败时写入默认值
+        wrap = awith_branch_timeout if use_async else with_branch_timeout
+        add_node("assess_content_quality", wrap(aassess_content_quality if use_async else assess_content_quality, "content_quality"))
+        add_node("verify_facts", wrap(averify_facts if use_async else verify_facts, "fact_verification"))
+        add_node("assess_relevance", wrap(aassess_relevance if use_async else assess_relevance, "relevance_assessment"))
+        # fast_quality_mode：一次调用完成三项评估，超时或失败时三个 key 都取默认值
+        add_node(FAST_QUALITY_NODE, wrap(aassess_quality if use_async else assess_quality,
+                                         "content_quality", "fact_verification", "relevance_assessment"))
+        add_node("optimize_summary", aoptimize_summary if use_async else optimize_summary)
+        add_node("generate_verification_report", generate_verification_report)
+        add_node("finalize_answer", finalize_answer)
+
+        def extract_and_add_memory(state: OverallState, config: RunnableConfig):
             print("开始提取记忆...")
             dialogue_history =build_memory_extraction_input(state)
 
             prompt = memory_extraction_prompt.format(full_state_text=dialogue_history)
 
             # 用 structured LLM（推荐 with_structured_output）
-            llm = ModelInstances.answer_model
-            structured_llm = llm.with_structured_output(MemoryExtractionOutput)
+            llm = get_chat_model("answer", config)
 
             try:
-                result = structured_llm.invoke(prompt)
+                result = invoke_structured(llm, MemoryExtractionOutput, prompt, config, node="extract_and_add_memory")
                 memories = result.memories
                 print(f"提取到 {len(memories)} 条记忆")
             except Exception as e:
                 print("记忆提取失败:", e)
                 memories = []
 
-            added_count = 0
-            for mem in memories:
-                try:
-                    self.memory_tool.execute(
-                        "add",
-                        content=mem.content,
-                        memory_type=mem.memory_type,
-                        importance=mem.importance,
-                    )
-                    added_count += 1
-                    print(f"添加一条{mem.memory_type}记忆成功：{mem.content}")
-                except Exception as e:
-                    print(f"添加记忆失败: {mem}", e)
+            self._add_memories(memories)
 
             # 可选：把添加结果记录到 state
             return
-        workflow.add_node("extract_and_add_memory",extract_and_add_memory)
+
+        async def aextract_and_add_memory(state: OverallState, config: RunnableConfig):
+            print("开始提取记忆...")
+            dialogue_history = build_memory_extraction_input(state)
+
+            prompt = memory_extraction_prompt.format(full_state_text=dialogue_history)
+
+            llm = get_chat_model("answer", config)
+
+            try:
+                result = await ainvoke_structured(llm, MemoryExtractionOutput, prompt, config,
+                                                  node="extract_and_add_memory")
+                memories = result.memories
+                print(f"提取到 {len(memories)} 条记忆")
+            except Exception as e:
+                print("记忆提取失败:", e)
+                memories = []
+
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, contextvars.copy_context().run, self._add_memories, memories)
+            return
+        add_node("extract_and_add_memory", aextract_and_add_memory if use_async else extract_and_add_memory)
+        add_node("summarize_history", asummarize_history if use_async else summarize_history)
         # 边
         workflow.set_entry_point("generate_query_node")
         workflow.add_edge("generate_query_node","wait_for_user_confirmation")
         workflow.add_conditional_edges(
             "wait_for_user_confirmation",
             should_regenerate_queried,
-            {
-                "generate_query_node":"generate_query_node",
-                "web_research":"web_research"
-            }
+            ["generate_query_node","web_research"]
+        )
+        # 所有并行搜索分支汇合后先生成证据摘要、评估新证据占比，再决定是否进入 reflection
+        workflow.add_edge("web_research","build_evidence_digest")
+        workflow.add_edge("build_evidence_digest","assess_novelty")
+        workflow.add_conditional_edges(
+            "assess_novelty",
+            evaluate_novelty,
+            [*QUALITY_ASSESSORS,FAST_QUALITY_NODE,"reflection"]
         )
-        workflow.add_edge("web_research","reflection")
         workflow.add_conditional_edges(
             "reflection",
             evaluate_research,
-            {
-                "assess_content_quality":"assess_content_quality",
-                "web_research":"web_research"
-            }
+            [*QUALITY_ASSESSORS,FAST_QUALITY_NODE,"web_research"]
         )
-        # Quality enhancement pipeline
-        workflow.add_edge("assess_content_quality", "verify_facts")
-        workflow.add_edge("verify_facts", "assess_relevance")
-        workflow.add_edge("assess_relevance", "optimize_summary")
+        # Quality enhancement pipeline：并行评估分支在 optimize_summary 汇合
+        workflow.add_edge(QUALITY_ASSESSORS, "optimize_summary")
+        workflow.add_edge(FAST_QUALITY_NODE, "optimize_summary")
         workflow.add_edge("optimize_summary", "generate_verification_report")
         workflow.add_edge("generate_verification_report", "finalize_answer")
-        # Finalize the answer
+        # Finalize the answer：之后记忆提取与历史摘要并行执行，都不阻塞答案输出
         workflow.add_edge("finalize_answer", "extract_and_add_memory")
+        workflow.add_edge("finalize_answer", "summarize_history")
         workflow.add_edge("extract_and_add_memory",END)
+        workflow.add_edge("summarize_history", END)
         return workflow.compile(checkpointer=self.checkpointer)  # 启用 Checkpointer
-    def run(self, user_query: str, thread_id: str ) -> str:
+    def _dedup_for(self, config: RunnableConfig) -> Optional[ResearchDedup]:
+        return self.research_dedup.get(config.get("configurable", {}).get("batch_id"))
+
+    def _run_config(self, thread_id: str, batch_id: Optional[str] = None) -> dict:
+        config = {"configurable": {"thread_id": thread_id}}
+        if batch_id:
+            config["configurable"]["batch_id"] = batch_id
+        # 限制并行搜索分支数
+        config["max_concurrency"] = Configuration.from_runnable_config(config).max_concurrent_research
+        return config
+
+    def run(self, user_query: str, thread_id: str, batch_id: Optional[str] = None) -> str:
         # 运行 graph，传入初始 state，并用 thread_id 加载/保存历史
 
         user_input=HumanMessage(content=user_query)
-        result = self.graph.invoke({"messages":[user_input]}, config={"configurable": {"thread_id": thread_id}})
+        config = self._run_config(thread_id, batch_id)
+        # 每次运行记录一条 trace（节点 / 模型 / 搜索 span），见 tracer.recent_runs() 与 tracer.prometheus_text()
+        with tracer.run(thread_id, config):
+            result = self.graph.invoke({"messages":[user_input]}, config=config)
 
         # 从最终 state 取最新响应
         last_message = result["messages"][-1] if result["messages"] else {"content": "No response"}
         return last_message.content
+
+    async def arun(self, user_query: str, thread_id: str, batch_id: Optional[str] = None) -> str:
+        """异步版本的 run：全部节点走 ainvoke，阻塞的记忆/RAG 调用在线程池中执行"""
+        user_input = HumanMessage(content=user_query)
+        config = self._run_config(thread_id, batch_id)
+        with tracer.run(thread_id, config):
+            result = await self.async_graph.ainvoke({"messages": [user_input]}, config=config)
+
+        last_message = result["messages"][-1] if result["messages"] else {"content": "No response"}
+        return last_message.content
+
+    def run_batch(self, questions, concurrency: int = 4, on_result=None, progress=None) -> list:
+        """并发研究一批问题（字符串或 {"id", "question"}），相同的搜索查询在任务之间只执行一次
+
+        结果与输入顺序一致，格式见 backend.src.agent.batch.run_batch；JSONL 命令行入口：
+        python -m backend.src.agent.batch questions.jsonl -o results.jsonl
+        """
+        return run_batch(self, questions, concurrency, on_result, progress)
+
+    async def arun_batch(self, questions, concurrency: int = 4, on_result=None, progress=None) -> list:
+        """异步版本的 run_batch"""
+        return await arun_batch(self, questions, concurrency, on_result, progress)
+
+    def pending_nodes(self, thread_id: str) -> tuple:
+        """返回线程最后一个 checkpoint 之后待执行的节点；为空表示该线程没有中断的运行"""
+        return self.graph.get_state(self._run_config(thread_id)).next
+
+    def resume(self, thread_id: str) -> Optional[str]:
+        """从最后一个 checkpoint 续跑被中断的线程（如 worker 重启），已完成的节点不会重新执行
+
+        线程没有待执行节点时返回 None。
+        """
+        if not self.pending_nodes(thread_id):
+            return None
+        config = self._run_config(thread_id)
+        with tracer.run(thread_id, config):
+            result = self.graph.invoke(None, config=config)
+        last_message = result["messages"][-1] if result["messages"] else {"content": "No response"}
+        return last_message.content
+
+    async def aresume(self, thread_id: str) -> Optional[str]:
+        """异步版本的 resume"""
+        config = self._run_config(thread_id)
+        if not (await self.async_graph.aget_state(config)).next:
+            return None
+        with tracer.run(thread_id, config):
+            result = await self.async_graph.ainvoke(None, config=config)
+        last_message = result["messages"][-1] if result["messages"] else {"content": "No response"}
+        return last_message.content
+
+    async def astream(self, user_query: str, thread_id: str):
+        """异步流式运行，逐个产出每个节点完成后的状态更新 {node_name: update}"""
+        user_input = HumanMessage(content=user_query)
+        config = self._run_config(thread_id)
+        with tracer.run(thread_id, config):
+            async for chunk in self.async_graph.astream(
+                    {"messages": [user_input]},
+                    config=config,
+                    stream_mode="updates",
+            ):
+                yield chunk
+
+    def stream_events(self, user_query: str, thread_id: str):
+        """流式运行，产出节点进度、LLM 增量 token 与最终答案分段，最后产出带 TTFT 的 done 事件
+
+        事件格式见 backend.src.agent.streaming.to_events
+        """
+        user_input = HumanMessage(content=user_query)
+        timer = StreamTimer()
+        config = self._run_config(thread_id)
+        with tracer.run(thread_id, config):
+            for mode, chunk in self.graph.stream(
+                    {"messages": [user_input]},
+                    config=config,
+                    stream_mode=STREAM_MODES,
+            ):
+                for event in to_events(mode, chunk):
+                    yield timer.observe(event)
+        yield timer.done()
+
+    async def astream_events(self, user_query: str, thread_id: str):
+        """异步版本的 stream_events"""
+        user_input = HumanMessage(content=user_query)
+        timer = StreamTimer()
+        config = self._run_config(thread_id)
+        with tracer.run(thread_id, config):
+            async for mode, chunk in self.async_graph.astream(
+                    {"messages": [user_input]},
+                    config=config,
+                    stream_mode=STREAM_MODES,
+            ):
+                for event in to_events(mode, chunk):
+                    yield timer.observe(event)
+        yield timer.done()
 # 使用示例
 if __name__ == "__main__":
     agent = MyDeepResearchAgent(user_id="zhengbohao")
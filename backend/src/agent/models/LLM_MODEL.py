@@ -1,42 +1,44 @@
-import logging
-
-from langchain_openai import ChatOpenAI
-
-from backend.src.agent.config.env_utils import LLM_API_KEY, LLM_BASE_URL, TAVILY_API_KEY
-from langchain_tavily import TavilySearch
-
-class ModelInstances:
-    try:
-        query_generator_model = ChatOpenAI(
-            model="qwen-turbo",
-            api_key=LLM_API_KEY,
-            base_url=LLM_BASE_URL,
-            temperature=0.1
-        )
-
-        reflection_model = ChatOpenAI(
-            model="qwen-flash",
-            api_key=LLM_API_KEY,
-            base_url=LLM_BASE_URL
-        )
-
-        answer_model = ChatOpenAI(
-            model="qwen-flash",
-            api_key=LLM_API_KEY,
-            base_url=LLM_BASE_URL
-        )
-
-        leader_llm = ChatOpenAI(
-            model="qwen-max",
-            api_key=LLM_API_KEY,
-            base_url=LLM_BASE_URL
-        )
-
-        tavily_search = TavilySearch(
-            max_results=2,
-            search_depth="advanced",
-            api_key=TAVILY_API_KEY
-        )
-    except Exception as e:
-        logging.error(f"模型初始化失败: {str(e)}")
-        raise
\ No newline at end of file
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from backend.src.agent.models.registry import model_registry
+
+# 旧的类属性名 -> 模型角色
+_ROLE_ATTRIBUTES = {
+    "query_generator_model": "query_generator",
+    "reflection_model": "reflection",
+    "answer_model": "answer",
+    "leader_llm": "leader",
+}
+
+
+class _LazyModelInstances(type):
+    """访问 ModelInstances.xxx 时才通过注册表创建客户端（使用默认配置）"""
+
+    def __getattr__(cls, name):
+        if name in _ROLE_ATTRIBUTES:
+            return model_registry.for_role(_ROLE_ATTRIBUTES[name])
+        if name == "tavily_search":
+            return model_registry.search_tool()
+        raise AttributeError(name)
+
+
+class ModelInstances(metaclass=_LazyModelInstances):
+    """兼容旧代码的模型入口：属性按需创建，不再在 import 时初始化客户端
+
+    直接给属性赋值（如 ModelInstances.answer_model = other_llm）会覆盖注册表，
+    get_chat_model / get_search_tool 也会优先返回该实例。
+    """
+
+
+def get_chat_model(role: str, config: Optional[RunnableConfig] = None):
+    """返回本次请求某个角色使用的模型：显式赋值的 ModelInstances 属性优先，否则按配置从注册表解析"""
+    for attribute, attribute_role in _ROLE_ATTRIBUTES.items():
+        if attribute_role == role and attribute in ModelInstances.__dict__:
+            return ModelInstances.__dict__[attribute]
+    return model_registry.for_role(role, config)
+
+
+def get_search_tool():
+    return ModelInstances.__dict__.get("tavily_search") or model_registry.search_tool()
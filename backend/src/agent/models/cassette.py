@@ -0,0 +1,239 @@
+"""模型与搜索调用的录制 / 回放（cassette）
+
+cassette_mode="record" 时，图中节点发出的每次模型调用与 Tavily 搜索都会被追加写入
+<cassette_dir>/cassette-<时间>-<pid>.jsonl.gz。每行记录一次调用：请求指纹、节点、prompt、
+结构化输出或原始 Tavily 结果，以及观测到的延迟。cassette_mode="replay" 时从目录中的全部 cassette
+读取并按请求指纹返回结果，不需要 key，也不访问网络。
+
+指纹只取调用类型、schema 和归一化后的 prompt（去掉日期、时间戳，折叠空白），不含模型名，
+因此换模型配置或隔天回放仍能命中。改动 MyContextBuilder 或节点后 prompt 会变化，
+此时 cassette_match="nearest"（默认）在同一节点、同一 schema 的录制中选 prompt 最相近的一条
+（字符 3-gram 的 Jaccard 相似度）；cassette_match="exact" 时未命中直接抛出 CassetteMiss。
+
+查看 cassette 内容：
+    python -m backend.src.agent.models.cassette backend/src/agent/cache_data/cassettes
+"""
+import argparse
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.src.agent.cache.search_cache import DEFAULT_CACHE_DIR, normalize_query
+from backend.src.agent.config.configuration import Configuration
+
+DEFAULT_CASSETTE_DIR = DEFAULT_CACHE_DIR / "cassettes"
+
+# prompt 中随运行时间变化的部分：节点注入的当前日期、上下文中的时间戳
+_VOLATILE = re.compile(
+    r"\d{4}年\d{1,2}月\d{1,2}日"
+    r"|\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?"
+    r"|\d{1,2}:\d{2}:\d{2}"
+)
+
+
+class CassetteMiss(LookupError):
+    """回放时找不到与请求对应的录制"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    return re.sub(r"\s+", " ", _VOLATILE.sub("<time>", prompt)).strip()
+
+
+def request_fingerprint(kind: str, schema: Optional[str], prompt: str) -> str:
+    """稳定的请求指纹：搜索按归一化查询，模型调用按 schema + 归一化 prompt"""
+    text = normalize_query(prompt) if kind == "search" else normalize_prompt(prompt)
+    payload = json.dumps([kind, schema, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    return frozenset(hash(text[i:i + size]) for i in range(max(1, len(text) - size + 1)))
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class Cassette:
+    """一个 cassette 目录：录制模式下追加写入，回放模式下加载目录中全部文件并建立索引"""
+
+    # 录制时每攒够这么多条写一次（每次写入是一个独立的 gzip member）
+    FLUSH_EVERY = 50
+
+    def __init__(self, directory: str, mode: str, match: str = "nearest"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.match = match
+        self.hits = 0
+        self.nearest = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._entries: Dict[str, dict] = {}
+        self._groups: Dict[Tuple[str, Optional[str], Optional[str]], List[dict]] = defaultdict(list)
+        if mode == "record":
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.path = self.directory / f"cassette-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl.gz"
+            atexit.register(self.flush)
+        else:
+            self.path = None
+            self._load()
+
+    def _load(self) -> None:
+        for path in sorted(self.directory.glob("*.jsonl.gz")):
+            for entry in read_cassette(path):
+                # 同一指纹录到多次时回放第一条，保证结果与加载顺序无关
+                if entry["fp"] not in self._entries:
+                    self._entries[entry["fp"]] = entry
+                    self._groups[(entry["kind"], entry.get("node"), entry.get("schema"))].append(entry)
+        if not self._entries:
+            print(f"⚠️ cassette 目录中没有录制: {self.directory}")
+
+    def record(self, kind: str, node: Optional[str], model: str, schema: Optional[str], prompt: str,
+               output: Any, latency_ms: float) -> None:
+        entry = {
+            "fp": request_fingerprint(kind, schema, prompt),
+            "kind": kind,
+            "node": node,
+            "model": model,
+            "schema": schema,
+            "prompt": prompt,
+            "output": output,
+            "latency_ms": round(latency_ms, 2),
+            "ts": round(time.time(), 3),
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            self.recorded += 1
+            if len(self._buffer) < self.FLUSH_EVERY:
+                return
+            lines, self._buffer = self._buffer, []
+        self._write(lines)
+
+    def _write(self, lines: List[str]) -> None:
+        with self._lock, gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            self._write(lines)
+
+    def replay(self, kind: str, node: Optional[str], schema: Optional[str], prompt: str) -> dict:
+        """返回与请求对应的录制；找不到时抛出 CassetteMiss"""
+        entry = self._entries.get(request_fingerprint(kind, schema, prompt))
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+        entry = self._nearest(kind, node, schema, prompt) if self.match == "nearest" else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.nearest += 1
+        if entry is None:
+            raise CassetteMiss(f"No recorded {kind} call for node={node} schema={schema}: {prompt[:80]!r}")
+        return entry
+
+    def _nearest(self, kind: str, node: Optional[str], schema: Optional[str], prompt: str) -> Optional[dict]:
+        # 搜索不区分节点；模型调用只在同一节点、同一 schema 的录制中查找
+        if kind == "search":
+            candidates = [entry for (k, _, _), entries in self._groups.items() if k == kind for entry in entries]
+            normalize = normalize_query
+        else:
+            candidates = self._groups.get((kind, node, schema), [])
+            normalize = normalize_prompt
+        if not candidates:
+            return None
+        target = _shingles(normalize(prompt))
+        best, best_score = None, -1.0
+        for entry in candidates:
+            if "_shingles" not in entry:
+                entry["_shingles"] = _shingles(normalize(entry["prompt"]))
+            score = _jaccard(target, entry["_shingles"])
+            # 分数相同时取指纹较小的一条，保证选择结果确定
+            if score > best_score or (score == best_score and entry["fp"] < best["fp"]):
+                best, best_score = entry, score
+        return best
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "directory": str(self.directory),
+                "entries": len(self._entries) if self.mode == "replay" else self.recorded,
+                "hits": self.hits,
+                "nearest": self.nearest,
+                "misses": self.misses,
+            }
+
+
+def read_cassette(path: Path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+_cassettes: Dict[Tuple[str, str, str], Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(configurable: Configuration) -> Optional[Cassette]:
+    """按配置返回进程内共享的 cassette；cassette_mode 为 off 时返回 None"""
+    if configurable.cassette_mode == "off":
+        return None
+    directory = configurable.cassette_dir or str(DEFAULT_CASSETTE_DIR)
+    key = (configurable.cassette_mode, directory, configurable.cassette_match)
+    with _cassettes_lock:
+        if key not in _cassettes:
+            _cassettes[key] = Cassette(directory, configurable.cassette_mode, configurable.cassette_match)
+        return _cassettes[key]
+
+
+def replay_delay(entry: dict, configurable: Configuration) -> float:
+    """回放时需要等待的秒数：录制延迟 × cassette_replay_latency（0 表示不等待）"""
+    return entry.get("latency_ms", 0.0) / 1000 * configurable.cassette_replay_latency
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default=str(DEFAULT_CASSETTE_DIR), help="cassette 目录")
+    args = parser.parse_args(argv)
+
+    files = sorted(Path(args.directory).glob("*.jsonl.gz"))
+    counts: Counter = Counter()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    fingerprints = set()
+    for path in files:
+        for entry in read_cassette(path):
+            name = f"{entry['kind']}:{entry.get('node') or '-'}:{entry.get('schema') or '-'}"
+            counts[name] += 1
+            latencies[name].append(entry.get("latency_ms", 0.0))
+            fingerprints.add(entry["fp"])
+    size = sum(path.stat().st_size for path in files)
+    print(f"{len(files)} files, {sum(counts.values())} calls, {len(fingerprints)} unique, {size / 1024:.1f} KiB")
+    for name, count in sorted(counts.items()):
+        ordered = sorted(latencies[name])
+        print(f"  {name:<60} {count:6d}  p50 {ordered[len(ordered) // 2]:8.1f} ms  "
+              f"max {ordered[-1]:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from backend.src.agent.config.configuration import Configuration
+
+
+class LatencyWindow:
+    """最近 size 次调用延迟的滑动窗口，按需计算分位数"""
+
+    def __init__(self, size: int = 256):
+        self._samples: deque = deque(maxlen=size)
+        self._sorted: Optional[list] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._sorted = None
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            if self._sorted is None:
+                self._sorted = sorted(self._samples)
+            return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+
+class HedgeBudget:
+    """全局对冲预算：每个请求积累 ratio 个额度（最多 burst 个），每次对冲消耗 1 个
+
+    因此长期来看对冲请求数不超过总请求数的 ratio（如 5%），突发慢请求时最多连续对冲 burst 次。
+    """
+
+    def __init__(self, burst: float = 5.0):
+        self.burst = burst
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def on_request(self, ratio: float) -> None:
+        with self._lock:
+            self._credit = min(self.burst, self._credit + ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            return True
+
+
+class HedgeStats:
+    def __init__(self):
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+
+class Hedger:
+    """模型调用的对冲请求（hedged requests）
+
+    按 (模型, 节点) 在线统计延迟；某次调用超过 hedge_percentile 分位数仍未返回时，
+    在预算允许的情况下再发一个相同请求，采用先完成的结果：
+    - 异步路径取消落后的请求；同步路径无法中断阻塞的 HTTP 调用，落后请求在线程池中跑完后丢弃
+    - 对冲请求在全新的 contextvars 上下文中执行，不带 LangGraph 回调，流式输出不会出现重复 token
+    - 样本数不足 hedge_min_samples 时不对冲
+    - 延迟从请求实际开始执行时计时，线程池排队时间不计入，避免高负载下误触发对冲
+    - 异步路径中被取消的主请求按已耗时（不低于阈值）记录，分位数不会只剩下快速完成的样本
+    """
+
+    def __init__(self, max_workers: int = 64):
+        self.budget = HedgeBudget()
+        self._lock = threading.Lock()
+        self._windows: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._stats: Dict[Tuple[str, str], HedgeStats] = {}
+        self._max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _entry(self, key: Tuple[str, str]) -> Tuple[LatencyWindow, HedgeStats]:
+        with self._lock:
+            if key not in self._windows:
+                self._windows[key] = LatencyWindow()
+                self._stats[key] = HedgeStats()
+            return self._windows[key], self._stats[key]
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="agent-hedge")
+            return self._pool
+
+    def _prepare(self, model: str, node: str, configurable: Configuration):
+        window, stats = self._entry((model, node))
+        stats.calls += 1
+        self.budget.on_request(configurable.hedge_budget_ratio)
+        threshold = window.percentile(configurable.hedge_percentile) \
+            if len(window) >= configurable.hedge_min_samples else None
+        return window, stats, threshold
+
+    def _admit(self, admit: Optional[Callable[[], bool]]) -> bool:
+        return self.budget.try_spend() and (admit is None or admit())
+
+    def call(self, fn: Callable[[], Any], model: str, node: str, configurable: Configuration,
+             admit: Optional[Callable[[], bool]] = None) -> Any:
+        """调用 fn，慢于延迟分位数时对冲；admit 为额外的放行条件（如限流器是否还有余量）"""
+        window, stats, threshold = self._prepare(model, node, configurable)
+        start = time.monotonic()
+        if threshold is None:
+            result = fn()
+            window.add(time.monotonic() - start)
+            return result
+
+        started = threading.Event()
+        begin = [start]
+
+        def run():
+            begin[0] = time.monotonic()
+            started.set()
+            return fn()
+
+        primary = self._executor().submit(contextvars.copy_context().run, run)
+        # 主请求的延迟在它完成时记录（即使输掉了对冲），分位数反映的是不对冲时的真实延迟
+        primary.add_done_callback(
+            lambda f: f.cancelled() or f.exception() or window.add(time.monotonic() - begin[0]))
+        started.wait()
+        try:
+            return primary.result(timeout=max(0.0, threshold - (time.monotonic() - begin[0])))
+        except FutureTimeoutError:
+            pass
+        if not self._admit(admit):
+            return primary.result()
+
+        stats.hedged += 1
+        hedge = self._executor().submit(contextvars.Context().run, fn)
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    stats.hedge_wins += future is hedge
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], model: str, node: str, configurable: Configuration,
+                    admit: Optional[Callable[[], bool]] = None) -> Any:
+        """Async variant of :meth:`call`; the losing request is cancelled."""
+        window, stats, threshold = self._prepare(model, node, configurable)
+        start = time.monotonic()
+        if threshold is None:
+            result = await fn()
+            window.add(time.monotonic() - start)
+            return result
+
+        loop = asyncio.get_running_loop()
+        primary = loop.create_task(fn())
+        primary.add_done_callback(
+            lambda t: t.cancelled() or t.exception() or window.add(time.monotonic() - start))
+        pending = {primary}
+        hedged = False
+        try:
+            done, _ = await asyncio.wait(pending, timeout=threshold)
+            if done:
+                return primary.result()
+            if not self._admit(admit):
+                return await primary
+
+            stats.hedged += 1
+            hedged = True
+            hedge = loop.create_task(fn(), context=contextvars.Context())
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        stats.hedge_wins += task is hedge
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            if hedged and primary in pending:
+                # 输掉对冲的主请求被取消，按已耗时记录（截尾样本，至少为阈值）
+                window.add(max(time.monotonic() - start, threshold))
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            items = list(self._stats.items())
+        report = {}
+        for (model, node), stats in items:
+            threshold = self._windows[(model, node)].percentile(
+                Configuration.from_runnable_config().hedge_percentile)
+            report[f"{model}/{node}"] = {
+                "calls": stats.calls,
+                "hedged": stats.hedged,
+                "hedge_wins": stats.hedge_wins,
+                "hedge_rate": stats.hedged / stats.calls if stats.calls else 0.0,
+                "win_rate": stats.hedge_wins / stats.hedged if stats.hedged else 0.0,
+                "threshold_ms": round(threshold * 1000, 2) if threshold is not None else None,
+            }
+        return report
+
+
+# 进程内共享的对冲器（预算在所有模型与节点之间共享）
+hedger = Hedger()
@@ -0,0 +1,397 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional, Type, TypeVar
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel
+
+from backend.src.agent.cache.llm_cache import LLMCache, get_llm_cache
+from backend.src.agent.cache.search_cache import get_search_cache
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.models.LLM_MODEL import get_search_tool
+from backend.src.agent.models.cassette import get_cassette, replay_delay
+from backend.src.agent.models.hedging import hedger
+from backend.src.agent.models.rate_limiter import overload_delay, rate_limiters
+from backend.src.agent.tracing import Span, tracer
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+# 开启 llm_tokens_per_minute 时，每次调用预估的输出 token 数（输入 token 按 prompt 实际计数）
+COMPLETION_TOKENS_ESTIMATE = 512
+
+
+def _search_params() -> dict:
+    """参与缓存 key 的搜索参数，参数变化时不会命中旧结果"""
+    tavily_search = get_search_tool()
+    return {
+        "search_depth": getattr(tavily_search, "search_depth", None),
+        "max_results": getattr(tavily_search, "max_results", None),
+        "topic": getattr(tavily_search, "topic", None),
+    }
+
+
+def _get_cache(configurable: Configuration):
+    if not configurable.search_cache_enabled:
+        return None
+    return get_search_cache(
+        configurable.search_cache_path,
+        ttl_seconds=configurable.search_cache_ttl,
+        max_entries=configurable.search_cache_max_entries,
+    )
+
+
+def _search_error(result: Any) -> Any:
+    # langchain_tavily 捕获请求异常后返回 {"error": e}，而不是抛出
+    return result.get("error") if isinstance(result, dict) else None
+
+
+def _raise_overload(result: Any) -> Any:
+    """把 Tavily 返回的限流/过载错误重新抛出，交给限流器退避重试"""
+    error = _search_error(result)
+    if isinstance(error, BaseException) and overload_delay(error) is not None:
+        raise error
+    return result
+
+
+def _finish_search(span: Span, cache, query: str, params: dict, result: Any) -> Any:
+    error = _search_error(result)
+    if error is not None:
+        span.set(error=f"{type(error).__name__}: {error}")
+    elif cache:
+        cache.set(query, params, result)
+    return result
+
+
+def _search_output(result: Any) -> Any:
+    # 出错的搜索结果不录制
+    return result if _search_error(result) is None else None
+
+
+def _invoke_search(query: str, configurable: Configuration, span: Span) -> Any:
+    cache = _get_cache(configurable)
+    params = _search_params()
+    if cache and not configurable.search_cache_bypass:
+        cached = cache.get(query, params)
+        if cached is not None:
+            span.set(cache_hit=True)
+            return cached
+
+    def search():
+        span.started()
+        return _raise_overload(get_search_tool().invoke(query))
+
+    try:
+        result = rate_limiters.for_search(configurable).call(search) \
+            if configurable.rate_limit_enabled else search()
+    except Exception as e:
+        if overload_delay(e) is None:
+            raise
+        # 重试用尽仍被限流：与 Tavily 的其他错误一样以 {"error": e} 返回
+        result = {"error": e}
+    return _finish_search(span, cache, query, params, result)
+
+
+async def _ainvoke_search(query: str, configurable: Configuration, span: Span) -> Any:
+    # SQLite 缓存的读写是阻塞 IO（还可能等锁），放到线程中执行，不阻塞事件循环
+    cache = _get_cache(configurable)
+    params = _search_params()
+    if cache and not configurable.search_cache_bypass:
+        cached = await asyncio.to_thread(cache.get, query, params)
+        if cached is not None:
+            span.set(cache_hit=True)
+            return cached
+
+    async def search():
+        span.started()
+        return _raise_overload(await get_search_tool().ainvoke(query))
+
+    try:
+        result = await rate_limiters.for_search(configurable).acall(search) \
+            if configurable.rate_limit_enabled else await search()
+    except Exception as e:
+        if overload_delay(e) is None:
+            raise
+        result = {"error": e}
+    if cache:
+        return await asyncio.to_thread(_finish_search, span, cache, query, params, result)
+    return _finish_search(span, cache, query, params, result)
+
+
+def invoke_search(query: str, config: RunnableConfig) -> Any:
+    """调用 Tavily 搜索，优先使用本地缓存
+
+    search_cache_bypass 为 True 时跳过缓存读取（用于对时效敏感的查询），但仍会写入最新结果。
+    未命中缓存的请求经过共享限流器；错误结果不写入缓存。开启 cassette 时录制或回放原始结果。
+    """
+    configurable = Configuration.from_runnable_config(config)
+    with tracer.span("search", "tavily") as span:
+        return _cassette_call(configurable, span, "search", span.node, None, query,
+                              lambda: _invoke_search(query, configurable, span), _search_output, lambda output: output)
+
+
+async def ainvoke_search(query: str, config: RunnableConfig) -> Any:
+    """Async variant of :func:`invoke_search`."""
+    configurable = Configuration.from_runnable_config(config)
+    with tracer.span("search", "tavily") as span:
+        return await _acassette_call(configurable, span, "search", span.node, None, query,
+                                     lambda: _ainvoke_search(query, configurable, span), _search_output,
+                                     lambda output: output)
+
+
+def _get_llm_cache(configurable: Configuration, cacheable: bool):
+    if not (cacheable and configurable.llm_cache_enabled):
+        return None
+    return get_llm_cache(
+        configurable.llm_cache_path,
+        ttl_seconds=configurable.llm_cache_ttl,
+        max_entries=configurable.llm_cache_max_entries,
+    )
+
+
+def _model_name(llm) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", "") or type(llm).__name__
+
+
+def _llm_cache_key(llm, schema: Type[BaseModel], messages: Any) -> str:
+    return LLMCache.make_key(_model_name(llm), getattr(llm, "temperature", None), schema, messages)
+
+
+def _prompt_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(getattr(message, "content", message)) for message in messages)
+
+
+def _estimate_tokens(messages: Any, configurable: Configuration) -> int:
+    if not configurable.llm_tokens_per_minute:
+        return 0
+    from backend.src.agent.contextbuilder.tokenizer import count_tokens
+
+    return count_tokens(_prompt_text(messages)) + COMPLETION_TOKENS_ESTIMATE
+
+
+def _record_usage(span: Span, messages: Any, result: Any) -> None:
+    """把 token 用量写入 span：优先用模型返回的 usage_metadata，结构化输出没有用量时按 tiktoken 估算"""
+    usage = getattr(result, "usage_metadata", None)
+    if usage:
+        span.set(prompt_tokens=usage.get("input_tokens"), completion_tokens=usage.get("output_tokens"))
+        return
+    from backend.src.agent.contextbuilder.tokenizer import count_tokens
+
+    output = result.model_dump_json() if isinstance(result, BaseModel) else str(getattr(result, "content", result))
+    span.set(prompt_tokens=count_tokens(_prompt_text(messages)), completion_tokens=count_tokens(output),
+             tokens_estimated=True)
+
+
+def _usage_tokens(response: Any) -> Optional[int]:
+    return (getattr(response, "usage_metadata", None) or {}).get("total_tokens")
+
+
+def _cassette_call(configurable: Configuration, span: Span, kind: str, node: Optional[str],
+                   schema: Optional[str], messages: Any, call: Callable[[], Any],
+                   encode: Callable[[Any], Any], decode: Callable[[Any], Any]) -> Any:
+    """cassette_mode 为 replay 时直接返回录制的结果，为 record 时执行 call 并录制结果与耗时
+
+    encode 把结果转成可录制的 JSON（返回 None 表示不录制，如出错的搜索），decode 把录制还原为结果。
+    回放不经过缓存、限流器与对冲。
+    """
+    cassette = get_cassette(configurable)
+    if cassette is None:
+        return call()
+    prompt = _prompt_text(messages)
+    if cassette.mode == "replay":
+        entry = cassette.replay(kind, node, schema, prompt)
+        span.set(replayed=True)
+        time.sleep(replay_delay(entry, configurable))
+        return decode(entry["output"])
+    start = time.perf_counter()
+    result = call()
+    output = encode(result)
+    if output is not None:
+        cassette.record(kind, node, span.name, schema, prompt, output, (time.perf_counter() - start) * 1000)
+    return result
+
+
+async def _acassette_call(configurable: Configuration, span: Span, kind: str, node: Optional[str],
+                          schema: Optional[str], messages: Any, call: Callable[[], Awaitable[Any]],
+                          encode: Callable[[Any], Any], decode: Callable[[Any], Any]) -> Any:
+    cassette = get_cassette(configurable)
+    if cassette is None:
+        return await call()
+    prompt = _prompt_text(messages)
+    if cassette.mode == "replay":
+        entry = cassette.replay(kind, node, schema, prompt)
+        span.set(replayed=True)
+        await asyncio.sleep(replay_delay(entry, configurable))
+        return decode(entry["output"])
+    start = time.perf_counter()
+    result = await call()
+    output = encode(result)
+    if output is not None:
+        cassette.record(kind, node, span.name, schema, prompt, output, (time.perf_counter() - start) * 1000)
+    return result
+
+
+def _message_output(message: Any) -> dict:
+    return {"content": message.content, "usage_metadata": getattr(message, "usage_metadata", None)}
+
+
+def _structured_output(schema: Type[BaseModel], result: Any) -> Optional[dict]:
+    return result.model_dump(mode="json") if isinstance(result, schema) else None
+
+
+def _replayed(span: Span, messages: Any, result: Any) -> Any:
+    _record_usage(span, messages, result)
+    return result
+
+
+def _call_model(llm, messages: Any, configurable: Configuration, node: str, span: Span, fn: Callable[[], Any],
+                usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+    """经过该模型的共享限流器调用 fn（rate_limit_enabled 为 False 时直接调用）
+
+    开启 hedging_enabled 时，限流器放行后的调用交给 hedger：对冲请求占用同一个并发名额，
+    但只在请求数令牌桶有余量时发出。fn 真正开始执行前的时间计入 span 的排队等待。
+    """
+    model = _model_name(llm)
+    limiter = rate_limiters.for_model(model, configurable) if configurable.rate_limit_enabled else None
+
+    def call_model():
+        span.started()
+        return fn()
+
+    call = call_model
+    if configurable.hedging_enabled:
+        admit = limiter.try_extra_request if limiter else None
+        call = lambda: hedger.call(call_model, model, node, configurable, admit)
+    if limiter is None:
+        return call()
+    return limiter.call(call, _estimate_tokens(messages, configurable), usage)
+
+
+async def _acall_model(llm, messages: Any, configurable: Configuration, node: str, span: Span,
+                       fn: Callable[[], Awaitable[Any]],
+                       usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+    model = _model_name(llm)
+    limiter = rate_limiters.for_model(model, configurable) if configurable.rate_limit_enabled else None
+
+    def call_model():
+        span.started()
+        return fn()
+
+    call = call_model
+    if configurable.hedging_enabled:
+        admit = limiter.try_extra_request if limiter else None
+        call = lambda: hedger.acall(call_model, model, node, configurable, admit)
+    if limiter is None:
+        return await call()
+    return await limiter.acall(call, _estimate_tokens(messages, configurable), usage)
+
+
+def invoke_text(llm, messages: Any, config: RunnableConfig, node: str) -> BaseMessage:
+    """以普通文本输出调用模型（经过共享限流器），返回模型的 AIMessage
+
+    Args:
+        llm: The chat model to call
+        messages: The prompt string or message list passed to the model
+        config: Configuration for the runnable
+        node: Name of the calling node
+
+    Returns:
+        The model response message
+    """
+    configurable = Configuration.from_runnable_config(config)
+
+    def call():
+        result = _call_model(llm, messages, configurable, node, span, lambda: llm.invoke(messages), _usage_tokens)
+        return _replayed(span, messages, result)
+
+    with tracer.span("llm", _model_name(llm), node) as span:
+        return _cassette_call(configurable, span, "llm", node, None, messages, call, _message_output,
+                              lambda output: _replayed(span, messages, AIMessage(**output)))
+
+
+async def ainvoke_text(llm, messages: Any, config: RunnableConfig, node: str) -> BaseMessage:
+    """Async variant of :func:`invoke_text`."""
+    configurable = Configuration.from_runnable_config(config)
+
+    async def call():
+        result = await _acall_model(llm, messages, configurable, node, span, lambda: llm.ainvoke(messages),
+                                    _usage_tokens)
+        return _replayed(span, messages, result)
+
+    with tracer.span("llm", _model_name(llm), node) as span:
+        return await _acassette_call(configurable, span, "llm", node, None, messages, call, _message_output,
+                                     lambda output: _replayed(span, messages, AIMessage(**output)))
+
+
+def invoke_structured(llm, schema: Type[SchemaT], messages: Any, config: RunnableConfig,
+                      node: str, cacheable: bool = False) -> SchemaT:
+    """以结构化输出调用模型
+
+    cacheable 为 True 且开启 llm_cache_enabled 时，相同模型、温度、schema 与 prompt 的调用直接返回缓存结果。
+    开启 cassette 时录制或回放结构化输出（见 models/cassette.py）。
+
+    Args:
+        llm: The chat model to call
+        schema: The pydantic schema of the structured output
+        messages: The prompt string or message list passed to the model
+        config: Configuration for the runnable
+        node: Name of the calling node, used for per-node cache statistics
+        cacheable: Whether this call may be served from the LLM cache
+
+    Returns:
+        The parsed schema instance
+    """
+    configurable = Configuration.from_runnable_config(config)
+    cache = _get_llm_cache(configurable, cacheable)
+
+    def call():
+        if cache:
+            key = _llm_cache_key(llm, schema, messages)
+            cached = cache.get(key, schema, node)
+            if cached is not None:
+                span.set(cache_hit=True)
+                return cached
+
+        structured = llm.with_structured_output(schema)
+        result = _call_model(llm, messages, configurable, node, span,
+                             lambda: structured.invoke(messages))
+        _record_usage(span, messages, result)
+        if cache and isinstance(result, schema):
+            cache.set(key, result)
+        return result
+
+    with tracer.span("llm", _model_name(llm), node) as span:
+        return _cassette_call(configurable, span, "llm", node, schema.__name__, messages, call,
+                              lambda result: _structured_output(schema, result),
+                              lambda output: _replayed(span, messages, schema.model_validate(output)))
+
+
+async def ainvoke_structured(llm, schema: Type[SchemaT], messages: Any, config: RunnableConfig,
+                             node: str, cacheable: bool = False) -> SchemaT:
+    """Async variant of :func:`invoke_structured`."""
+    configurable = Configuration.from_runnable_config(config)
+    cache = _get_llm_cache(configurable, cacheable)
+
+    async def call():
+        if cache:
+            # SQLite 缓存的读写放到线程中执行，不阻塞事件循环
+            key = _llm_cache_key(llm, schema, messages)
+            cached = await asyncio.to_thread(cache.get, key, schema, node)
+            if cached is not None:
+                span.set(cache_hit=True)
+                return cached
+
+        structured = llm.with_structured_output(schema)
+        result = await _acall_model(llm, messages, configurable, node, span,
+                                    lambda: structured.ainvoke(messages))
+        _record_usage(span, messages, result)
+        if cache and isinstance(result, schema):
+            await asyncio.to_thread(cache.set, key, result)
+        return result
+
+    with tracer.span("llm", _model_name(llm), node) as span:
+        return await _acassette_call(configurable, span, "llm", node, schema.__name__, messages, call,
+                                     lambda result: _structured_output(schema, result),
+                                     lambda output: _replayed(span, messages, schema.model_validate(output)))
@@ -0,0 +1,350 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.config.env_utils import LLM_BASE_URL
+
+# 视为“服务端过载”的状态码：触发 AIMD 降并发、全局暂停与退避重试
+OVERLOAD_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+OVERLOAD_ERROR_NAMES = {"RateLimitError", "APITimeoutError", "InternalServerError", "TimeoutException", "ReadTimeout"}
+# 不代表过载的瞬时错误（连接失败、请求超时、冲突）：与 OpenAI SDK 自带重试的范围一致，只退避重试，不降并发
+TRANSIENT_STATUS_CODES = {408, 409}
+TRANSIENT_ERROR_NAMES = {"APIConnectionError", "ConnectError", "ConnectTimeout", "RemoteProtocolError"}
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+
+
+def overload_delay(error: BaseException) -> Optional[float]:
+    """判断异常是否表示限流/过载：是则返回服务端建议的等待秒数（Retry-After，没有时为 0），否则返回 None"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status in OVERLOAD_STATUS_CODES or type(error).__name__ in OVERLOAD_ERROR_NAMES:
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return max(0.0, float(headers.get("retry-after", 0)))
+        except (TypeError, ValueError):
+            return 0.0
+    message = str(error).lower()
+    if "429" in message or "rate limit" in message:
+        return 0.0
+    return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """连接类错误与 408/409：可以重试，但不是限流信号（按异常的继承链匹配，APITimeoutError 等子类同样适用）"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in TRANSIENT_STATUS_CODES or any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class TokenBucket:
+    """令牌桶：按 rate 每秒补充，最多积累 capacity
+
+    reserve 立即扣除并返回需要等待的秒数（允许欠账），因此并发调用者自动排成均匀的发送时间表，
+    不会在同一时刻一起醒来。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_take(self, amount: float = 1.0) -> bool:
+        """令牌足够时立即扣除并返回 True，否则不扣除（用于可有可无的请求，如对冲）"""
+        with self._lock:
+            self._refill()
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    def adjust(self, amount: float) -> None:
+        """按实际用量修正之前的预估（正数表示多用了）"""
+        with self._lock:
+            self._tokens -= amount
+
+    def pause(self, seconds: float) -> None:
+        """在接下来 seconds 秒内不再放行（收到 429 时让所有调用者一起退避）"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class AIMDLimiter:
+    """AIMD 自适应并发上限：成功时加性增长（每轮约 +1），过载时乘性减半
+
+    与 TCP 拥塞控制一样，每个往返时间（调用延迟的指数滑动平均）内最多减半一次，
+    同一波并发 429 只算一次信号，不会把上限直接压到最小值。
+    同时支持线程（acquire）与协程（aacquire）等待者，空出的名额按先来后到移交。
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64, decrease: float = 0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._last_decrease = 0.0
+        self._latency: Optional[float] = None
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()
+        self.inflight = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.minimum, min(self.maximum, int(self._limit)))
+
+    def _grant_locked(self) -> None:
+        while self._waiters and self.inflight < self.limit:
+            waiter = self._waiters.popleft()
+            self.inflight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_resolve, future)
+
+    def acquire(self) -> None:
+        with self._lock:
+            if not self._waiters and self.inflight < self.limit:
+                self.inflight += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self.inflight < self.limit:
+                self.inflight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter not in self._waiters
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                # 名额已经移交给本协程，取消时要还回去
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self.inflight -= 1
+            self._grant_locked()
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            self._limit = min(float(self.maximum), self._limit + 1.0 / max(self._limit, 1.0))
+            self._grant_locked()
+
+    def on_overload(self) -> bool:
+        """返回本次是否实际减半了上限
+
+        同一往返时间内的后续过载信号不再减半，但上限不会高于仍在正常执行的调用数（inflight 含本次失败的调用），
+        否则被限流的请求归还的名额会立刻让下一个请求也被限流。
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < (self._latency or 1.0):
+                self._limit = min(self._limit, float(max(self.minimum, self.inflight - 1)))
+                return False
+            self._last_decrease = now
+            self._limit = max(float(self.minimum), self._limit * self.decrease)
+            return True
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class ProviderLimiter:
+    """单个 provider/模型的限流器：请求数令牌桶 + 可选的 token 数令牌桶 + AIMD 并发上限
+
+    过载错误（429/5xx/超时）在这里统一退避重试：降低并发上限、按 Retry-After 暂停令牌桶，
+    再以带随机抖动的指数退避重新排队，避免所有在途任务同时重试形成重试风暴。
+    """
+
+    def __init__(self, key: str, requests_per_second: float, tokens_per_minute: int,
+                 max_concurrency: int, max_retries: int):
+        self.key = key
+        self.max_retries = max_retries
+        self.requests: Optional[TokenBucket] = None
+        self.tokens: Optional[TokenBucket] = None
+        self.concurrency = AIMDLimiter(initial=max(1, max_concurrency // 2), maximum=max_concurrency)
+        self.configure(requests_per_second, tokens_per_minute, max_concurrency, max_retries)
+        self.calls = 0
+        self.overloads = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+
+    def configure(self, requests_per_second: float, tokens_per_minute: int,
+                  max_concurrency: int, max_retries: int) -> None:
+        self.settings = (requests_per_second, tokens_per_minute, max_concurrency, max_retries)
+        self.max_retries = max_retries
+        # 0 表示不限制；令牌桶最多积累 1 秒的请求数、10 秒的 token 数
+        self.requests = TokenBucket(requests_per_second, max(1.0, requests_per_second)) \
+            if requests_per_second > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 6) if tokens_per_minute > 0 else None
+        self.concurrency.maximum = max_concurrency
+
+    def _reserve(self, tokens: int) -> float:
+        wait = self.requests.reserve(1) if self.requests else 0.0
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        self.wait_seconds += wait
+        return wait
+
+    def try_extra_request(self) -> bool:
+        """是否可以在不排队的情况下额外发一个请求（对冲请求只在请求数令牌桶有余量时发出）"""
+        return self.requests is None or self.requests.try_take(1)
+
+    def _on_error(self, error: Exception, attempt: int) -> float:
+        """过载或瞬时错误返回重试前的等待秒数；其他错误或重试次数用尽时抛出原异常"""
+        retry_after = overload_delay(error)
+        if retry_after is not None:
+            self.overloads += 1
+            if self.concurrency.on_overload() and retry_after and self.requests:
+                self.requests.pause(retry_after)
+        elif is_transient(error):
+            retry_after = 0.0
+        else:
+            raise error
+        if attempt >= self.max_retries:
+            raise error
+        self.retries += 1
+        backoff = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        return max(retry_after, backoff)
+
+    def _settle(self, result: Any, latency: float, tokens: int,
+                usage: Optional[Callable[[Any], Optional[int]]]) -> None:
+        self.concurrency.on_success(latency)
+        if self.tokens and usage:
+            actual = usage(result)
+            if actual:
+                self.tokens.adjust(actual - tokens)
+
+    def call(self, fn: Callable[[], Any], tokens: int = 0,
+             usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        self.calls += 1
+        attempt = 0
+        while True:
+            time.sleep(self._reserve(tokens))
+            self.concurrency.acquire()
+            start = time.monotonic()
+            try:
+                try:
+                    result = fn()
+                except Exception as e:
+                    # 先根据错误调整并发上限再归还名额，避免名额立刻移交给下一个注定被限流的请求
+                    delay = self._on_error(e, attempt)
+                else:
+                    self._settle(result, time.monotonic() - start, tokens, usage)
+                    return result
+            finally:
+                # 被取消或中断（BaseException）时同样归还名额，但不算过载信号
+                self.concurrency.release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], tokens: int = 0,
+                    usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """Async variant of :meth:`call`; ``fn`` returns an awaitable."""
+        self.calls += 1
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve(tokens))
+            await self.concurrency.aacquire()
+            start = time.monotonic()
+            try:
+                try:
+                    result = await fn()
+                except Exception as e:
+                    # 先根据错误调整并发上限再归还名额，避免名额立刻移交给下一个注定被限流的请求
+                    delay = self._on_error(e, attempt)
+                else:
+                    self._settle(result, time.monotonic() - start, tokens, usage)
+                    return result
+            finally:
+                # asyncio.wait_for 超时、分支超时或客户端断开流式输出时 fn 被取消，名额同样要归还
+                self.concurrency.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "overloads": self.overloads,
+            "retries": self.retries,
+            "concurrency_limit": self.concurrency.limit,
+            "inflight": self.concurrency.inflight,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class RateLimiterRegistry:
+    """进程内共享的限流器，按 "provider/模型" 划分（Tavily 为 "tavily/search"）
+
+    限额取自调用时的 Configuration；配置变化时就地更新令牌桶，AIMD 已学到的并发上限保持不变。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters: Dict[str, ProviderLimiter] = {}
+
+    def _get(self, key: str, settings: Tuple[float, int, int, int]) -> ProviderLimiter:
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    limiter = self._limiters[key] = ProviderLimiter(key, *settings)
+        if limiter.settings != settings:
+            limiter.configure(*settings)
+        return limiter
+
+    def for_model(self, model: str, configurable: Configuration) -> ProviderLimiter:
+        provider = urlparse(LLM_BASE_URL or "").hostname or "openai"
+        return self._get(f"{provider}/{model}", (
+            configurable.llm_requests_per_second,
+            configurable.llm_tokens_per_minute,
+            configurable.llm_max_concurrency,
+            configurable.rate_limit_max_retries,
+        ))
+
+    def for_search(self, configurable: Configuration) -> ProviderLimiter:
+        return self._get("tavily/search", (
+            configurable.search_requests_per_second,
+            0,
+            configurable.search_max_concurrency,
+            configurable.rate_limit_max_retries,
+        ))
+
+    def stats(self) -> dict:
+        return {key: limiter.stats() for key, limiter in self._limiters.items()}
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import weakref
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.config.env_utils import LLM_API_KEY, LLM_BASE_URL, TAVILY_API_KEY
+
+# 各角色对应的 Configuration 字段与默认温度
+ROLE_MODEL_FIELDS = {
+    "query_generator": "query_generator_model",
+    "reflection": "reflection_model",
+    "answer": "answer_model",
+    "leader": "leader_model",
+}
+ROLE_TEMPERATURES = {
+    "query_generator": 0.1,
+}
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import ChatOpenAI
+    from langchain_tavily import TavilySearch
+
+
+class ModelRegistry:
+    """按需创建并复用模型客户端
+
+    - ChatOpenAI 客户端在首次使用时创建，按 (模型名, 温度) 缓存，模型名在每次调用时从
+      Configuration.from_runnable_config 解析，因此可以按请求切换模型而无需重启
+    - 所有 ChatOpenAI 客户端共享同一个 httpx.Client，复用 keep-alive 连接，
+      连接上限由 http_max_connections / http_max_keepalive / http_keepalive_expiry 控制
+    - httpx.AsyncClient 绑定首次使用它的事件循环，因此按事件循环分别创建（在协程中获取的 ChatOpenAI 也按事件循环缓存），
+      多次 asyncio.run（CLI、批处理、基准）不会复用已关闭事件循环上的连接；事件循环关闭后在下次获取时清理
+    - TavilySearch 同样延迟创建（其 SDK 自带 HTTP 客户端，不走共享连接池）
+    - langchain_openai / langchain_tavily / httpx 在首次创建客户端时才导入，不拖慢进程启动
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key 为 (模型名, 温度, 事件循环 id)，不在事件循环中获取时事件循环 id 为 None
+        self._chat_models: Dict[Tuple[str, Optional[float], Optional[int]], "ChatOpenAI"] = {}
+        self._search: Optional["TavilySearch"] = None
+        self._http_client: Optional["httpx.Client"] = None
+        self._http_async_clients: Dict[int, Tuple[weakref.ref, "httpx.AsyncClient"]] = {}
+
+    @staticmethod
+    def _http_settings() -> Tuple["httpx.Limits", "httpx.Timeout"]:
+        import httpx
+
+        configurable = Configuration.from_runnable_config()
+        limits = httpx.Limits(
+            max_connections=configurable.http_max_connections,
+            max_keepalive_connections=configurable.http_max_keepalive,
+            keepalive_expiry=configurable.http_keepalive_expiry,
+        )
+        return limits, httpx.Timeout(configurable.http_timeout, connect=10.0)
+
+    def http_client(self) -> "httpx.Client":
+        import httpx
+
+        with self._lock:
+            if self._http_client is None:
+                limits, timeout = self._http_settings()
+                self._http_client = httpx.Client(limits=limits, timeout=timeout)
+            return self._http_client
+
+    def _prune_async_clients_locked(self) -> None:
+        """丢弃已关闭（或已被回收）的事件循环对应的 AsyncClient 与 ChatOpenAI"""
+        for loop_id, (loop_ref, _) in list(self._http_async_clients.items()):
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                del self._http_async_clients[loop_id]
+                for key in [key for key in self._chat_models if key[2] == loop_id]:
+                    del self._chat_models[key]
+
+    def async_http_client(self) -> Tuple[Optional[int], Optional["httpx.AsyncClient"]]:
+        """当前事件循环的 (事件循环 id, httpx.AsyncClient)；不在事件循环中时返回 (None, None)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None, None
+        import httpx
+
+        with self._lock:
+            entry = self._http_async_clients.get(id(loop))
+            if entry is None or entry[0]() is not loop:
+                self._prune_async_clients_locked()
+                limits, timeout = self._http_settings()
+                client = httpx.AsyncClient(limits=limits, timeout=timeout)
+                entry = self._http_async_clients[id(loop)] = (weakref.ref(loop), client)
+            return id(loop), entry[1]
+
+    def chat_model(self, model: str, temperature: Optional[float] = None) -> "ChatOpenAI":
+        loop_id, http_async_client = self.async_http_client()
+        key = (model, temperature, loop_id)
+        llm = self._chat_models.get(key)
+        if llm is not None:
+            return llm
+        from langchain_openai import ChatOpenAI
+
+        http_client = self.http_client()
+        with self._lock:
+            llm = self._chat_models.get(key)
+            if llm is None:
+                kwargs = {"temperature": temperature} if temperature is not None else {}
+                if http_async_client is not None:
+                    kwargs["http_async_client"] = http_async_client
+                # 启用共享限流器时由它统一退避重试（过载、连接错误与 408/409，与 SDK 默认范围一致），SDK 自身不再重试，避免重试叠加
+                if Configuration.from_runnable_config().rate_limit_enabled:
+                    kwargs["max_retries"] = 0
+                llm = ChatOpenAI(
+                    model=model,
+                    api_key=LLM_API_KEY,
+                    base_url=LLM_BASE_URL,
+                    http_client=http_client,
+                    **kwargs,
+                )
+                self._chat_models[key] = llm
+            return llm
+
+    def for_role(self, role: str, config: Optional[RunnableConfig] = None) -> "ChatOpenAI":
+        """按角色（query_generator / reflection / answer / leader）解析本次请求使用的模型"""
+        configurable = Configuration.from_runnable_config(config)
+        model = getattr(configurable, ROLE_MODEL_FIELDS[role])
+        return self.chat_model(model, ROLE_TEMPERATURES.get(role))
+
+    def search_tool(self) -> "TavilySearch":
+        if self._search is None:
+            from langchain_tavily import TavilySearch
+
+            with self._lock:
+                if self._search is None:
+                    self._search = TavilySearch(
+                        max_results=2,
+                        search_depth="advanced",
+                        api_key=TAVILY_API_KEY,
+                    )
+        return self._search
+
+    def stats(self) -> dict:
+        return {
+            "chat_models": sorted({f"{model}@{temperature}" for model, temperature, _ in self._chat_models}),
+            "search_tool": self._search is not None,
+            "http_pool": self._http_client is not None,
+            "async_http_pools": len(self._http_async_clients),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            # AsyncClient 只能在所属事件循环中关闭，这里仅丢弃引用
+            self._http_async_clients.clear()
+            self._chat_models.clear()
+
+
+# 进程内共享的模型注册表
+model_registry = ModelRegistry()
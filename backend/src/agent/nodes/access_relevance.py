@@ -1,11 +1,35 @@
 from langchain_core.runnables import RunnableConfig
 
 from backend.src.agent.format.schema import RelevanceAssessment
-from backend.src.agent.models.LLM_MODEL import ModelInstances
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_structured, ainvoke_structured
+from backend.src.agent.nodes.evidence_digest import evidence_for
 from backend.src.agent.prompts.relevance_assessment_prompt import relevance_assessment_instructions
 from backend.src.agent.states.overallstate import OverallState
 
 
+def _format_prompt(state: OverallState, config: RunnableConfig) -> str:
+    # Research evidence: the shared digest rendered under this node's token budget
+    combined_content = evidence_for(state, config, "assess_relevance")
+
+    # Format the prompt
+    return relevance_assessment_instructions.format(
+        research_topic=state["search_query"],
+        content=combined_content
+    )
+
+
+def _to_update(result: RelevanceAssessment) -> dict:
+    return {
+        "relevance_assessment": {
+            "relevance_score": result.relevance_score,
+            "key_topics_covered": result.key_topics_covered,
+            "missing_topics": result.missing_topics,
+            "content_alignment": result.content_alignment
+        }
+    }
+
+
 def assess_relevance(state: OverallState, config: RunnableConfig):
     """LangGraph node that assesses content relevance to the research topic.
 
@@ -19,26 +43,16 @@ def assess_relevance(state: OverallState, config: RunnableConfig):
     Returns:
         Dictionary with state update including relevance assessment
     """
+    # Initialize DeepSeek
+    llm = get_chat_model("answer", config)
 
-    # Combine all research content
-    combined_content = "\n\n---\n\n".join(state["web_research_result"])
-
-    # Format the prompt
-    formatted_prompt = relevance_assessment_instructions.format(
-        research_topic=state["search_query"],
-        content=combined_content
-    )
+    result = invoke_structured(llm, RelevanceAssessment, _format_prompt(state, config), config, node="assess_relevance", cacheable=True)
+    return _to_update(result)
 
-    # Initialize DeepSeek
-    llm = ModelInstances.answer_model
 
-    result = llm.with_structured_output(RelevanceAssessment).invoke(formatted_prompt)
+async def aassess_relevance(state: OverallState, config: RunnableConfig):
+    """Async variant of :func:`assess_relevance` that awaits the model with ``ainvoke``."""
+    llm = get_chat_model("answer", config)
 
-    return {
-        "relevance_assessment": {
-            "relevance_score": result.relevance_score,
-            "key_topics_covered": result.key_topics_covered,
-            "missing_topics": result.missing_topics,
-            "content_alignment": result.content_alignment
-        }
-    }
\ No newline at end of file
+    result = await ainvoke_structured(llm, RelevanceAssessment, _format_prompt(state, config), config, node="assess_relevance", cacheable=True)
+    return _to_update(result)
@@ -2,11 +2,37 @@ from langchain_core.runnables import RunnableConfig
 
 from backend.src.agent.config.configuration import Configuration
 from backend.src.agent.format.schema import ContentQualityAssessment
-from backend.src.agent.models.LLM_MODEL import ModelInstances
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_structured, ainvoke_structured
+from backend.src.agent.nodes.evidence_digest import evidence_for
 from backend.src.agent.prompts.content_quality_prompt import content_quality_instructions
 from backend.src.agent.states.overallstate import OverallState
 
 
+def _format_prompt(state: OverallState, config: RunnableConfig) -> str:
+    # Research evidence: the shared digest rendered under this node's token budget
+    combined_content = evidence_for(state, config, "assess_content_quality")
+
+    # Format the prompt
+    return content_quality_instructions.format(
+        research_topic=state["search_query"],
+        content=combined_content
+    )
+
+
+def _to_update(result: ContentQualityAssessment) -> dict:
+    print(f"内容质量打分如下：\n{result}")
+
+    return {
+        "content_quality": {
+            "quality_score": result.quality_score,
+            "reliability_assessment": result.reliability_assessment,
+            "content_gaps": result.content_gaps,
+            "improvement_suggestions": result.improvement_suggestions
+        }
+    }
+
+
 def assess_content_quality(state: OverallState, config: RunnableConfig):
     """LangGraph node that assesses the quality and reliability of research content.
 
@@ -20,28 +46,16 @@ def assess_content_quality(state: OverallState, config: RunnableConfig):
     Returns:
         Dictionary with state update including content quality assessment
     """
-
-    # Combine all research content
-    combined_content = "\n\n---\n\n".join(state["web_research_result"])
-
-    # Format the prompt
-    formatted_prompt = content_quality_instructions.format(
-        research_topic=state["search_query"],
-        content=combined_content
-    )
-
     # Initialize DeepSeek
-    llm = ModelInstances.answer_model
+    llm = get_chat_model("answer", config)
 
-    result = llm.with_structured_output(ContentQualityAssessment).invoke(formatted_prompt)
+    result = invoke_structured(llm, ContentQualityAssessment, _format_prompt(state, config), config, node="assess_content_quality", cacheable=True)
+    return _to_update(result)
 
-    print(f"内容质量打分如下：\n{result}")
 
-    return {
-        "content_quality": {
-            "quality_score": result.quality_score,
-            "reliability_assessment": result.reliability_assessment,
-            "content_gaps": result.content_gaps,
-            "improvement_suggestions": result.improvement_suggestions
-        }
-    }
\ No newline at end of file
+async def aassess_content_quality(state: OverallState, config: RunnableConfig):
+    """Async variant of :func:`assess_content_quality` that awaits the model with ``ainvoke``."""
+    llm = get_chat_model("answer", config)
+
+    result = await ainvoke_structured(llm, ContentQualityAssessment, _format_prompt(state, config), config, node="assess_content_quality", cacheable=True)
+    return _to_update(result)
@@ -0,0 +1,158 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Optional, Set
+
+from langchain_core.runnables import RunnableConfig
+
+from backend.src.agent.cache.search_cache import normalize_query
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.nodes.quality_branch import quality_nodes
+from backend.src.agent.states.overallstate import OverallState
+from backend.src.agent.states.sub_states.reflectionstate import ReflectionState
+from backend.src.agent.tracing import tracer
+
+# 字符 shingle 长度；只保留哈希能被 SAMPLE_MOD 整除的 shingle（取样后集合大小约为 1/4，重合率估计基本不变）
+SHINGLE_SIZE = 5
+SAMPLE_MOD = 4
+
+# 引用标记（[2-3]）与 URL 在每个分支中都不同，不参与比较
+_MARKERS = re.compile(r"\[\d+-\d+\]|https?://\S+")
+
+
+def shingles(texts: Iterable[str]) -> Set[int]:
+    result = set()
+    for text in texts:
+        text = normalize_query(_MARKERS.sub(" ", text))
+        values = {zlib.crc32(text[i:i + SHINGLE_SIZE].encode("utf-8"))
+                  for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+        # 很短的文本可能一个也取不到，此时保留全部 shingle
+        result |= {value for value in values if value % SAMPLE_MOD == 0} or values
+    return result
+
+
+class EvidenceIndex:
+    """一个线程已收集证据的 shingle 集合，随每轮 web_research 增量更新"""
+
+    def __init__(self):
+        self.count = 0
+        self.shingles: Set[int] = set()
+        self.lock = threading.Lock()
+
+    def novelty(self, results: list, seen: int) -> float:
+        """最新结果（results[seen:]）中未出现过的 shingle 占比，并把它们并入索引
+
+        索引与 seen 不一致（进程重启、LRU 淘汰、从 checkpoint 续跑）时先用 results[:seen] 重建。
+        """
+        with self.lock:
+            if self.count != seen:
+                self.shingles = shingles(results[:seen])
+            new = shingles(results[seen:])
+            fresh = len(new - self.shingles)
+            self.shingles |= new
+            self.count = len(results)
+            return fresh / len(new) if new else 0.0
+
+
+class EvidenceIndexes:
+    """按 thread_id 保存 EvidenceIndex，超过 max_threads 时淘汰最久未使用的线程"""
+
+    def __init__(self, max_threads: int = 256):
+        self.max_threads = max_threads
+        self._indexes: "OrderedDict[str, EvidenceIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: Optional[str]) -> EvidenceIndex:
+        if not thread_id:
+            return EvidenceIndex()
+        with self._lock:
+            index = self._indexes.get(thread_id)
+            if index is None:
+                index = self._indexes[thread_id] = EvidenceIndex()
+            self._indexes.move_to_end(thread_id)
+            while len(self._indexes) > self.max_threads:
+                self._indexes.popitem(last=False)
+            return index
+
+
+_indexes = EvidenceIndexes()
+
+
+def _reflection_tokens(state: OverallState, config: RunnableConfig) -> int:
+    """跳过的 reflection 调用预计消耗的 token（prompt 实际计数 + 输出预估）"""
+    from backend.src.agent.contextbuilder.tokenizer import count_tokens
+    from backend.src.agent.models.model_calls import COMPLETION_TOKENS_ESTIMATE
+    from backend.src.agent.nodes.reflection import _format_prompt
+
+    return count_tokens(_format_prompt(state, config)) + COMPLETION_TOKENS_ESTIMATE
+
+
+def assess_novelty(state: OverallState, config: RunnableConfig):
+    """LangGraph node that decides whether the reflection model needs to run after a research round.
+
+    Compares the newest web research results against everything gathered earlier in the thread
+    using sampled character-shingle overlap, maintained incrementally per thread. Reflection is
+    skipped when the round added less than ``novelty_threshold`` new material. With
+    ``novelty_skip_at_loop_budget`` it is also skipped when the loop budget is already spent, at the
+    cost of leaving the reflection's knowledge gap empty for memory extraction and the quality nodes.
+
+    Args:
+        state: Current graph state containing the accumulated web research results
+        config: Configuration for the runnable, including the novelty settings
+
+    Returns:
+        Dictionary with state update, including the novelty report and, when reflection is
+        skipped, the reflection state that ends the research loop
+    """
+    configurable = Configuration.from_runnable_config(config)
+    if not configurable.novelty_early_stop:
+        return {"novelty": None}
+
+    results = state["web_research_result"]
+    seen = (state.get("novelty") or {}).get("evidence_count", 0)
+    thread_id = config.get("configurable", {}).get("thread_id")
+    novelty = _indexes.get(thread_id).novelty(results, min(seen, len(results)))
+
+    max_research_loops = (
+        state.get("max_research_loops")
+        if state.get("max_research_loops") is not None
+        else configurable.max_research_loops
+    )
+    count = (state.get("reflection") or {}).get("research_loop_count", 0) + 1
+    if configurable.novelty_skip_at_loop_budget and count >= max_research_loops:
+        # reflection 之后无论结论如何都会进入质量评估，跳过它只损失 knowledge_gap
+        reason, loops_saved = "loop_budget", 0
+    elif novelty < configurable.novelty_threshold and count < max_research_loops:
+        reason, loops_saved = "redundant", 1
+    else:
+        reason, loops_saved = "", 0
+
+    report = {
+        "novelty_score": round(novelty, 4),
+        "evidence_count": len(results),
+        "skipped_reflection": bool(reason),
+        "reason": reason,
+        "loops_saved": loops_saved,
+        "tokens_saved": _reflection_tokens(state, config) if reason else 0,
+    }
+    with tracer.span("novelty", reason or "continue") as span:
+        span.set(novelty=report["novelty_score"], loops_saved=loops_saved, tokens_saved=report["tokens_saved"])
+    print(f"新证据占比 {novelty:.2%}" + (f"，跳过 reflection（{reason}）" if reason else ""))
+
+    if not reason:
+        return {"novelty": report}
+    reflection = ReflectionState(is_sufficient=reason == "redundant", knowledge_gap="", follow_up_queries=[],
+                                 research_loop_count=count, number_of_ran_queries=len(state["search_query"]))
+    return {"novelty": report, "reflection": reflection}
+
+
+def evaluate_novelty(state: OverallState, config: RunnableConfig):
+    """LangGraph routing function after assess_novelty.
+
+    Returns:
+        The quality assessment nodes when reflection was skipped, otherwise "reflection"
+    """
+    if (state.get("novelty") or {}).get("skipped_reflection"):
+        return quality_nodes(config)
+    return "reflection"
@@ -0,0 +1,59 @@
+from langchain_core.runnables import RunnableConfig
+
+from backend.src.agent.format.schema import QualityAssessment
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_structured, ainvoke_structured
+from backend.src.agent.nodes import access_relevance, assess_content_quality, verify_facts
+from backend.src.agent.nodes.evidence_digest import evidence_for
+from backend.src.agent.prompts.query_pormpt import get_current_date
+from backend.src.agent.prompts.quality_assessment_prompt import quality_assessment_instructions
+from backend.src.agent.states.overallstate import OverallState
+
+
+def _format_prompt(state: OverallState, config: RunnableConfig) -> str:
+    # Research evidence: the shared digest rendered under this node's token budget
+    content = evidence_for(state, config, "assess_quality")
+
+    # Format the prompt
+    return quality_assessment_instructions.format(
+        current_date=get_current_date(),
+        research_topic=state["search_query"],
+        content=content
+    )
+
+
+def _to_update(result: QualityAssessment) -> dict:
+    # 拆回三个评估节点各自的 state key，optimize_summary 与验证报告无需区分模式
+    return {
+        **assess_content_quality._to_update(result.content_quality),
+        **verify_facts._to_update(result.fact_verification),
+        **access_relevance._to_update(result.relevance_assessment),
+    }
+
+
+def assess_quality(state: OverallState, config: RunnableConfig):
+    """LangGraph node that assesses quality, facts and relevance in one structured call.
+
+    Used instead of the three parallel quality assessors when ``fast_quality_mode`` is on, so
+    the shared evidence is sent to the model once rather than three times.
+
+    Args:
+        state: Current graph state containing web research results
+        config: Configuration for the runnable
+
+    Returns:
+        Dictionary with state update including the content_quality, fact_verification and
+        relevance_assessment keys
+    """
+    llm = get_chat_model("answer", config)
+
+    result = invoke_structured(llm, QualityAssessment, _format_prompt(state, config), config, node="assess_quality", cacheable=True)
+    return _to_update(result)
+
+
+async def aassess_quality(state: OverallState, config: RunnableConfig):
+    """Async variant of :func:`assess_quality` that awaits the model with ``ainvoke``."""
+    llm = get_chat_model("answer", config)
+
+    result = await ainvoke_structured(llm, QualityAssessment, _format_prompt(state, config), config, node="assess_quality", cacheable=True)
+    return _to_update(result)
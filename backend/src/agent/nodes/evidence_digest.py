@@ -0,0 +1,152 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.runnables import RunnableConfig
+from rank_bm25 import BM25Okapi
+
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.contextbuilder.tokenizer import count_tokens, default_tokenizer
+from backend.src.agent.query_ledger import similarity
+from backend.src.agent.states.overallstate import OverallState
+from backend.src.agent.tracing import tracer
+
+# 各节点可用的证据 token 预算 = evidence_digest_tokens × 倍数
+# 事实核查与总结优化需要更多细节，相关性评估只需看覆盖了哪些主题
+CONSUMER_BUDGETS = {
+    "reflection": 0.75,
+    "assess_content_quality": 1.0,
+    "verify_facts": 1.5,
+    "assess_relevance": 0.5,
+    "optimize_summary": 1.5,
+    "assess_quality": 1.5,
+}
+# 词集合 Jaccard 相似度达到该值的句子视为重复，只保留得分较高的一句
+DUPLICATE_SIMILARITY = 0.8
+# 太短的片段（标题、分隔线、孤立的引用编号）不作为句子
+MIN_SENTENCE_CHARS = 8
+
+SEPARATOR = "\n\n---\n\n"
+# 句子到句末标点（英文句号需后跟空白）或换行为止，句末紧跟的引用编号归入该句
+_SENTENCE = re.compile(r"(?:[^。！？!?；;.\n]|\.(?!\s))+(?:[。！？!?；;]+|\.(?=\s)|\n|$)(?:[ \t]*\[\d+-\d+\])*")
+_MARKER_ONLY = re.compile(r"^[\s\[\]\d\-,，、]*$")
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for match in _SENTENCE.finditer(text):
+        part = match.group().strip().lstrip("#*->• ").strip()
+        if len(part) >= MIN_SENTENCE_CHARS and not _MARKER_ONLY.match(part):
+            sentences.append(part)
+    return sentences
+
+
+def build_digest(results: List[str], queries: List[str]) -> dict:
+    """把全部研究结果切成句子，按与研究主题的 BM25 相关性排序并去重
+
+    每条研究结果的最佳句子排在最前（保证每个分支至少有一句进入摘要），其余句子按得分降序。
+    sentences 中每项为 [句子, token 数, 结果序号, 句子序号]，渲染时按预算截取前缀再恢复原文顺序。
+    """
+    sentences = [(text, index, position) for index, result in enumerate(results)
+                 for position, text in enumerate(split_sentences(result))]
+    if not sentences:
+        return {"evidence_count": len(results), "sentences": [], "total_tokens": 0}
+
+    corpus = default_tokenizer.tokenize_batch([text for text, _, _ in sentences])
+    query_tokens = [token for query in queries for token in default_tokenizer.tokenize(query)]
+    # BM25Okapi 在语料全空时会除零，此时按原文顺序排列
+    if query_tokens and any(corpus):
+        scores = np.clip(np.asarray(BM25Okapi(corpus).get_scores(query_tokens), dtype=float), 0.0, None)
+    else:
+        scores = np.zeros(len(sentences))
+
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], sentences[i][1], sentences[i][2]))
+    # 前缀过滤：词按文档频率从低到高排序后，Jaccard 达到阈值的两句在各自前缀中必有共同词，
+    # 因此只为前缀建倒排索引，候选句再用完整词集合核对
+    frequency = Counter(term for tokens in corpus for term in set(tokens))
+    kept, kept_terms, leaders = [], [], {}
+    index: Dict[str, List[int]] = defaultdict(list)
+    for i in ranked:
+        terms = sorted(set(corpus[i]), key=lambda term: (frequency[term], term))
+        prefix = terms[:len(terms) - math.ceil(DUPLICATE_SIMILARITY * len(terms)) + 1]
+        term_set = frozenset(terms)
+        candidates = {k for term in prefix for k in index.get(term, ())}
+        if any(similarity(term_set, kept_terms[k]) >= DUPLICATE_SIMILARITY for k in candidates):
+            continue
+        for term in prefix:
+            index[term].append(len(kept))
+        kept.append(i)
+        kept_terms.append(term_set)
+        leaders.setdefault(sentences[i][1], i)
+    first = set(leaders.values())
+    order = [i for i in kept if i in first] + [i for i in kept if i not in first]
+
+    entries = [[sentences[i][0], count_tokens(sentences[i][0]), sentences[i][1], sentences[i][2]] for i in order]
+    return {
+        "evidence_count": len(results),
+        "sentences": entries,
+        "total_tokens": sum(entry[1] for entry in entries),
+    }
+
+
+def render_digest(digest: dict, budget: int) -> str:
+    """按排序取预算内的句子，恢复原文顺序，同一条研究结果的句子合为一段"""
+    selected, used = [], 0
+    for entry in digest["sentences"]:
+        if used + entry[1] > budget and selected:
+            continue
+        selected.append(entry)
+        used += entry[1]
+    selected.sort(key=lambda entry: (entry[2], entry[3]))
+    blocks: List[List[str]] = []
+    previous = None
+    for text, _, index, _ in selected:
+        if index != previous:
+            blocks.append([])
+            previous = index
+        blocks[-1].append(text)
+    return SEPARATOR.join("\n".join(block) for block in blocks)
+
+
+def evidence_for(state: OverallState, config: RunnableConfig, consumer: str) -> str:
+    """consumer 节点 prompt 中使用的研究证据
+
+    关闭 evidence_digest_enabled 时返回全部研究结果；state 中的摘要与当前结果数不一致时
+    （如从旧 checkpoint 续跑）当场重新计算。
+    """
+    results = state["web_research_result"]
+    configurable = Configuration.from_runnable_config(config)
+    if not configurable.evidence_digest_enabled:
+        return SEPARATOR.join(results)
+    digest = state.get("evidence_digest")
+    if not digest or digest.get("evidence_count") != len(results):
+        digest = build_digest(results, state["search_query"])
+    return render_digest(digest, int(configurable.evidence_digest_tokens * CONSUMER_BUDGETS[consumer]))
+
+
+def build_evidence_digest(state: OverallState, config: RunnableConfig):
+    """LangGraph node that condenses the research results into one shared evidence digest per round.
+
+    Splits every web research result into sentences, ranks them against the research queries with
+    BM25 and drops near-duplicate sentences, keeping the citation markers in place. Reflection and
+    the quality pipeline render the digest under their own token budget instead of each sending
+    the full corpus.
+
+    Args:
+        state: Current graph state containing the web research results and search queries
+        config: Configuration for the runnable, including the digest settings
+
+    Returns:
+        Dictionary with state update, including the evidence_digest key
+    """
+    configurable = Configuration.from_runnable_config(config)
+    if not configurable.evidence_digest_enabled:
+        return {"evidence_digest": None}
+    digest = build_digest(state["web_research_result"], state["search_query"])
+    with tracer.span("digest", "evidence") as span:
+        full_tokens = count_tokens(SEPARATOR.join(state["web_research_result"]))
+        span.set(sentences=len(digest["sentences"]), digest_tokens=digest["total_tokens"], full_tokens=full_tokens)
+    print(f"证据摘要：{len(digest['sentences'])} 句，{digest['total_tokens']} / {full_tokens} tokens")
+    return {"evidence_digest": digest}
@@ -1,4 +1,3 @@
-from hello_agents.tools import MemoryTool
 from langchain_core.messages import HumanMessage
 
 from backend.src.agent.format.schema import MemoryExtractionOutput
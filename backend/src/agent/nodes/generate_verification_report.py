@@ -1,5 +1,6 @@
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
 
 from backend.src.agent.states.overallstate import OverallState
 
@@ -61,7 +62,9 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
     """LangGraph node that finalizes the enhanced research summary.
 
     Creates the final output using the quality-enhanced summary, verification report,
-    and properly formatted sources with citations.
+    and properly formatted sources with citations. Each section is emitted on the
+    ``custom`` stream as soon as it is formatted, so streaming clients can render the
+    answer before memory extraction finishes.
 
     Args:
         state: Current graph state containing the enhanced summary and all assessment results
@@ -69,24 +72,23 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
     Returns:
         Dictionary with state update, including the final enhanced message with sources
     """
+    writer = get_stream_writer()
+
     # Use the optimized summary if available, otherwise fall back to original
     final_summary = state.get("quality_enhanced_summary") or "\n---\n\n".join(state["web_research_result"])
     verification_report = state.get("verification_report", "")
 
-    # Combine the enhanced summary with verification report
-    enhanced_content = f"""{final_summary}
----
-
-{verification_report}"""
-
     # Replace the short urls with the original urls and add all used urls to the sources_gathered
     unique_sources = []
-    for source in state["sources_gathered"]:
-        if source["short_url"] in enhanced_content:
-            enhanced_content = enhanced_content.replace(
-                source["short_url"], source["value"]
-            )
-            unique_sources.append(source)
+    sections = [("summary", f"{final_summary}\n---\n\n"), ("verification_report", verification_report)]
+    for idx, (name, text) in enumerate(sections):
+        for source in state["sources_gathered"]:
+            if source["short_url"] in text:
+                text = text.replace(source["short_url"], source["value"])
+                if source not in unique_sources:
+                    unique_sources.append(source)
+        sections[idx] = (name, text)
+        writer({"section": name, "content": text})
 
     # Add quality metrics to the final message
     quality_metrics = f"\n\n## 研究质量指标\n"
@@ -94,10 +96,11 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
     quality_metrics += f"- 内容质量评分: {state.get('content_quality', {}).get('quality_score', 'N/A')}/1.0\n"
     quality_metrics += f"- 事实验证置信度: {state.get('fact_verification', {}).get('confidence_score', 'N/A')}/1.0\n"
     quality_metrics += f"- 相关性评分: {state.get('relevance_assessment', {}).get('relevance_score', 'N/A')}/1.0\n"
+    writer({"section": "quality_metrics", "content": quality_metrics})
 
-    final_content = enhanced_content + quality_metrics
+    final_content = "".join(text for _, text in sections) + quality_metrics
 
     return {
         "messages": [AIMessage(content=final_content)],
         "sources_gathered": unique_sources,
-    }
\ No newline at end of file
+    }
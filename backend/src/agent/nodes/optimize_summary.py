@@ -1,32 +1,21 @@
 from langchain_core.runnables import RunnableConfig
 
 from backend.src.agent.format.schema import SummaryOptimization
-from backend.src.agent.models.LLM_MODEL import ModelInstances
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_structured, ainvoke_structured
+from backend.src.agent.nodes.evidence_digest import evidence_for
 from backend.src.agent.prompts.query_pormpt import get_current_date
 from backend.src.agent.prompts.summary_optimization_prompt import summary_optimization_instructions
 from backend.src.agent.states.overallstate import OverallState
 
 
-def optimize_summary(state: OverallState, config: RunnableConfig):
-    """LangGraph node that optimizes and enhances the research summary.
-
-    Uses quality assessment, fact verification, and relevance analysis to
-    create an optimized summary with key insights and actionable items.
-
-    Args:
-        state: Current graph state containing all assessment results
-        config: Configuration for the runnable
-
-    Returns:
-        Dictionary with state update including optimized summary
-    """
-
-    # Get original summary
-    original_summary = "\n\n---\n\n".join(state["web_research_result"])
+def _format_prompt(state: OverallState, config: RunnableConfig) -> str:
+    # Get original summary (the shared evidence digest under this node's token budget)
+    original_summary = evidence_for(state, config, "optimize_summary")
 
     # Format the prompt with all assessment results
     current_date = get_current_date()
-    formatted_prompt = summary_optimization_instructions.format(
+    return summary_optimization_instructions.format(
         current_date=current_date,
         research_topic=state["search_query"],
         original_summary=original_summary,
@@ -35,11 +24,8 @@ def optimize_summary(state: OverallState, config: RunnableConfig):
         relevance_assessment=str(state.get("relevance_assessment", {}))
     )
 
-    # Initialize DeepSeek
-    llm = ModelInstances.answer_model
-
-    result = llm.with_structured_output(SummaryOptimization).invoke(formatted_prompt)
 
+def _to_update(state: OverallState, result: SummaryOptimization) -> dict:
     # Calculate final confidence score
     quality_score = state.get("content_quality", {}).get("quality_score", 0.5)
     fact_confidence = state.get("fact_verification", {}).get("confidence_score", 0.5)
@@ -55,4 +41,32 @@ def optimize_summary(state: OverallState, config: RunnableConfig):
         },
         "quality_enhanced_summary": result.optimized_summary,
         "final_confidence_score": final_confidence
-    }
\ No newline at end of file
+    }
+
+
+def optimize_summary(state: OverallState, config: RunnableConfig):
+    """LangGraph node that optimizes and enhances the research summary.
+
+    Uses quality assessment, fact verification, and relevance analysis to
+    create an optimized summary with key insights and actionable items.
+
+    Args:
+        state: Current graph state containing all assessment results
+        config: Configuration for the runnable
+
+    Returns:
+        Dictionary with state update including optimized summary
+    """
+    # Initialize DeepSeek
+    llm = get_chat_model("answer", config)
+
+    result = invoke_structured(llm, SummaryOptimization, _format_prompt(state, config), config, node="optimize_summary", cacheable=True)
+    return _to_update(state, result)
+
+
+async def aoptimize_summary(state: OverallState, config: RunnableConfig):
+    """Async variant of :func:`optimize_summary` that awaits the model with ``ainvoke``."""
+    llm = get_chat_model("answer", config)
+
+    result = await ainvoke_structured(llm, SummaryOptimization, _format_prompt(state, config), config, node="optimize_summary", cacheable=True)
+    return _to_update(state, result)
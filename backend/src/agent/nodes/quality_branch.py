@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List
+
+from langchain_core.runnables import RunnableConfig
+
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.states.overallstate import OverallState
+
+# 质量评估的三个并行分支：只读 web_research_result / evidence_digest / search_query，各自写不相交的 state key
+QUALITY_ASSESSORS = ["assess_content_quality", "verify_facts", "assess_relevance"]
+# fast_quality_mode 下代替三个分支的单次合并评估节点，写同样的三个 state key
+FAST_QUALITY_NODE = "assess_quality"
+
+# 分支超时或失败时写入的默认值（分数取中性 0.5，与 optimize_summary 的缺省一致）
+DEFAULT_BRANCH_VALUES = {
+    "content_quality": {
+        "quality_score": 0.5,
+        "reliability_assessment": "内容质量评估失败或超时，使用默认值",
+        "content_gaps": [],
+        "improvement_suggestions": [],
+    },
+    "fact_verification": {
+        "verified_facts": [],
+        "disputed_claims": [],
+        "verification_sources": [],
+        "confidence_score": 0.5,
+    },
+    "relevance_assessment": {
+        "relevance_score": 0.5,
+        "key_topics_covered": [],
+        "missing_topics": [],
+        "content_alignment": "相关性评估失败或超时，使用默认值",
+    },
+}
+
+
+def quality_nodes(config: RunnableConfig) -> List[str]:
+    """研究结束后要执行的质量评估节点：三个并行分支，或 fast_quality_mode 下的单个合并节点"""
+    if Configuration.from_runnable_config(config).fast_quality_mode:
+        return [FAST_QUALITY_NODE]
+    return QUALITY_ASSESSORS
+
+
+def with_branch_timeout(node, *state_keys: str):
+    """Wrap a sync quality node so a slow or failing branch degrades to its default value.
+
+    Args:
+        node: The quality assessment node to wrap
+        state_keys: The state keys the node writes, used to look up the default values
+
+    Returns:
+        A LangGraph node with the same signature as ``node``
+    """
+
+    @functools.wraps(node)
+    def wrapper(state: OverallState, config: RunnableConfig):
+        timeout = Configuration.from_runnable_config(config).quality_branch_timeout
+        # 每次执行单独使用一个线程，不与其他运行共享队列，超时只计算分支本身的执行时间；
+        # 已开始的调用无法被中断，超时后在后台自然结束，结果被丢弃
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quality-branch")
+        future = executor.submit(contextvars.copy_context().run, node, state, config)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            print(f"⚠️ {node.__name__} 超过 {timeout}s 未完成，使用默认值")
+        except Exception as e:
+            print(f"⚠️ {node.__name__} 执行失败，使用默认值: {e}")
+        finally:
+            executor.shutdown(wait=False)
+        return {state_key: DEFAULT_BRANCH_VALUES[state_key] for state_key in state_keys}
+
+    return wrapper
+
+
+def awith_branch_timeout(node, *state_keys: str):
+    """Async counterpart of :func:`with_branch_timeout`, cancelling the branch on timeout.
+
+    Cancellation propagates into the model call, which returns its rate limiter slot.
+    """
+
+    @functools.wraps(node)
+    async def wrapper(state: OverallState, config: RunnableConfig):
+        timeout = Configuration.from_runnable_config(config).quality_branch_timeout
+        try:
+            return await asyncio.wait_for(node(state, config), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {node.__name__} 超过 {timeout}s 未完成，使用默认值")
+        except Exception as e:
+            print(f"⚠️ {node.__name__} 执行失败，使用默认值: {e}")
+        return {state_key: DEFAULT_BRANCH_VALUES[state_key] for state_key in state_keys}
+
+    return wrapper
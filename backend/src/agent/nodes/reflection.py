@@ -1,16 +1,44 @@
 from langchain_core.messages import SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langgraph.types import Command, Send
+from langgraph.types import Command
 
 from backend.src.agent.config.configuration import Configuration
 from backend.src.agent.format.schema import Reflection
-from backend.src.agent.models.LLM_MODEL import ModelInstances
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_structured, ainvoke_structured
+from backend.src.agent.nodes.evidence_digest import evidence_for
+from backend.src.agent.nodes.quality_branch import quality_nodes
 from backend.src.agent.prompts.query_pormpt import get_current_date
 from backend.src.agent.prompts.reflection_prompt import reflection_instructions
+from backend.src.agent.query_ledger import research_sends
 from backend.src.agent.states.overallstate import OverallState
 from backend.src.agent.states.sub_states.reflectionstate import ReflectionState
 
 
+def _format_prompt(state: OverallState, config: RunnableConfig) -> str:
+    current_date = get_current_date()
+    return reflection_instructions.format(
+        current_date=current_date,
+        research_topic=state["search_query"],
+        summaries=evidence_for(state, config, "reflection"),
+    )
+
+
+def _to_command(state: OverallState, result: Reflection) -> Command:
+    # Increment the research loop count
+    # 安全获取 reflection（如果不存在，返回默认值）
+    reflection = state.get("reflection", {})  # 如果没有，就返回空 dict
+
+    count=reflection.get("research_loop_count",0)+1
+
+    reflection_result=ReflectionState(is_sufficient=result.is_sufficient,knowledge_gap=result.knowledge_gap,follow_up_queries=result.follow_up_queries,
+                                      research_loop_count=count,number_of_ran_queries=len(state["search_query"]))
+
+    print(f"reflection结果如下：\n{reflection_result}")
+
+    return Command(update={"reflection":reflection_result,"search_query":result.follow_up_queries})
+
+
 def reflection(state: OverallState, config: RunnableConfig) :
     """LangGraph node that identifies knowledge gaps and generates potential follow-up queries.
 
@@ -25,43 +53,34 @@ def reflection(state: OverallState, config: RunnableConfig) :
     Returns:
         Dictionary with state update, including search_query key containing the generated follow-up query
     """
-    configurable = Configuration.from_runnable_config(config)
-    # Increment the research loop count and get the reasoning model
-    # 安全获取 reflection（如果不存在，返回默认值）
-    reflection = state.get("reflection", {})  # 如果没有，就返回空 dict
-
-    count=reflection.get("research_loop_count",0)+1
-
-    # Format the prompt
-    current_date = get_current_date()
-    formatted_prompt = reflection_instructions.format(
-        current_date=current_date,
-        research_topic=state["search_query"],
-        summaries="\n\n---\n\n".join(state["web_research_result"]),
-    )
     # init Reasoning Model
-    llm = ModelInstances.answer_model
-    result = llm.with_structured_output(Reflection).invoke([SystemMessage(content=formatted_prompt)])
+    llm = get_chat_model("reflection", config)
+    result = invoke_structured(llm, Reflection, [SystemMessage(content=_format_prompt(state, config))], config,
+                               node="reflection", cacheable=True)
+    return _to_command(state, result)
 
-    reflection_result=ReflectionState(is_sufficient=result.is_sufficient,knowledge_gap=result.knowledge_gap,follow_up_queries=result.follow_up_queries,
-                                      research_loop_count=count,number_of_ran_queries=len(state["search_query"]))
-
-    print(f"reflection结果如下：\n{reflection_result}")
 
-    return Command(update={"reflection":reflection_result,"search_query":[result.follow_up_queries]})
+async def areflection(state: OverallState, config: RunnableConfig):
+    """Async variant of :func:`reflection` that awaits the model with ``ainvoke``."""
+    llm = get_chat_model("reflection", config)
+    result = await ainvoke_structured(llm, Reflection, [SystemMessage(content=_format_prompt(state, config))], config,
+                                      node="reflection", cacheable=True)
+    return _to_command(state, result)
 
 def evaluate_research(state:OverallState,config:RunnableConfig):
     """LangGraph routing function that determines the next step in the research flow.
 
         Controls the research loop by deciding whether to continue gathering information
-        or to proceed to quality enhancement based on the configured maximum number of research loops.
+        or to proceed to the parallel quality assessors based on the configured maximum number of research loops.
+        When research continues, one web_research branch is dispatched per follow-up query.
 
         Args:
             state: Current graph state containing the research loop count
             config: Configuration for the runnable, including max_research_loops setting
 
         Returns:
-            String literal indicating the next node to visit ("web_research" or "assess_content_quality")
+            The list of quality assessment nodes to run, or a list of Send objects
+            targeting "web_research"
         """
     configurable = Configuration.from_runnable_config(config)
     max_research_loops = (
@@ -69,7 +88,15 @@ def evaluate_research(state:OverallState,config:RunnableConfig):
         if state.get("max_research_loops") is not None
         else configurable.max_research_loops
     )
-    if state["reflection"]["is_sufficient"] or state["reflection"]["research_loop_count"] >= max_research_loops:
-        return "assess_content_quality"
+    reflection = state["reflection"]
+    if (
+        reflection["is_sufficient"]
+        or reflection["research_loop_count"] >= max_research_loops
+        or not reflection["follow_up_queries"]
+    ):
+        # 三个质量评估分支并行执行（或 fast_quality_mode 下的单个合并节点），在 optimize_summary 汇合
+        return quality_nodes(config)
     else:
-        return "web_research"
\ No newline at end of file
+        # 追问查询已追加在 search_query 尾部，id 从 reflection 前已运行的查询数开始
+        offset = reflection["number_of_ran_queries"]
+        return research_sends(state, reflection["follow_up_queries"], offset, config)
\ No newline at end of file
@@ -1,11 +1,17 @@
+from langchain_core.runnables import RunnableConfig
+
+from backend.src.agent.query_ledger import research_sends
 from backend.src.agent.states.overallstate import OverallState
 
 
-def should_regenerate_queried(state: OverallState):
+def should_regenerate_queried(state: OverallState, config: RunnableConfig):
     """路由函数：决定是否需要重新生成问题"""
-    # 如果已经收到用户确认，直接进行网络搜索
+    # 如果已经收到用户确认，为每条查询派发一个并行的网络搜索分支
     if state.get("user_confirmation_received", False):
-        return "web_research"
+        queries = state.get("generated_queries") or []
+        # id 为查询在本线程 search_query 中的位置，保证引用编号在分支间不冲突
+        offset = len(state.get("search_query", [])) - len(queries)
+        return research_sends(state, queries, offset, config)
     # 如果需要重新生成问题
     else:
-        return "generate_query_node"
\ No newline at end of file
+        return "generate_query_node"
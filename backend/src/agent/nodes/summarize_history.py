@@ -0,0 +1,122 @@
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_text, ainvoke_text
+from backend.src.agent.nodes.wait_for_confimation import QUERY_CONFIRMED_MARKER
+from backend.src.agent.prompts.history_summary_prompt import history_summary_prompt
+from backend.src.agent.states.overallstate import OverallState
+
+# 滚动摘要消息的固定 id，刷新时按 id 整体替换
+HISTORY_SUMMARY_ID = "history_summary"
+HISTORY_SUMMARY_PREFIX = "[较早对话摘要]\n"
+
+
+def is_confirmation_marker(msg: BaseMessage) -> bool:
+    return isinstance(msg, HumanMessage) and msg.content == QUERY_CONFIRMED_MARKER
+
+
+def is_history_summary(msg: BaseMessage) -> bool:
+    return isinstance(msg, SystemMessage) and msg.id == HISTORY_SUMMARY_ID
+
+
+def split_turns(messages: List[BaseMessage]) -> Tuple[Optional[SystemMessage], List[List[BaseMessage]]]:
+    """把消息切分为 (已有摘要, 对话组列表)，每组以一条真实用户消息开头
+
+    wait_for_user_confirmation 注入的确认提示与确认标记不属于真实对话，直接丢弃。
+    """
+    summary = None
+    turns: List[List[BaseMessage]] = []
+    for i, msg in enumerate(messages):
+        if is_history_summary(msg):
+            summary = msg
+            continue
+        if is_confirmation_marker(msg):
+            continue
+        if isinstance(msg, AIMessage) and i + 1 < len(messages) and is_confirmation_marker(messages[i + 1]):
+            continue
+        if isinstance(msg, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return summary, turns
+
+
+def _plan_fold(state: OverallState, config: RunnableConfig):
+    """返回 (待折叠的对话组, 保留的对话组, 已有摘要)；不需要折叠时返回 None"""
+    configurable = Configuration.from_runnable_config(config)
+    if configurable.history_keep_turns <= 0:
+        return None
+    summary, turns = split_turns(state["messages"])
+    keep = max(1, configurable.history_keep_turns)
+    # 超出保留轮数的对话组攒够 history_summary_batch 组才折叠一次，摘要按批刷新而非每轮重写
+    if len(turns) - keep < max(1, configurable.history_summary_batch):
+        return None
+    return turns[:-keep], turns[-keep:], summary
+
+
+def _format_prompt(folded: List[List[BaseMessage]], summary: Optional[SystemMessage], config: RunnableConfig) -> str:
+    dialogue = "\n".join(
+        f"[{'user' if isinstance(msg, HumanMessage) else 'assistant'}] {msg.content}"
+        for turn in folded for msg in turn
+    )
+    previous = summary.content[len(HISTORY_SUMMARY_PREFIX):] if summary else "（无）"
+    return history_summary_prompt.format(
+        max_chars=Configuration.from_runnable_config(config).history_summary_max_chars,
+        previous_summary=previous,
+        dialogue=dialogue,
+    )
+
+
+def _to_update(summary_text: str, kept: List[List[BaseMessage]]) -> dict:
+    # 整体重写消息列表：摘要固定在最前，其后是保留的最近几轮（确认提示与标记已去除）
+    summary = SystemMessage(content=HISTORY_SUMMARY_PREFIX + summary_text.strip(), id=HISTORY_SUMMARY_ID)
+    return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), summary, *(msg for turn in kept for msg in turn)]}
+
+
+def summarize_history(state: OverallState, config: RunnableConfig):
+    """LangGraph node that folds older turns into a rolling summary message.
+
+    Keeps the last ``history_keep_turns`` turns verbatim and merges older turns, together
+    with the previous summary, into one SystemMessage with a fixed id. Runs after the
+    answer is finalized, in parallel with memory extraction, so it never delays the reply.
+
+    Args:
+        state: Current graph state containing the full message history
+        config: Configuration for the runnable, including the history policy
+
+    Returns:
+        Dictionary with state update rewriting ``messages``, or None when nothing is folded
+    """
+    plan = _plan_fold(state, config)
+    if plan is None:
+        return None
+    folded, kept, summary = plan
+
+    try:
+        response = invoke_text(get_chat_model("answer", config), _format_prompt(folded, summary, config), config,
+                               node="summarize_history")
+    except Exception as e:
+        # 摘要失败时保留原始历史，下一轮再尝试
+        print(f"⚠️ 历史摘要失败，本轮不折叠: {e}")
+        return None
+    return _to_update(response.content, kept)
+
+
+async def asummarize_history(state: OverallState, config: RunnableConfig):
+    """Async variant of :func:`summarize_history` that awaits the model with ``ainvoke``."""
+    plan = _plan_fold(state, config)
+    if plan is None:
+        return None
+    folded, kept, summary = plan
+
+    try:
+        response = await ainvoke_text(get_chat_model("answer", config), _format_prompt(folded, summary, config),
+                                      config, node="summarize_history")
+    except Exception as e:
+        print(f"⚠️ 历史摘要失败，本轮不折叠: {e}")
+        return None
+    return _to_update(response.content, kept)
@@ -1,12 +1,38 @@
 from langchain_core.runnables import RunnableConfig
 
 from backend.src.agent.format.schema import FactVerification
-from backend.src.agent.models.LLM_MODEL import ModelInstances
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_structured, ainvoke_structured
+from backend.src.agent.nodes.evidence_digest import evidence_for
 from backend.src.agent.prompts.fact_verification_prompt import fact_verification_instructions
 from backend.src.agent.prompts.query_pormpt import get_current_date
 from backend.src.agent.states.overallstate import OverallState
 
 
+def _format_prompt(state: OverallState, config: RunnableConfig) -> str:
+    # Research evidence: the shared digest rendered under this node's token budget
+    combined_content = evidence_for(state, config, "verify_facts")
+
+    # Format the prompt
+    current_date = get_current_date()
+    return fact_verification_instructions.format(
+        current_date=current_date,
+        research_topic=state["search_query"],
+        content=combined_content
+    )
+
+
+def _to_update(result: FactVerification) -> dict:
+    return {
+        "fact_verification": {
+            "verified_facts": result.verified_facts,
+            "disputed_claims": result.disputed_claims,
+            "verification_sources": result.verification_sources,
+            "confidence_score": result.confidence_score
+        }
+    }
+
+
 def verify_facts(state: OverallState, config: RunnableConfig):
     """LangGraph node that verifies facts and claims in the research content.
 
@@ -20,28 +46,16 @@ def verify_facts(state: OverallState, config: RunnableConfig):
     Returns:
         Dictionary with state update including fact verification results
     """
+    # Initialize DeepSeek
+    llm = get_chat_model("answer", config)
 
-    # Combine all research content
-    combined_content = "\n\n---\n\n".join(state["web_research_result"])
+    result = invoke_structured(llm, FactVerification, _format_prompt(state, config), config, node="verify_facts", cacheable=True)
+    return _to_update(result)
 
-    # Format the prompt
-    current_date = get_current_date()
-    formatted_prompt = fact_verification_instructions.format(
-        current_date=current_date,
-        research_topic=state["search_query"],
-        content=combined_content
-    )
 
-    # Initialize DeepSeek
-    llm = ModelInstances.answer_model
+async def averify_facts(state: OverallState, config: RunnableConfig):
+    """Async variant of :func:`verify_facts` that awaits the model with ``ainvoke``."""
+    llm = get_chat_model("answer", config)
 
-    result = llm.with_structured_output(FactVerification).invoke(formatted_prompt)
-
-    return {
-        "fact_verification": {
-            "verified_facts": result.verified_facts,
-            "disputed_claims": result.disputed_claims,
-            "verification_sources": result.verification_sources,
-            "confidence_score": result.confidence_score
-        }
-    }
\ No newline at end of file
+    result = await ainvoke_structured(llm, FactVerification, _format_prompt(state, config), config, node="verify_facts", cacheable=True)
+    return _to_update(result)
@@ -3,6 +3,9 @@ from langchain_core.runnables import RunnableConfig
 
 from backend.src.agent.states.overallstate import OverallState
 
+# 自动确认时注入的用户消息，构建上下文时需跳过它以找到真正的用户问题
+QUERY_CONFIRMED_MARKER = "[查询已确认]"
+
 
 def wait_for_user_confirmation(state: OverallState, config: RunnableConfig):
     """LangGraph node that waits for user confirmation of generated queries.
@@ -18,7 +21,7 @@ def wait_for_user_confirmation(state: OverallState, config: RunnableConfig):
         [f"{i + 1}. {q}" for i, q in enumerate(queries)]) + "\n\n请确认是否继续使用这些查询进行搜索，或者您可以修改它们。"
 
     return {
-        "messages": [AIMessage(content=confirmation_message),HumanMessage(content="[查询已确认]")],
+        "messages": [AIMessage(content=confirmation_message),HumanMessage(content=QUERY_CONFIRMED_MARKER)],
         "awaiting_user_confirmation": False,
         "user_confirmation_received": True
     }
\ No newline at end of file
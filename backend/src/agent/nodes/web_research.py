@@ -1,36 +1,20 @@
 from datetime import datetime
+from typing import Optional
 
 from langchain_core.runnables import RunnableConfig
 from langgraph.types import Command
 
+from backend.src.agent.batch import ResearchDedup
 from backend.src.agent.config.configuration import Configuration
-from backend.src.agent.models.LLM_MODEL import ModelInstances
+from backend.src.agent.models.LLM_MODEL import get_chat_model
+from backend.src.agent.models.model_calls import invoke_search, ainvoke_search, invoke_text, ainvoke_text
 from backend.src.agent.prompts.web_researcher_prompt import web_searcher_instructions
-from backend.src.agent.states.overallstate import OverallState
+from backend.src.agent.states.sub_states.websearchstate import WebSearchState
+from backend.src.agent.tracing import tracer
 import json
 
-def web_research(state: OverallState, config: RunnableConfig ,context:str) :
-    """LangGraph node that performs web research using Tavily Search API.
-
-        Executes a web search using Tavily Search API and then uses DeepSeek to analyze and summarize the results.
-
-        Args:
-            state: Current graph state containing the search query and research loop count
-            config: Configuration for the runnable, including search API settings
-
-        Returns:
-            Dictionary with state update, including sources_gathered, research_loop_count, and web_research_results
-        """
-    # Configure
-
-    # Perform search using Tavily
-    # Ensure search_query is a string, not a list
-    search_query = state["search_query"]
-
-    if isinstance(search_query, list):
-        search_query = search_query[0] if search_query else ""
-    search_results = ModelInstances.tavily_search.invoke(search_query)
-
+def _process_search_results(search_results, branch_id: int) -> tuple[str, list[dict]]:
+    """把 Tavily 返回的结果整理成 prompt 文本与 sources_gathered 列表"""
     # Extract content and URLs from search results
     search_content = ""
     sources_gathered = []
@@ -70,11 +54,15 @@ def web_research(state: OverallState, config: RunnableConfig ,context:str) :
             "title": title,
             "url": url,
             "content": content[:500] + "..." if len(content) > 500 else content,
-            "short_url": f"[{i + 1}]",
+            "short_url": f"[{branch_id}-{i + 1}]",
             "value": url,
             "label": title  # Add label field for frontend compatibility
         })
 
+    return search_content, sources_gathered
+
+
+def _build_analysis_prompt(search_query: str, context: str, search_content: str) -> str:
     # Format prompt for LLM to analyze the search results
     formatted_prompt = web_searcher_instructions.format(
         current_date=datetime.now().strftime("%Y年%m月%d日"),
@@ -84,14 +72,23 @@ def web_research(state: OverallState, config: RunnableConfig ,context:str) :
 
     # Add search results to the prompt
     analysis_prompt = f"{formatted_prompt}\n\n搜索结果：\n{search_content}\n\n请分析这些搜索结果并提供带有引用的综合摘要。请用中文回答。"
+    return analysis_prompt
+
 
-    # Use LLM to analyze and summarize the search results
-    llm = ModelInstances.answer_model
+def _suppressed(state: WebSearchState) -> Command:
+    """近似重复的查询：不搜索也不总结，只在台账中记录它对应的原查询（结果即原分支的 [id-n] 引用）"""
+    entry = {"id": state["id"], "query": state["search_query"], "duplicate_of": state["duplicate_of"],
+             "similarity": state["similarity"]}
+    with tracer.span("query_ledger", "suppressed") as span:
+        span.set(duplicate_of=entry["duplicate_of"], similarity=entry["similarity"])
+    print(f"查询「{entry['query']}」与分支 {entry['duplicate_of']} 的查询近似重复（相似度 {entry['similarity']:.2f}），"
+          f"复用其结果")
+    return Command(update={"query_ledger": [entry]})
 
-    response = llm.invoke(analysis_prompt)
 
+def _to_command(state: WebSearchState, response_text: str, sources_gathered: list[dict]) -> Command:
     # Insert citation markers
-    modified_text = response.content
+    modified_text = response_text
     for i, source in enumerate(sources_gathered):
         # Replace URL references with short citations
         if source['url'] in modified_text:
@@ -108,4 +105,67 @@ def web_research(state: OverallState, config: RunnableConfig ,context:str) :
     return Command(update={
         "sources_gathered": sources_gathered,
         "web_research_result": [modified_text],
-    })
\ No newline at end of file
+        "query_ledger": [{"id": state["id"], "query": state["search_query"], "duplicate_of": None, "similarity": 1.0}],
+    })
+
+
+def web_research(state: WebSearchState, config: RunnableConfig ,context:str,
+                 dedup: Optional[ResearchDedup] = None) :
+    """LangGraph node that performs web research using Tavily Search API.
+
+        Executes a web search for a single query using Tavily Search API and then uses DeepSeek
+        to analyze and summarize the results. One branch of this node is dispatched per pending
+        query, so citation markers are prefixed with the branch id to stay unique after the join.
+
+        Args:
+            state: Branch state containing the search query, branch id and conversation messages
+            config: Configuration for the runnable, including search API settings
+            dedup: Batch-scoped store shared by concurrent jobs; identical or near-identical
+                queries reuse one search + analysis instead of repeating it
+
+        Returns:
+            Dictionary with state update, including sources_gathered, web_research_results and the
+            query_ledger entry; a branch whose query duplicates an earlier one only writes the ledger entry
+        """
+    if state.get("duplicate_of") is not None:
+        return _suppressed(state)
+    search_query = state["search_query"]
+
+    def research():
+        # Perform search using Tavily (served from the local cache when possible)
+        search_results = invoke_search(search_query, config)
+        search_content, _ = _process_search_results(search_results, state["id"])
+
+        # Use LLM to analyze and summarize the search results
+        llm = get_chat_model("answer", config)
+
+        response = invoke_text(llm, _build_analysis_prompt(search_query, context, search_content), config,
+                               node="web_research")
+        return search_results, response.content
+
+    search_results, response_text = dedup.run(search_query, research) if dedup else research()
+    # 引用编号按本分支的 id 重新生成，共享的结果在不同任务中也不会冲突
+    _, sources_gathered = _process_search_results(search_results, state["id"])
+    return _to_command(state, response_text, sources_gathered)
+
+
+async def aweb_research(state: WebSearchState, config: RunnableConfig, context: str,
+                        dedup: Optional[ResearchDedup] = None):
+    """Async variant of :func:`web_research` that awaits Tavily and the model with ``ainvoke``."""
+    if state.get("duplicate_of") is not None:
+        return _suppressed(state)
+    search_query = state["search_query"]
+
+    async def research():
+        search_results = await ainvoke_search(search_query, config)
+        search_content, _ = _process_search_results(search_results, state["id"])
+
+        llm = get_chat_model("answer", config)
+
+        response = await ainvoke_text(llm, _build_analysis_prompt(search_query, context, search_content), config,
+                                      node="web_research")
+        return search_results, response.content
+
+    search_results, response_text = await dedup.arun(search_query, research) if dedup else await research()
+    _, sources_gathered = _process_search_results(search_results, state["id"])
+    return _to_command(state, response_text, sources_gathered)
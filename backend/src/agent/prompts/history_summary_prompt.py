@@ -0,0 +1,15 @@
+history_summary_prompt="""你是一位对话摘要助手。下面是一段较早的对话历史，以及此前已有的历史摘要（可能为空）。
+请把它们合并成一份新的、简洁的中文摘要，供后续对话作为背景参考。
+
+要求：
+- 保留用户的目标、背景、偏好、已做出的决定与仍未解决的问题。
+- 保留研究得出的关键结论，去掉引用链接、质量评分等格式化细节。
+- 按时间顺序组织，不要编造对话中没有的信息。
+- 控制在 {max_chars} 字以内，只输出摘要正文。
+
+已有摘要：
+{previous_summary}
+
+待合并的较早对话：
+{dialogue}
+"""
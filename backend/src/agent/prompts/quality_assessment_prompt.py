@@ -0,0 +1,42 @@
+quality_assessment_instructions = """你是一名研究内容评审专家，需要对同一份研究内容一次性完成三项评估：内容质量、事实核查与主题相关性。
+
+指令：
+- 当前日期是 {current_date}
+- 三项评估彼此独立，分别给出评分，不要让一项的结论影响另一项的评分
+
+一、内容质量（content_quality）
+- 分析研究内容的整体质量，评估信息来源的可靠性和权威性
+- 识别内容中的空白或不足之处，并提供改进建议
+- 评估标准：信息的准确性和时效性、来源的权威性和可信度、内容的完整性和深度、逻辑结构和表达清晰度
+
+二、事实核查（fact_verification）
+- 识别内容中的关键事实和声明，验证其准确性
+- 标记有争议或无法验证的声明，提供验证来源和置信度评分
+- 验证标准：事实的可验证性、来源的权威性、信息的时效性、数据的准确性
+
+三、相关性（relevance_assessment）
+- 分析内容与研究主题的相关程度，识别已充分覆盖的关键主题与缺失或覆盖不足的主题
+- 评估维度：主题匹配度、内容深度、覆盖广度、目标一致性
+
+输出格式：
+- 将您的回复格式化为具有这些确切键的JSON对象：
+   - "content_quality": 对象，包含
+      - "quality_score": 0.0到1.0的数值
+      - "reliability_assessment": 可靠性评估描述
+      - "content_gaps": 内容空白列表
+      - "improvement_suggestions": 改进建议列表
+   - "fact_verification": 对象，包含
+      - "verified_facts": 已验证事实列表，每个包含"fact"和"source"键
+      - "disputed_claims": 有争议声明列表，每个包含"claim"和"reason"键
+      - "verification_sources": 验证来源列表
+      - "confidence_score": 0.0到1.0的置信度评分
+   - "relevance_assessment": 对象，包含
+      - "relevance_score": 0.0到1.0的相关性评分
+      - "key_topics_covered": 已充分覆盖的关键主题列表
+      - "missing_topics": 缺失或不足的主题列表
+      - "content_alignment": 内容与目标一致性的描述
+
+研究主题：{research_topic}
+
+待评估内容：
+{content}"""
@@ -0,0 +1,82 @@
+"""线程级搜索查询台账：在派发 web_research 分支之前拦截与已搜索查询近似重复的查询
+
+每个 web_research 分支向 OverallState.query_ledger 追加一条记录（随 checkpoint 持久化，跨轮次累积）：
+    {"id": 分支 id, "query": 查询, "duplicate_of": None, "similarity": 1.0}       实际执行了搜索
+    {"id": 分支 id, "query": 查询, "duplicate_of": 原分支 id, "similarity": 0.86}  被判为重复，没有搜索
+
+被拦截的查询映射到原查询已有的结果：原分支的摘要已在 web_research_result 中，引用编号为 [原分支 id-n]。
+相似度为两条查询 jieba 词集合（去掉疑问词等停用词）的 Jaccard 系数。
+"""
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import Send
+
+from backend.src.agent.cache.search_cache import normalize_query
+from backend.src.agent.config.configuration import Configuration
+from backend.src.agent.contextbuilder.tokenizer import default_tokenizer
+
+# 只改变提问方式、不改变检索意图的词
+STOPWORDS = frozenset({
+    "如何", "怎么", "怎样", "什么", "哪些", "哪个", "为什么", "是否", "可以", "应该", "一下", "有没有",
+    "the", "how", "what", "which", "why", "is", "are", "to", "of", "and", "for", "in", "on", "with",
+})
+
+
+def query_terms(query: str) -> FrozenSet[str]:
+    text = normalize_query(query)
+    terms = frozenset(term for term in default_tokenizer.tokenize(text) if term.strip() and term not in STOPWORDS)
+    # 全是停用词或单字时退化为整条查询，避免空集合彼此相似
+    return terms or frozenset([text])
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class QueryLedger:
+    """一个线程已派发的查询；只有实际执行过搜索的查询可以作为重复的目标"""
+
+    def __init__(self, entries: List[dict], threshold: float):
+        self.threshold = threshold
+        self._terms: Dict[int, Tuple[str, FrozenSet[str]]] = {
+            entry["id"]: (entry["query"], query_terms(entry["query"]))
+            for entry in entries if entry.get("duplicate_of") is None
+        }
+
+    def match(self, query: str) -> Optional[Tuple[int, float]]:
+        """返回最相近的已执行查询 (id, 相似度)；低于阈值时返回 None"""
+        terms = query_terms(query)
+        best: Optional[Tuple[int, float]] = None
+        for query_id, (_, other) in self._terms.items():
+            score = similarity(terms, other)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (query_id, score)
+        return best
+
+    def add(self, query_id: int, query: str) -> None:
+        self._terms[query_id] = (query, query_terms(query))
+
+
+def research_sends(state: dict, queries: List[str], offset: int, config: RunnableConfig) -> List[Send]:
+    """为每条查询派发一个 web_research 分支，分支 id 为查询在本线程 search_query 中的位置
+
+    开启 query_dedup_enabled 时，与本线程已执行的查询（包括同一批中排在前面的查询）近似重复的查询
+    仍派发分支以记录台账，但带上 duplicate_of，分支内不再搜索与总结。
+    """
+    configurable = Configuration.from_runnable_config(config)
+    ledger = QueryLedger(state.get("query_ledger") or [], configurable.query_dedup_threshold) \
+        if configurable.query_dedup_enabled else None
+    sends = []
+    for idx, query in enumerate(queries):
+        match = ledger.match(query) if ledger else None
+        if ledger and not match:
+            ledger.add(offset + idx, query)
+        sends.append(Send("web_research", {
+            "search_query": query,
+            "id": offset + idx,
+            "messages": state["messages"],
+            "duplicate_of": match[0] if match else None,
+            "similarity": round(match[1], 4) if match else 1.0,
+        }))
+    return sends
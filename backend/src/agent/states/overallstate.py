@@ -5,7 +5,9 @@ from langchain_core.messages import BaseMessage
 from langgraph.graph import add_messages
 
 from backend.src.agent.states.sub_states.contentqualitystate import ContentQualityState
+from backend.src.agent.states.sub_states.evidencedigeststate import EvidenceDigestState
 from backend.src.agent.states.sub_states.factverificationstate import FactVerificationState
+from backend.src.agent.states.sub_states.noveltystate import NoveltyState
 from backend.src.agent.states.sub_states.reflectionstate import ReflectionState
 from backend.src.agent.states.sub_states.relevancestate import RelevanceState
 from backend.src.agent.states.sub_states.summaryoptimizationstate import SummaryOptimizationState
@@ -17,6 +19,7 @@ class OverallState(TypedDict):
     search_query: Annotated[List[str], operator.add]
     web_research_result: Annotated[list, operator.add]
     sources_gathered: Annotated[list, operator.add]
+    query_ledger: Annotated[list, operator.add]  # 每个 web_research 分支一条记录，见 query_ledger.py
     initial_search_query_count: int
     max_research_loops: int
     research_loop_count: int
@@ -31,6 +34,8 @@ class OverallState(TypedDict):
     content_quality: ContentQualityState
     fact_verification: FactVerificationState
     reflection: ReflectionState
+    novelty: NoveltyState
+    evidence_digest: EvidenceDigestState
     translation: TranslationState
     relevance_assessment: RelevanceState
     summary_optimization: SummaryOptimizationState
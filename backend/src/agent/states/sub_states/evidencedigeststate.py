@@ -0,0 +1,7 @@
+from typing import TypedDict
+
+
+class EvidenceDigestState(TypedDict):
+    evidence_count: int
+    sentences: list  # [句子, token 数, 结果序号, 句子序号]，按排序先后
+    total_tokens: int
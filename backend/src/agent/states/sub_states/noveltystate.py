@@ -0,0 +1,10 @@
+from typing import TypedDict
+
+
+class NoveltyState(TypedDict):
+    novelty_score: float
+    evidence_count: int
+    skipped_reflection: bool
+    reason: str
+    loops_saved: int
+    tokens_saved: int
@@ -0,0 +1,12 @@
+from typing import Optional, TypedDict
+
+from langchain_core.messages import BaseMessage
+
+
+class WebSearchState(TypedDict):
+    search_query: str
+    id: int
+    messages: list[BaseMessage]
+    # 与本线程已执行的查询近似重复时为原查询的分支 id（见 query_ledger），分支内不再搜索
+    duplicate_of: Optional[int]
+    similarity: float
@@ -0,0 +1,79 @@
+import time
+from typing import Any, Dict, List, Optional
+
+# 需要把 LLM 增量 token 转发给用户的节点；其余节点的结构化输出（JSON 片段）不转发
+STREAM_TOKEN_NODES = {"web_research"}
+
+# 节点进度的中文展示名
+NODE_LABELS = {
+    "generate_query_node": "生成搜索查询",
+    "wait_for_user_confirmation": "确认搜索查询",
+    "web_research": "网络搜索与分析",
+    "build_evidence_digest": "整理证据摘要",
+    "assess_novelty": "评估新证据",
+    "reflection": "反思与补充检索",
+    "assess_content_quality": "内容质量评估",
+    "verify_facts": "事实核查",
+    "assess_relevance": "相关性评估",
+    "assess_quality": "质量、事实与相关性评估",
+    "optimize_summary": "优化摘要",
+    "generate_verification_report": "生成验证报告",
+    "finalize_answer": "整理最终答案",
+    "extract_and_add_memory": "提取并保存记忆",
+    "summarize_history": "整理对话历史",
+}
+
+# graph.stream 同时订阅的模式：节点进度、LLM token、finalize_answer 的分段输出
+STREAM_MODES = ["updates", "messages", "custom"]
+
+
+def to_events(mode: str, chunk: Any) -> List[Dict[str, Any]]:
+    """把 graph.stream(stream_mode=STREAM_MODES) 产出的 (mode, chunk) 转成统一的事件字典
+
+    - {"type": "node", "node", "label", "update"}：某个节点完成
+    - {"type": "token", "node", "branch", "content"}：LLM 增量 token，branch 区分并行搜索分支
+    - {"type": "section", "node", "section", "content"}：finalize_answer 格式化好的一段答案
+    """
+    if mode == "updates":
+        return [
+            {"type": "node", "node": node, "label": NODE_LABELS.get(node, node), "update": update}
+            for node, update in chunk.items()
+        ]
+    if mode == "messages":
+        message, metadata = chunk
+        node = metadata.get("langgraph_node")
+        content = getattr(message, "content", None)
+        if node in STREAM_TOKEN_NODES and isinstance(content, str) and content:
+            return [{"type": "token", "node": node, "branch": metadata.get("langgraph_checkpoint_ns", ""),
+                     "content": content}]
+        return []
+    if mode == "custom" and isinstance(chunk, dict) and "section" in chunk:
+        return [{"type": "section", "node": "finalize_answer", "section": chunk["section"],
+                 "content": chunk["content"]}]
+    return []
+
+
+class StreamTimer:
+    """记录一次流式运行的首 token 延迟（TTFT）与总耗时，并提取最终答案"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_ms: Optional[float] = None
+        self.answer: Optional[str] = None
+
+    def observe(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        if event["type"] in ("token", "section") and self.first_token_ms is None:
+            self.first_token_ms = (time.perf_counter() - self.start) * 1000
+        if event["type"] == "node" and event["node"] == "finalize_answer" and event["update"]:
+            self.answer = event["update"]["messages"][-1].content
+        event["elapsed_ms"] = round((time.perf_counter() - self.start) * 1000, 2)
+        return event
+
+    def done(self) -> Dict[str, Any]:
+        """{"type": "done", "answer", "elapsed_ms", "ttft_ms"}：整个图运行结束"""
+        return {
+            "type": "done",
+            "answer": self.answer,
+            "elapsed_ms": round((time.perf_counter() - self.start) * 1000, 2),
+            "ttft_ms": round(self.first_token_ms, 2) if self.first_token_ms is not None else None,
+        }
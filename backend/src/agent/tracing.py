@@ -0,0 +1,368 @@
+import contextvars
+import inspect
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+
+from backend.src.agent.config.configuration import Configuration
+
+# 模型单价（元 / 百万 token：输入, 输出），参考阿里云百炼公开价格，实际以控制台为准，可用 set_model_price 覆盖
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "qwen-turbo": (0.3, 0.6),
+    "qwen-flash": (0.15, 1.5),
+    "qwen-plus": (0.8, 2.0),
+    "qwen-max": (2.4, 9.6),
+}
+# 延迟直方图的分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_current_run: contextvars.ContextVar[Optional["RunTrace"]] = contextvars.ContextVar("agent_trace_run", default=None)
+# 当前所在的图节点与研究循环轮次，模型/搜索/记忆/RAG 调用据此打标签
+_current_node: contextvars.ContextVar[Tuple[Optional[str], Optional[int]]] = contextvars.ContextVar(
+    "agent_trace_node", default=(None, None))
+
+
+def set_model_price(model: str, input_per_million: float, output_per_million: float) -> None:
+    MODEL_PRICES[model] = (input_per_million, output_per_million)
+
+
+class Span:
+    """一次节点执行或外部调用的记录，调用方可在执行过程中补充 token 数、缓存命中等属性"""
+
+    def __init__(self, kind: str, name: str, node: Optional[str], loop: Optional[int], offset_ms: float):
+        self.kind = kind
+        self.name = name
+        self.node = node
+        self.loop = loop
+        self.offset_ms = offset_ms
+        self.start = time.perf_counter()
+        self.attrs: Dict[str, Any] = {}
+
+    def set(self, **attrs) -> None:
+        self.attrs.update({key: value for key, value in attrs.items() if value is not None})
+
+    def started(self) -> None:
+        """标记真正开始执行（之前的时间计为排队等待，如限流器排队）；重试时只记第一次，并累计尝试次数"""
+        if "queue_ms" not in self.attrs:
+            self.attrs["queue_ms"] = round((time.perf_counter() - self.start) * 1000, 2)
+        self.attrs["attempts"] = self.attrs.get("attempts", 0) + 1
+
+    def to_dict(self, wall_ms: float) -> dict:
+        return {"kind": self.kind, "name": self.name, "node": self.node, "loop": self.loop,
+                "offset_ms": round(self.offset_ms, 2), "wall_ms": round(wall_ms, 2), **self.attrs}
+
+
+class RunTrace:
+    """一次图运行（run / arun / resume / 流式运行）内记录的全部 span"""
+
+    def __init__(self, thread_id: str):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.thread_id = thread_id
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.elapsed_ms: Optional[float] = None
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: dict) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> dict:
+        nodes: Dict[str, dict] = defaultdict(lambda: {"count": 0, "wall_ms": 0.0, "max_ms": 0.0})
+        calls: Dict[str, dict] = defaultdict(lambda: {"count": 0, "wall_ms": 0.0, "queue_ms": 0.0,
+                                                      "cache_hits": 0, "errors": 0})
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0, "loops_saved": 0, "tokens_saved": 0}
+        for span in self.spans:
+            if span["kind"] == "node":
+                entry = nodes[span["name"]]
+                entry["count"] += 1
+                entry["wall_ms"] = round(entry["wall_ms"] + span["wall_ms"], 2)
+                entry["max_ms"] = max(entry["max_ms"], span["wall_ms"])
+                continue
+            entry = calls[f"{span['kind']}:{span['name']}"]
+            entry["count"] += 1
+            entry["wall_ms"] = round(entry["wall_ms"] + span["wall_ms"], 2)
+            entry["queue_ms"] = round(entry["queue_ms"] + span.get("queue_ms", 0.0), 2)
+            entry["cache_hits"] += bool(span.get("cache_hit"))
+            entry["errors"] += "error" in span
+            for key in ("prompt_tokens", "completion_tokens", "loops_saved", "tokens_saved"):
+                totals[key] += span.get(key, 0)
+            totals["cost"] += span.get("cost", 0.0)
+        totals["cost"] = round(totals["cost"], 6)
+        return {"nodes": dict(nodes), "calls": dict(calls), **totals}
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "run_id": self.run_id,
+            "thread_id": self.thread_id,
+            "started_at": self.started_at,
+            "elapsed_ms": self.elapsed_ms,
+            "summary": self.summary(),
+            "spans": spans,
+        }
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: Tuple[Tuple[str, Any], ...]) -> str:
+    def escape(value: Any) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+
+
+class Tracer:
+    """进程内的追踪器：按运行收集 span，同时累计 Prometheus 指标
+
+    - 节点 span 由 traced_node 包装产生；模型、搜索、记忆、RAG 与上下文构建调用在各自的调用点记录
+    - 每个 span 带 thread_id（所属运行）、节点名与研究循环轮次，外部调用还带排队等待、token 数、费用、缓存命中与错误，
+      跳过模型调用的优化（如 assess_novelty）还带省下的研究轮次与 token（loops_saved / tokens_saved）
+    - 运行结束后可用 recent_runs() 取回 JSON，配置了 trace_dir 时同时写成 <run_id>.json
+    """
+
+    def __init__(self, keep_runs: int = 100):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, tuple], _Histogram] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = defaultdict(float)
+        self._runs: deque = deque(maxlen=keep_runs)
+        self._disabled: contextvars.ContextVar[bool] = contextvars.ContextVar("agent_trace_disabled", default=False)
+
+    @contextmanager
+    def run(self, thread_id: str, config: Optional[RunnableConfig] = None):
+        """包住一次图运行；tracing_enabled 为 False 时本次运行内不记录任何 span"""
+        configurable = Configuration.from_runnable_config(config)
+        if not configurable.tracing_enabled:
+            token = self._disabled.set(True)
+            try:
+                yield None
+            finally:
+                _reset(self._disabled, token)
+            return
+
+        trace = RunTrace(thread_id)
+        token = _current_run.set(trace)
+        status = "ok"
+        try:
+            yield trace
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            _reset(_current_run, token)
+            trace.elapsed_ms = round((time.perf_counter() - trace.start) * 1000, 2)
+            with self._lock:
+                self._runs.append(trace)
+                self._observe("agent_run_duration_seconds", (), trace.elapsed_ms / 1000)
+                self._counters[("agent_runs_total", (("status", status),))] += 1
+            if configurable.trace_dir:
+                self._write(trace, Path(configurable.trace_dir))
+
+    @contextmanager
+    def span(self, kind: str, name: str, node: Optional[str] = None):
+        """记录一次调用；node 省略时取当前所在的图节点"""
+        if self._disabled.get():
+            yield Span(kind, name, node, None, 0.0)
+            return
+        current_node, loop = _current_node.get()
+        trace = _current_run.get()
+        offset = (time.perf_counter() - trace.start) * 1000 if trace else 0.0
+        span = Span(kind, name, node or current_node, loop, offset)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            self._finish(span, trace)
+
+    @contextmanager
+    def node(self, name: str, state: Any):
+        # 研究循环轮次只记录在 reflection 子状态中（顶层 research_loop_count 从未被写入）
+        loop = (state.get("reflection") or {}).get("research_loop_count") if isinstance(state, dict) else None
+        token = _current_node.set((name, loop))
+        try:
+            with self.span("node", name, node=name) as span:
+                if isinstance(state, dict) and "id" in state and "search_query" in state:
+                    span.set(branch=state["id"])
+                yield span
+        finally:
+            _reset(_current_node, token)
+
+    def _finish(self, span: Span, trace: Optional[RunTrace]) -> None:
+        wall_ms = (time.perf_counter() - span.start) * 1000
+        prices = MODEL_PRICES.get(span.name) if span.kind == "llm" else None
+        if prices and not span.attrs.get("cache_hit"):
+            span.attrs["cost"] = round((span.attrs.get("prompt_tokens", 0) * prices[0]
+                                        + span.attrs.get("completion_tokens", 0) * prices[1]) / 1e6, 8)
+        record = span.to_dict(wall_ms)
+        if trace:
+            record["thread_id"] = trace.thread_id
+            trace.add(record)
+
+        labels = (("kind", span.kind), ("name", span.name), ("node", span.node or ""))
+        status = "error" if "error" in span.attrs else "ok"
+        with self._lock:
+            self._observe("agent_span_duration_seconds", labels, wall_ms / 1000)
+            self._counters[("agent_calls_total", labels + (("status", status),))] += 1
+            if "queue_ms" in span.attrs:
+                self._observe("agent_queue_wait_seconds", labels, span.attrs["queue_ms"] / 1000)
+            if span.attrs.get("cache_hit"):
+                self._counters[("agent_cache_hits_total", labels)] += 1
+            for kind in ("prompt", "completion"):
+                if span.attrs.get(f"{kind}_tokens"):
+                    self._counters[("agent_tokens_total", labels + (("type", kind),))] += span.attrs[f"{kind}_tokens"]
+            if span.attrs.get("cost"):
+                self._counters[("agent_cost_yuan_total", labels)] += span.attrs["cost"]
+            # 提前结束研究循环等优化省下的模型调用
+            for kind in ("loops", "tokens"):
+                if span.attrs.get(f"{kind}_saved"):
+                    self._counters[(f"agent_{kind}_saved_total", labels)] += span.attrs[f"{kind}_saved"]
+
+    def _observe(self, metric: str, labels: tuple, value: float) -> None:
+        histogram = self._histograms.get((metric, labels))
+        if histogram is None:
+            histogram = self._histograms[(metric, labels)] = _Histogram()
+        histogram.observe(value)
+
+    @staticmethod
+    def _write(trace: RunTrace, directory: Path) -> None:
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / f"{trace.run_id}.json").write_text(
+                json.dumps(trace.to_dict(), ensure_ascii=False, default=str), encoding="utf-8")
+        except Exception as e:
+            print(f"⚠️ 写入追踪文件失败: {e}")
+
+    def recent_runs(self, thread_id: Optional[str] = None) -> List[dict]:
+        """最近运行的 JSON（旧到新），可按线程过滤"""
+        with self._lock:
+            runs = list(self._runs)
+        return [run.to_dict() for run in runs if thread_id is None or run.thread_id == thread_id]
+
+    def prometheus_text(self) -> str:
+        """以 Prometheus 文本格式导出累计指标"""
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            counters = sorted(self._counters.items(), key=lambda item: item[0])
+        declared = set()
+        for (metric, labels), histogram in histograms:
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            prefix = _labels(labels)
+            for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                lines.append(f'{metric}_bucket{{{prefix}{"," if prefix else ""}le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{{prefix}{"," if prefix else ""}le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum{{{prefix}}} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{{{prefix}}} {histogram.count}")
+        for (metric, labels), value in counters:
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{_labels(labels)}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._runs.clear()
+
+
+def _reset(var: contextvars.ContextVar, token: contextvars.Token) -> None:
+    try:
+        var.reset(token)
+    except ValueError:
+        # 流式生成器可能在另一个上下文中被关闭，此时无需恢复
+        pass
+
+
+# 进程内共享的追踪器
+tracer = Tracer()
+
+
+def traced_node(name: str, node):
+    """包装图节点，记录节点耗时并把节点名、循环轮次传给节点内的调用
+
+    包装后的函数显式声明 config 参数（LangGraph 按签名注入），原节点不接收 config 时不会传给它。
+    """
+    takes_config = "config" in inspect.signature(node).parameters
+
+    if inspect.iscoroutinefunction(node):
+        async def wrapper(state, config: RunnableConfig):
+            with tracer.node(name, state):
+                return await (node(state, config) if takes_config else node(state))
+    else:
+        def wrapper(state, config: RunnableConfig):
+            with tracer.node(name, state):
+                return node(state, config) if takes_config else node(state)
+
+    wrapper.__name__ = getattr(node, "__name__", name)
+    wrapper.__doc__ = node.__doc__
+    return wrapper
+
+
+class TracedTool:
+    """给 MemoryTool / RAGTool 的 execute / run 调用记录 span，其余属性原样转发"""
+
+    def __init__(self, tool, kind: str):
+        self._tool = tool
+        self._kind = kind
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._tool, name)
+        if name not in ("execute", "run") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            action = args[0] if name == "execute" and args and isinstance(args[0], str) else name
+            with tracer.span(self._kind, f"{self._kind}.{action}"):
+                return attr(*args, **kwargs)
+
+        return call
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """在后台线程提供 /metrics（Prometheus 文本格式）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="agent-metrics", daemon=True).start()
+    return server
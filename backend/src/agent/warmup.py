@@ -0,0 +1,99 @@
+import importlib
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+# 预热时提前导入的重型模块（创建 Agent、首次构建上下文、首次调用模型时才会用到）
+WARMUP_MODULES = (
+    "hello_agents.tools",
+    "backend.src.agent.contextbuilder.MyContextBuilder",
+    "langchain_openai",
+)
+# 预热时创建客户端的模型角色（leader 只在实验性 Agent 中使用）
+WARMUP_ROLES = ("query_generator", "reflection", "answer")
+
+_ready = threading.Event()
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_report: Dict[str, dict] = {}
+
+
+def _step(name: str, fn) -> None:
+    start = time.perf_counter()
+    try:
+        detail = fn()
+        _report[name] = {"ms": round((time.perf_counter() - start) * 1000, 2), "detail": detail}
+    except Exception as e:
+        # 预热失败只影响首个请求的延迟，不影响正确性
+        _report[name] = {"ms": round((time.perf_counter() - start) * 1000, 2), "error": str(e)}
+        print(f"⚠️ 预热步骤 {name} 失败: {e}")
+
+
+def warmup(config: Optional[RunnableConfig] = None, roles: Iterable[str] = WARMUP_ROLES) -> Dict[str, dict]:
+    """在进程启动后主动完成首个请求才会做的初始化，返回各步骤耗时
+
+    - imports：hello_agents、MyContextBuilder（jieba / rank_bm25 / tiktoken）、langchain_openai
+    - jieba：从序列化缓存加载前缀词典（首次运行时构建并写入缓存）
+    - tiktoken：加载 cl100k_base 编码器
+    - models：为各角色创建共享连接池与 ChatOpenAI 客户端（不发起网络请求）
+
+    完成后 is_ready() 返回 True；重复调用直接返回上一次的结果。
+    """
+    with _lock:
+        if _ready.is_set():
+            return dict(_report)
+
+        def import_modules():
+            for module in WARMUP_MODULES:
+                importlib.import_module(module)
+            return list(WARMUP_MODULES)
+
+        def load_jieba():
+            from backend.src.agent.contextbuilder.tokenizer import prewarm_jieba
+            return prewarm_jieba()
+
+        def load_encoder():
+            from backend.src.agent.contextbuilder.tokenizer import get_encoder
+            encoder = get_encoder()
+            if encoder is None:
+                raise RuntimeError("tiktoken 编码器不可用，token 数按字符数估算")
+            return encoder.name
+
+        def create_models():
+            from backend.src.agent.models.LLM_MODEL import get_chat_model
+            return [getattr(get_chat_model(role, config), "model_name", role) for role in roles]
+
+        total = time.perf_counter()
+        _step("imports", import_modules)
+        _step("jieba", load_jieba)
+        _step("tiktoken", load_encoder)
+        _step("models", create_models)
+        _report["total"] = {"ms": round((time.perf_counter() - total) * 1000, 2)}
+        _ready.set()
+        print(f"预热完成，耗时 {_report['total']['ms']:.0f} ms")
+        return dict(_report)
+
+
+def start_warmup(config: Optional[RunnableConfig] = None) -> threading.Thread:
+    """在后台线程执行 warmup()，进程可以先开始接收请求，用 wait_ready() 等待预热结束"""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warmup, args=(config,), name="agent-warmup", daemon=True)
+            _thread.start()
+        return _thread
+
+
+def is_ready() -> bool:
+    """就绪信号：预热是否已完成（可直接作为健康检查的 readiness 探针）"""
+    return _ready.is_set()
+
+
+def wait_ready(timeout: Optional[float] = None) -> bool:
+    return _ready.wait(timeout)
+
+
+def warmup_report() -> Dict[str, dict]:
+    return dict(_report)
@@ -0,0 +1,45 @@
+"""MyContextBuilder._select 的相关性过滤回归测试
+
+语料很小或查询词出现在所有包中时，BM25Okapi 的 IDF 为负，相关包不能因此被 min_relevance 过滤掉。
+"""
+from hello_agents.context import ContextConfig, ContextPacket
+
+from backend.src.agent.contextbuilder.MyContextBuilder import MyContextBuilder
+
+QUERY = "吉他新手怎么练习和弦"
+
+
+def _builder() -> MyContextBuilder:
+    return MyContextBuilder(config=ContextConfig(max_tokens=8000, min_relevance=0.2))
+
+
+def _types(packets) -> list:
+    return [packet.metadata["type"] for packet in packets]
+
+
+def test_single_packet_corpus_keeps_relevant_memory():
+    memory = ContextPacket(content="用户是吉他新手，每天练习半小时和弦转换", metadata={"type": "related_memory"})
+
+    selected = _builder()._select([memory], QUERY)
+
+    assert _types(selected) == ["related_memory"]
+    assert selected[0].relevance_score > 0
+
+
+def test_query_term_shared_by_all_packets_keeps_them():
+    memory = ContextPacket(content="用户是吉他新手，想系统学习", metadata={"type": "related_memory"})
+    summary = ContextPacket(content="此前讨论过吉他新手的选购建议",
+                            metadata={"type": "history", "filtered": True, "summary": True})
+
+    selected = _builder()._select([memory, summary], QUERY)
+
+    assert sorted(_types(selected)) == ["history", "related_memory"]
+
+
+def test_unrelated_packet_is_still_filtered():
+    memory = ContextPacket(content="用户是吉他新手，每天练习和弦", metadata={"type": "related_memory"})
+    knowledge = ContextPacket(content="咖啡豆的烘焙程度会影响酸度与苦味", metadata={"type": "knowledge_base"})
+
+    selected = _builder()._select([memory, knowledge], QUERY)
+
+    assert _types(selected) == ["related_memory"]